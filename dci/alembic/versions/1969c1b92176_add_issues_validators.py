@@ -0,0 +1,41 @@
+#
+# Copyright (C) 2016 Red Hat, Inc
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+"""Add the etag and last_modified of the issues
+
+Revision ID: 1969c1b92176
+Revises: 9198b7404542
+Create Date: 2016-09-01 15:40:03.812467
+
+"""
+
+# revision identifiers, used by Alembic.
+revision = '1969c1b92176'
+down_revision = '9198b7404542'
+branch_labels = None
+depends_on = None
+
+from alembic import op
+import sqlalchemy as sa
+
+
+def upgrade():
+    op.add_column('issues', sa.Column('etag', sa.Text))
+    op.add_column('issues', sa.Column('last_modified', sa.Text))
+
+
+def downgrade():
+    op.drop_column('issues', 'last_modified')
+    op.drop_column('issues', 'etag')
@@ -0,0 +1,68 @@
+#
+# Copyright (C) 2016 Red Hat, Inc
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+"""add tests_cases table
+
+Revision ID: 2b5c6e0bd7f4
+Revises: 56bed770668d
+Create Date: 2016-09-08 14:21:07.518233
+
+"""
+
+# revision identifiers, used by Alembic.
+revision = '2b5c6e0bd7f4'
+down_revision = '56bed770668d'
+branch_labels = None
+depends_on = None
+
+import datetime
+
+from alembic import op
+import sqlalchemy as sa
+
+import dci.common.utils as utils
+
+
+def upgrade():
+    statuses = sa.Enum('success', 'failure', 'error', 'skipped',
+                       name='testcases_statuses')
+
+    op.create_table(
+        'tests_cases',
+        sa.Column('id', sa.String(36), primary_key=True,
+                  default=utils.gen_uuid),
+        sa.Column('created_at', sa.DateTime(),
+                  default=datetime.datetime.utcnow, nullable=False),
+        sa.Column('classname', sa.Text, nullable=False),
+        sa.Column('name', sa.Text, nullable=False),
+        sa.Column('status', statuses, nullable=False),
+        sa.Column('duration', sa.Float),
+        sa.Column('file_id', sa.String(36),
+                  sa.ForeignKey('files.id', ondelete='CASCADE'),
+                  nullable=False),
+        sa.Column('job_id', sa.String(36),
+                  sa.ForeignKey('jobs.id', ondelete='CASCADE'),
+                  nullable=True)
+    )
+    op.create_index('tests_cases_file_id_idx', 'tests_cases', ['file_id'])
+    op.create_index('tests_cases_job_id_classname_name_idx', 'tests_cases',
+                    ['job_id', 'classname', 'name'])
+    op.create_index('tests_cases_name_classname_idx', 'tests_cases',
+                    ['name', 'classname'])
+
+
+def downgrade():
+    op.drop_table('tests_cases')
+    sa.Enum(name='testcases_statuses').drop(op.get_bind(), checkfirst=False)
@@ -0,0 +1,78 @@
+#
+# Copyright (C) 2016 Red Hat, Inc
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+"""Add secondary indexes on foreign keys and filter columns
+
+Revision ID: 3cda94ece583
+Revises: f1940287976b
+Create Date: 2016-08-22 10:12:31.418530
+
+"""
+
+# revision identifiers, used by Alembic.
+revision = '3cda94ece583'
+down_revision = 'f1940287976b'
+branch_labels = None
+depends_on = None
+
+from alembic import op
+import sqlalchemy as sa
+
+
+INDEXES = [
+    ('components_topic_id_type_created_at_idx', 'components',
+     ['topic_id', 'type', 'created_at'], None),
+    ('jobdefinitions_topic_id_created_at_idx', 'jobdefinitions',
+     ['topic_id', 'created_at'], None),
+    ('remotecis_team_id_idx', 'remotecis', ['team_id'], None),
+    ('tests_topic_id_idx', 'tests', ['topic_id'], None),
+    ('topics_teams_team_id_idx', 'topics_teams', ['team_id'], None),
+    ('users_team_id_idx', 'users', ['team_id'], None),
+    ('jobdefinition_tests_test_id_idx', 'jobdefinition_tests', ['test_id'],
+     None),
+    ('jobs_jobdefinition_id_idx', 'jobs', ['jobdefinition_id'], None),
+    ('jobs_remoteci_id_idx', 'jobs', ['remoteci_id'], None),
+    ('jobs_team_id_idx', 'jobs', ['team_id'], None),
+    ('jobs_status_idx', 'jobs', ['status'], None),
+    ('jobs_recheck_idx', 'jobs', ['remoteci_id'], sa.text('recheck')),
+    ('jobs_components_component_id_idx', 'jobs_components',
+     ['component_id'], None),
+    ('jobs_issues_issue_id_idx', 'jobs_issues', ['issue_id'], None),
+    ('jobstates_job_id_idx', 'jobstates', ['job_id'], None),
+    ('jobstates_team_id_idx', 'jobstates', ['team_id'], None),
+    ('files_job_id_idx', 'files', ['job_id'], None),
+    ('files_jobstate_id_idx', 'files', ['jobstate_id'], None),
+    ('files_team_id_idx', 'files', ['team_id'], None),
+    ('user_remotecis_remoteci_id_idx', 'user_remotecis', ['remoteci_id'],
+     None),
+    ('logs_team_id_created_at_idx', 'logs', ['team_id', 'created_at'], None),
+    ('logs_user_id_idx', 'logs', ['user_id'], None),
+]
+
+
+def upgrade():
+    # CREATE INDEX CONCURRENTLY does not lock the tables against writes but
+    # it can not run inside a transaction block, so end the one opened by
+    # alembic first. If a build fails it leaves an invalid index which must
+    # be dropped before running the migration again.
+    op.execute('COMMIT')
+    for name, table, columns, where in INDEXES:
+        op.create_index(name, table, columns, postgresql_where=where,
+                        postgresql_concurrently=True)
+
+
+def downgrade():
+    for name, table, _, _ in INDEXES:
+        op.drop_index(name, table)
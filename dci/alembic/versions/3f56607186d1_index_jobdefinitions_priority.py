@@ -0,0 +1,64 @@
+#
+# Copyright (C) 2016 Red Hat, Inc
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+"""Index jobdefinitions priority for the scheduler
+
+Revision ID: 3f56607186d1
+Revises: 3cda94ece583
+Create Date: 2016-08-29 14:05:52.180347
+
+"""
+
+# revision identifiers, used by Alembic.
+revision = '3f56607186d1'
+down_revision = '3cda94ece583'
+branch_labels = None
+depends_on = None
+
+from alembic import op
+
+
+def upgrade():
+    # the scheduler filters on these columns, they must not be NULL
+    op.execute('UPDATE jobdefinitions SET priority = 0 '
+               'WHERE priority IS NULL')
+    op.execute('UPDATE jobdefinitions SET active = true '
+               'WHERE active IS NULL')
+    op.alter_column('jobdefinitions', 'priority', nullable=False,
+                    server_default='0')
+    op.alter_column('jobdefinitions', 'active', nullable=False,
+                    server_default='true')
+
+    # CREATE INDEX CONCURRENTLY can not run inside a transaction block.
+    op.execute('COMMIT')
+    op.create_index('jobdefinitions_topic_id_active_priority_idx',
+                    'jobdefinitions', ['topic_id', 'active', 'priority'],
+                    postgresql_concurrently=True)
+    op.create_index('jobs_remoteci_id_jobdefinition_id_created_at_idx',
+                    'jobs', ['remoteci_id', 'jobdefinition_id', 'created_at'],
+                    postgresql_concurrently=True)
+    # superseded by the index above
+    op.execute('DROP INDEX CONCURRENTLY IF EXISTS jobs_remoteci_id_idx')
+
+
+def downgrade():
+    op.create_index('jobs_remoteci_id_idx', 'jobs', ['remoteci_id'])
+    op.drop_index('jobs_remoteci_id_jobdefinition_id_created_at_idx', 'jobs')
+    op.drop_index('jobdefinitions_topic_id_active_priority_idx',
+                  'jobdefinitions')
+    op.alter_column('jobdefinitions', 'active', nullable=True,
+                    server_default=None)
+    op.alter_column('jobdefinitions', 'priority', nullable=True,
+                    server_default=None)
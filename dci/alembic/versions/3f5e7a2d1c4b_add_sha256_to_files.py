@@ -0,0 +1,39 @@
+#
+# Copyright (C) 2016 Red Hat, Inc
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+"""Add the sha256 of the files
+
+Revision ID: 3f5e7a2d1c4b
+Revises: 2b5c6e0bd7f4
+Create Date: 2016-09-12 10:17:42.903512
+
+"""
+
+# revision identifiers, used by Alembic.
+revision = '3f5e7a2d1c4b'
+down_revision = '2b5c6e0bd7f4'
+branch_labels = None
+depends_on = None
+
+from alembic import op
+import sqlalchemy as sa
+
+
+def upgrade():
+    op.add_column('files', sa.Column('sha256', sa.String(64)))
+
+
+def downgrade():
+    op.drop_column('files', 'sha256')
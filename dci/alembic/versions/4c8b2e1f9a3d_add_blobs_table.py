@@ -0,0 +1,71 @@
+#
+# Copyright (C) 2016 Red Hat, Inc
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+"""Add the blobs table of the content addressed storage
+
+Revision ID: 4c8b2e1f9a3d
+Revises: 3f5e7a2d1c4b
+Create Date: 2016-09-14 16:05:31.448019
+
+"""
+
+# revision identifiers, used by Alembic.
+revision = '4c8b2e1f9a3d'
+down_revision = '3f5e7a2d1c4b'
+branch_labels = None
+depends_on = None
+
+import datetime
+
+from alembic import op
+import sqlalchemy as sa
+
+
+def upgrade():
+    op.create_table(
+        'blobs',
+        sa.Column('id', sa.String(64), primary_key=True),
+        sa.Column('created_at', sa.DateTime(),
+                  default=datetime.datetime.utcnow, nullable=False),
+        sa.Column('size', sa.BIGINT, nullable=True),
+        sa.Column('refcount', sa.Integer, nullable=False, default=0)
+    )
+    op.add_column('files', sa.Column('blob_id', sa.String(64),
+                                     sa.ForeignKey('blobs.id'),
+                                     nullable=True))
+    op.create_index('files_blob_id_idx', 'files', ['blob_id'])
+
+    # a blob loses a reference with every file deleted, the ones deleted by
+    # cascade with their job, jobstate or team included
+    op.execute("""
+CREATE OR REPLACE FUNCTION files_release_blob() RETURNS trigger AS $$
+BEGIN
+    UPDATE blobs SET refcount = refcount - 1 WHERE id = OLD.blob_id;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql
+""")
+    op.execute("""
+CREATE TRIGGER files_release_blob AFTER DELETE ON files
+FOR EACH ROW WHEN (OLD.blob_id IS NOT NULL)
+EXECUTE PROCEDURE files_release_blob()
+""")
+
+
+def downgrade():
+    op.execute('DROP TRIGGER files_release_blob ON files')
+    op.execute('DROP FUNCTION files_release_blob()')
+    op.drop_column('files', 'blob_id')
+    op.drop_table('blobs')
@@ -0,0 +1,64 @@
+#
+# Copyright (C) 2016 Red Hat, Inc
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+"""Add the tests_results table
+
+Revision ID: 56bed770668d
+Revises: 1969c1b92176
+Create Date: 2016-09-05 11:02:45.207301
+
+"""
+
+# revision identifiers, used by Alembic.
+revision = '56bed770668d'
+down_revision = '1969c1b92176'
+branch_labels = None
+depends_on = None
+
+import datetime
+
+from alembic import op
+import sqlalchemy as sa
+
+import dci.common.utils as utils
+
+
+def upgrade():
+    op.create_table(
+        'tests_results',
+        sa.Column('id', sa.String(36), primary_key=True,
+                  default=utils.gen_uuid),
+        sa.Column('created_at', sa.DateTime(),
+                  default=datetime.datetime.utcnow, nullable=False),
+        sa.Column('name', sa.String(255)),
+        sa.Column('total', sa.Integer, nullable=False),
+        sa.Column('success', sa.Integer, nullable=False),
+        sa.Column('skips', sa.Integer, nullable=False),
+        sa.Column('failures', sa.Integer, nullable=False),
+        sa.Column('errors', sa.Integer, nullable=False),
+        sa.Column('time', sa.Float),
+        sa.Column('valid', sa.Boolean, nullable=False, default=True),
+        sa.Column('file_id', sa.String(36),
+                  sa.ForeignKey('files.id', ondelete='CASCADE'),
+                  nullable=False, unique=True),
+        sa.Column('job_id', sa.String(36),
+                  sa.ForeignKey('jobs.id', ondelete='CASCADE'),
+                  nullable=True)
+    )
+    op.create_index('tests_results_job_id_idx', 'tests_results', ['job_id'])
+
+
+def downgrade():
+    op.drop_table('tests_results')
@@ -0,0 +1,41 @@
+#
+# Copyright (C) 2016 Red Hat, Inc
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+"""Add the content encoding of the files and blobs
+
+Revision ID: 5a9d3c7e2b16
+Revises: 4c8b2e1f9a3d
+Create Date: 2016-09-19 09:48:26.172940
+
+"""
+
+# revision identifiers, used by Alembic.
+revision = '5a9d3c7e2b16'
+down_revision = '4c8b2e1f9a3d'
+branch_labels = None
+depends_on = None
+
+from alembic import op
+import sqlalchemy as sa
+
+
+def upgrade():
+    op.add_column('files', sa.Column('encoding', sa.String(16)))
+    op.add_column('blobs', sa.Column('encoding', sa.String(16)))
+
+
+def downgrade():
+    op.drop_column('blobs', 'encoding')
+    op.drop_column('files', 'encoding')
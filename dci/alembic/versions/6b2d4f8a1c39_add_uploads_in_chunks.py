@@ -0,0 +1,76 @@
+#
+# Copyright (C) 2016 Red Hat, Inc
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+"""Add the uploads in chunks
+
+Revision ID: 6b2d4f8a1c39
+Revises: 5a9d3c7e2b16
+Create Date: 2016-09-21 14:22:08.516307
+
+"""
+
+# revision identifiers, used by Alembic.
+revision = '6b2d4f8a1c39'
+down_revision = '5a9d3c7e2b16'
+branch_labels = None
+depends_on = None
+
+import datetime
+
+from alembic import op
+import sqlalchemy as sa
+
+
+def upgrade():
+    op.create_table(
+        'uploads',
+        sa.Column('id', sa.String(36), primary_key=True),
+        sa.Column('created_at', sa.DateTime(),
+                  default=datetime.datetime.utcnow, nullable=False),
+        sa.Column('name', sa.String(255), nullable=False),
+        sa.Column('mime', sa.String),
+        sa.Column('md5', sa.String(32)),
+        sa.Column('sha256', sa.String(64)),
+        sa.Column('size', sa.BIGINT, nullable=False),
+        sa.Column('committing_at', sa.DateTime(), nullable=True),
+        sa.Column('jobstate_id', sa.String(36),
+                  sa.ForeignKey('jobstates.id', ondelete='SET NULL'),
+                  nullable=True),
+        sa.Column('team_id', sa.String(36),
+                  sa.ForeignKey('teams.id', ondelete='SET NULL'),
+                  nullable=True),
+        sa.Column('job_id', sa.String(36),
+                  sa.ForeignKey('jobs.id', ondelete='SET NULL'),
+                  nullable=True)
+    )
+    op.create_index('uploads_team_id_idx', 'uploads', ['team_id'])
+    op.create_index('uploads_created_at_idx', 'uploads', ['created_at'])
+
+    op.create_table(
+        'uploads_chunks',
+        sa.Column('upload_id', sa.String(36),
+                  sa.ForeignKey('uploads.id', ondelete='CASCADE'),
+                  primary_key=True),
+        sa.Column('offset', sa.BIGINT, primary_key=True),
+        sa.Column('created_at', sa.DateTime(),
+                  default=datetime.datetime.utcnow, nullable=False),
+        sa.Column('size', sa.BIGINT, nullable=False),
+        sa.Column('md5', sa.String(32), nullable=False)
+    )
+
+
+def downgrade():
+    op.drop_table('uploads_chunks')
+    op.drop_table('uploads')
@@ -0,0 +1,46 @@
+#
+# Copyright (C) 2016 Red Hat, Inc
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+"""Cache the issues tracker informations
+
+Revision ID: 9198b7404542
+Revises: 3f56607186d1
+Create Date: 2016-08-31 10:12:27.401853
+
+"""
+
+# revision identifiers, used by Alembic.
+revision = '9198b7404542'
+down_revision = '3f56607186d1'
+branch_labels = None
+depends_on = None
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql as pg
+
+
+def upgrade():
+    op.add_column('issues', sa.Column('data', pg.JSON))
+    op.add_column('issues', sa.Column('status_code', sa.Integer))
+    op.add_column('issues', sa.Column('refreshed_at', sa.DateTime()))
+    op.create_index('issues_refreshed_at_idx', 'issues', ['refreshed_at'])
+
+
+def downgrade():
+    op.drop_index('issues_refreshed_at_idx', 'issues')
+    op.drop_column('issues', 'refreshed_at')
+    op.drop_column('issues', 'status_code')
+    op.drop_column('issues', 'data')
@@ -47,11 +47,17 @@ def get_logs(user):
 
     q_bd = v1_utils.QueryBuilder(_TABLE, args['offset'], args['limit'])
     q_bd.sort = v1_utils.sort_query(args['sort'], _T_COLUMNS)
+    q_bd.paginate(args['sort'], args['cursor'])
 
     if not auth.is_admin(user):
         q_bd.where.append(_TABLE.c.team_id == team_id)
 
-    nb_row = flask.g.db_conn.execute(q_bd.build_nb_row()).scalar()
+    nb_row = q_bd.get_count(args['count'])
+    if args['stream'] or v1_utils.request_wants_ndjson():
+        return v1_utils.stream_rows('audits', q_bd, [], nb_row)
+
     rows = flask.g.db_conn.execute(q_bd.build()).fetchall()
 
-    return flask.jsonify({'audits': rows, '_meta': {'count': nb_row}})
+    return flask.jsonify({'audits': rows,
+                          '_meta': {'count': nb_row,
+                                    'next': q_bd.next_cursor(rows)}})
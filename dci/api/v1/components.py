@@ -71,7 +71,7 @@ def get_all_components(user, topic_id):
     q_bd.where = v1_utils.where_query(args['where'], _TABLE, _C_COLUMNS)
     q_bd.where.append(_TABLE.c.topic_id == topic_id)
 
-    nb_row = flask.g.db_conn.execute(q_bd.build_nb_row()).scalar()
+    nb_row = q_bd.get_count(args['count'])
     rows = flask.g.db_conn.execute(q_bd.build()).fetchall()
 
     return flask.jsonify({'components': rows, '_meta': {'count': nb_row}})
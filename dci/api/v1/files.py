@@ -15,11 +15,15 @@
 # under the License.
 
 import datetime
-import os
+import hashlib
 
 import flask
 from flask import json
+import lxml.etree as ET
+import werkzeug.wsgi
 
+from sqlalchemy.dialects import postgresql as pg
+from sqlalchemy import exc as sa_exc
 from sqlalchemy import sql
 
 from dci.api.v1 import api
@@ -30,10 +34,14 @@ from dci.common import exceptions as dci_exc
 from dci.common import schemas
 from dci.common import utils
 from dci.db import models
-from dci import dci_config
+from dci import stores
+from dci.stores import filesystem
+from dci.stores import swift
 
 
 _TABLE = models.FILES
+_UPLOADS = models.UPLOADS
+_CHUNKS = models.UPLOADS_CHUNKS
 # associate column names with the corresponding SA Column object
 _FILES_COLUMNS = v1_utils.get_columns_name_with_objects(_TABLE)
 _VALID_EMBED = {
@@ -42,7 +50,279 @@ _VALID_EMBED = {
     'team': v1_utils.embed(models.TEAMS)
 }
 
-_FILES_FOLDER = dci_config.generate_conf()['FILES_UPLOAD_FOLDER']
+# size of the chunks read from the uploads
+_CHUNK_SIZE = 1024 ** 2
+# stored for the files which are not valid JUnit files
+_INVALID_SUMMARY = {'name': None, 'total': 0, 'success': 0, 'skips': 0,
+                    'failures': 0, 'errors': 0, 'time': None}
+# more ranges than this in a Range header are answered with the whole file
+_MAX_RANGES = 32
+
+
+def _store():
+    """Return the store of the content of the files set by FILES_STORE."""
+    config = flask.current_app.config
+    if config.get('FILES_STORE', 'file') == 'swift':
+        return swift.SwiftStore(config['FILES_SWIFT_URL'],
+                                config.get('FILES_SWIFT_TOKEN'),
+                                config.get('FILES_SWIFT_TIMEOUT', 60))
+    return filesystem.FileStore(config['FILES_UPLOAD_FOLDER'])
+
+
+class _Digests(object):
+    """Compute the digests and the size of the chunks going through
+    update().
+    """
+
+    def __init__(self):
+        self.md5 = hashlib.md5()
+        self.sha256 = hashlib.sha256()
+        self.size = 0
+
+    def update(self, chunks):
+        for chunk in chunks:
+            self.md5.update(chunk)
+            self.sha256.update(chunk)
+            self.size += len(chunk)
+            yield chunk
+
+
+def _write_content(key, chunks, encoding=None):
+    """Store the chunks as the content of key, compressed with encoding."""
+    if encoding == 'gzip':
+        chunks = utils.gzip_chunks(chunks)
+    _store().put(key, chunks)
+
+
+def _read_content(key, encoding=None, store=None):
+    """Return an iterator of the chunks of the decompressed content of
+    key.
+    """
+    chunks = (store or _store()).get(key)
+    if encoding == 'gzip':
+        chunks = utils.gunzip_chunks(chunks)
+    return chunks
+
+
+def _read_range(key, start, stop, encoding=None, store=None):
+    """Return an iterator of the chunks of the decompressed content of key
+    from start to stop excluded.
+    """
+    store = store or _store()
+    if encoding is None:
+        return store.get_range(key, start, stop)
+    # a compressed content is read from its start
+    return utils.slice_chunks(_read_content(key, encoding, store), start,
+                              stop)
+
+
+def verify_md5(values, md5, key):
+    """Remove the content written and raise an error if its MD5 is not the
+    one sent by the client.
+    """
+    if values['md5'] is not None and values['md5'].lower() != md5:
+        _store().delete(key)
+        raise dci_exc.DCIException(
+            'MD5 mismatch: expected %s, received %s' % (values['md5'], md5),
+            status_code=400)
+
+
+def create_tests_results(file_values, key, encoding=None):
+    """Store the summary of a JUnit file in the tests_results table and the
+    outcome of its testcases in the tests_cases table, both read in a
+    single pass, so that the results of a job are read without parsing the
+    files again. Return the summary, None if it is not a valid JUnit file:
+    an invalid summary is stored so that it is not parsed again either.
+    """
+    job_id = file_values['job_id']
+    if job_id is None:
+        query = (sql.select([models.JOBSTATES.c.job_id])
+                 .where(models.JOBSTATES.c.id == file_values['jobstate_id']))
+        job_id = flask.g.db_conn.execute(query).scalar()
+
+    with utils.ChunksReader(_read_content(key, encoding)) as f:
+        summary, testcases = tsfm.junit_parse(f)
+        values = dict(summary or _INVALID_SUMMARY, valid=summary is not None)
+        values.update({
+            'id': utils.gen_uuid(),
+            'created_at': datetime.datetime.utcnow().isoformat(),
+            'file_id': file_values['id'],
+            'job_id': job_id
+        })
+        query = models.TESTS_RESULTS.insert().values(**values)
+        try:
+            flask.g.db_conn.execute(query)
+        except sa_exc.IntegrityError:
+            # already stored by a concurrent request
+            return summary
+
+        create_tests_cases(file_values['id'], job_id, testcases)
+    return summary
+
+
+def create_tests_cases(file_id, job_id, testcases, batch_size=1000):
+    """Store the outcome of the testcases of a JUnit file in the
+    tests_cases table.
+    """
+    query = models.TESTS_CASES.insert()
+    batch = []
+    try:
+        for testcase in testcases:
+            testcase.update({'file_id': file_id, 'job_id': job_id})
+            batch.append(testcase)
+            if len(batch) == batch_size:
+                flask.g.db_conn.execute(query, batch)
+                batch = []
+    except ET.XMLSyntaxError:
+        # the summary was read but the rest of the file is truncated
+        pass
+    if batch:
+        flask.g.db_conn.execute(query, batch)
+
+
+def _content_addressed():
+    return flask.current_app.config.get('FILES_CONTENT_ADDRESSED', False)
+
+
+def _compression():
+    return flask.current_app.config.get('FILES_COMPRESSION')
+
+
+def _reference_blob(key, sha256, size, encoding):
+    """Add a reference to the blob of a content, the content written at
+    key is copied to the blob if it does not exist yet. Return the key and
+    the encoding of the blob. The content at key is kept, the caller
+    removes it once the transaction is committed.
+
+    The blob stays locked until the end of the transaction, which
+    serializes its references and its removal by collect_blobs.
+    """
+    lock = sql.func.hashtext(sha256)
+    flask.g.db_conn.execute(
+        sql.select([sql.func.pg_advisory_xact_lock(lock)]))
+    blobs = models.BLOBS
+    query = pg.insert(blobs).values(
+        id=sha256, size=size, encoding=encoding, refcount=1,
+        created_at=datetime.datetime.utcnow().isoformat())
+    query = (query.on_conflict_do_update(
+        index_elements=[blobs.c.id],
+        set_={'refcount': blobs.c.refcount + 1})
+        .returning(blobs.c.refcount, blobs.c.encoding))
+    blob = flask.g.db_conn.execute(query).fetchone()
+
+    blob_key = v1_utils.build_blob_key(sha256)
+    if blob['refcount'] == 1:
+        _store().copy(key, blob_key)
+    return blob_key, blob['encoding']
+
+
+def _release_blob(blob_id):
+    """Remove a reference to a blob, it is removed by collect_blobs once it
+    has no reference left.
+    """
+    blobs = models.BLOBS
+    query = (blobs.update()
+             .where(blobs.c.id == blob_id)
+             .values(refcount=blobs.c.refcount - 1))
+    flask.g.db_conn.execute(query)
+
+
+def collect_blobs():
+    """Remove the blobs which lost their last reference, with their content.
+
+    The references are released by the files_release_blob trigger when the
+    files are deleted, including by cascade, this is called after the
+    deletions. The content of a blob is deleted once the removal of its row
+    is committed, under a lock which keeps it from being referenced again
+    meanwhile.
+    """
+    blobs = models.BLOBS
+    query = sql.select([blobs.c.id]).where(blobs.c.refcount <= 0)
+    for row in flask.g.db_conn.execute(query).fetchall():
+        lock = sql.func.hashtext(row['id'])
+        flask.g.db_conn.execute(sql.select([sql.func.pg_advisory_lock(lock)]))
+        try:
+            query = (blobs.delete()
+                     .where(sql.and_(blobs.c.id == row['id'],
+                                     blobs.c.refcount <= 0)))
+            with flask.g.db_conn.begin():
+                removed = flask.g.db_conn.execute(query).rowcount
+            if removed:
+                _store().delete(v1_utils.build_blob_key(row['id']))
+        finally:
+            flask.g.db_conn.execute(
+                sql.select([sql.func.pg_advisory_unlock(lock)]))
+
+
+def _insert_file(values, key, queries=()):
+    """Insert the row of a file written at key, with the queries given in
+    the same transaction, and return the key of its content.
+    """
+    # the values are returned, with all the fields of GET /files/<id>
+    values['blob_id'] = None
+    with flask.g.db_conn.begin():
+        if _content_addressed():
+            values['blob_id'] = values['sha256']
+            blob_key, values['encoding'] = _reference_blob(
+                key, values['sha256'], values['size'], values['encoding'])
+        flask.g.db_conn.execute(_TABLE.insert().values(**values))
+        for query in queries:
+            flask.g.db_conn.execute(query)
+
+    if values['blob_id'] is None:
+        return key
+    _store().delete(key)
+    return blob_key
+
+
+def _move_to_blob(file, key):
+    """Move a file stored before the content addressed storage was enabled
+    to its blob.
+    """
+    sha256 = file['sha256']
+    if sha256 is None:
+        sha256 = hashlib.sha256()
+        for chunk in _read_content(key, file['encoding']):
+            sha256.update(chunk)
+        sha256 = sha256.hexdigest()
+
+    with flask.g.db_conn.begin():
+        # the blob is referenced first, the file row points to it
+        _, encoding = _reference_blob(key, sha256, file['size'],
+                                      file['encoding'])
+        query = (_TABLE.update()
+                 .where(sql.and_(_TABLE.c.id == file['id'],
+                                 _TABLE.c.blob_id == None))  # noqa
+                 .values(blob_id=sha256, sha256=sha256, encoding=encoding))
+        if not flask.g.db_conn.execute(query).rowcount:
+            # moved by a concurrent request, drop the reference taken
+            _release_blob(sha256)
+    # the file row points to the blob now
+    _store().delete(key)
+
+
+def get_file_key(file):
+    """Return the key of the content of a file in the store and its
+    encoding. In the content addressed storage the files not stored in a
+    blob yet are moved to it.
+    """
+    blob_id, encoding = file['blob_id'], file['encoding']
+    key = v1_utils.build_file_key(file['team_id'], file['id'])
+
+    if blob_id is None and _content_addressed():
+        try:
+            _store().stat(key)
+        except stores.NotFound:
+            pass
+        else:
+            _move_to_blob(file, key)
+        query = (sql.select([_TABLE.c.blob_id, _TABLE.c.encoding])
+                 .where(_TABLE.c.id == file['id']))
+        blob_id, encoding = flask.g.db_conn.execute(query).fetchone()
+
+    if blob_id is None:
+        return key, encoding
+    return v1_utils.build_blob_key(blob_id), encoding
 
 
 # This is the old way to create a files, it assumes the content is provided
@@ -58,18 +338,27 @@ def _old_create_files(user):
     values.update({
         'id': file_id,
         'created_at': datetime.datetime.utcnow().isoformat(),
-        'team_id': user['team_id']
+        'team_id': user['team_id'],
+        'encoding': _compression()
     })
 
-    content = values.pop('content')
-    query = _TABLE.insert().values(**values)
-    flask.g.db_conn.execute(query)
+    content = values.pop('content').encode('utf-8')
+
+    key = v1_utils.build_file_key(user['team_id'], file_id)
+    _write_content(key, [content], values['encoding'])
+
+    md5 = hashlib.md5(content).hexdigest()
+    verify_md5(values, md5, key)
+    values.update({
+        'md5': md5,
+        'sha256': hashlib.sha256(content).hexdigest(),
+        'size': len(content)
+    })
+
+    key = _insert_file(values, key)
 
-    # ensure the team's path exist in the FS
-    file_path = v1_utils.build_file_path(_FILES_FOLDER, user['team_id'],
-                                         file_id)
-    with open(file_path, 'w') as f:
-        f.write(content)
+    if values.get('mime') == 'application/junit':
+        create_tests_results(values, key, values['encoding'])
 
     result = json.dumps({'file': values})
     return flask.Response(result, 201, content_type='application/json')
@@ -91,32 +380,335 @@ def create_files(user):
         raise dci_exc.DCIException('HTTP header DCI-NAME must be specified')
 
     file_id = utils.gen_uuid()
-    # ensure the directory which will contains the file actually exist
-    file_path = v1_utils.build_file_path(_FILES_FOLDER, user['team_id'],
-                                         file_id)
+    key = v1_utils.build_file_key(user['team_id'], file_id)
 
-    with open(file_path, 'wb') as f:
-        chunk_size = 4096
-        read = flask.request.stream.read
-        for chunk in iter(lambda: read(chunk_size) or None, None):
-            f.write(chunk)
-    file_size = os.path.getsize(file_path)
+    # the digests are computed while writing, the file is read only once
+    digests = _Digests()
+    encoding = _compression()
+    read = flask.request.stream.read
+    _write_content(key, digests.update(
+        iter(lambda: read(_CHUNK_SIZE) or None, None)), encoding)
 
+    verify_md5(values, digests.md5.hexdigest(), key)
     values.update({
         'id': file_id,
         'created_at': datetime.datetime.utcnow().isoformat(),
         'team_id': user['team_id'],
-        'md5': None,
-        'size': file_size
+        'md5': digests.md5.hexdigest(),
+        'sha256': digests.sha256.hexdigest(),
+        'size': digests.size,
+        'encoding': encoding
     })
 
-    query = _TABLE.insert().values(**values)
+    key = _insert_file(values, key)
+
+    if values['mime'] == 'application/junit':
+        create_tests_results(values, key, values['encoding'])
+
+    result = json.dumps({'file': values})
+    return flask.Response(result, 201, content_type='application/json')
+
+
+def _upload_live():
+    """Return the condition of the uploads not expired nor left by the
+    deletion of their team, job or jobstate.
+    """
+    ttl = flask.current_app.config.get('FILES_UPLOADS_TTL', 24 * 3600)
+    expired_at = datetime.datetime.utcnow() - datetime.timedelta(seconds=ttl)
+    return sql.and_(_UPLOADS.c.created_at > expired_at,
+                    _UPLOADS.c.team_id != None,  # noqa
+                    sql.or_(_UPLOADS.c.job_id != None,  # noqa
+                            _UPLOADS.c.jobstate_id != None))  # noqa
+
+
+def _upload_idle():
+    """Return the condition of the uploads not being committed, a commit
+    interrupted is given up after FILES_UPLOADS_COMMIT_TIMEOUT.
+    """
+    timeout = flask.current_app.config.get('FILES_UPLOADS_COMMIT_TIMEOUT',
+                                           3600)
+    given_up_at = (datetime.datetime.utcnow() -
+                   datetime.timedelta(seconds=timeout))
+    return sql.or_(_UPLOADS.c.committing_at == None,  # noqa
+                   _UPLOADS.c.committing_at < given_up_at)
+
+
+def _lock_upload(upload_id, read=False):
+    """Lock the row of an upload until the end of the transaction and
+    raise an error if it is being committed.
+    """
+    query = (sql.select([_UPLOADS.c.id, _upload_idle().label('idle')])
+             .where(sql.and_(_UPLOADS.c.id == upload_id, _upload_live()))
+             .with_for_update(read=read))
+    upload = flask.g.db_conn.execute(query).fetchone()
+    if upload is None:
+        raise dci_exc.DCINotFound('Upload', upload_id)
+    if not upload['idle']:
+        raise dci_exc.DCIException('Upload "%s" is being committed' %
+                                   upload_id, status_code=409)
+
+
+def _get_upload(user, upload_id):
+    query = (sql.select([_UPLOADS])
+             .where(sql.and_(_UPLOADS.c.id == upload_id, _upload_live())))
+    upload = flask.g.db_conn.execute(query).fetchone()
+    if upload is None:
+        raise dci_exc.DCINotFound('Upload', upload_id)
+    if not (auth.is_admin(user) or auth.is_in_team(user, upload['team_id'])):
+        raise auth.UNAUTHORIZED
+    return upload
+
+
+def _get_chunks(upload_id):
+    query = (sql.select([_CHUNKS])
+             .where(_CHUNKS.c.upload_id == upload_id)
+             .order_by(_CHUNKS.c.offset))
+    return flask.g.db_conn.execute(query).fetchall()
+
+
+def _delete_chunks(upload_id, chunks):
+    for chunk in chunks:
+        _store().delete(v1_utils.build_chunk_key(upload_id, chunk['offset']))
+
+
+def collect_uploads(limit=100):
+    """Remove at most limit uploads expired or whose team, job or jobstate
+    was deleted, then the content of their chunks once it is committed.
+    """
+    query = (sql.select([_UPLOADS.c.id])
+             .where(sql.and_(sql.not_(_upload_live()), _upload_idle()))
+             .limit(limit)
+             .with_for_update(skip_locked=True))
+    with flask.g.db_conn.begin():
+        uploads_ids = [row['id'] for row in
+                       flask.g.db_conn.execute(query).fetchall()]
+        if not uploads_ids:
+            return
+        query = (sql.select([_CHUNKS.c.upload_id, _CHUNKS.c.offset])
+                 .where(_CHUNKS.c.upload_id.in_(uploads_ids)))
+        chunks = flask.g.db_conn.execute(query).fetchall()
+        flask.g.db_conn.execute(_UPLOADS.delete()
+                                .where(_UPLOADS.c.id.in_(uploads_ids)))
+
+    for chunk in chunks:
+        _store().delete(v1_utils.build_chunk_key(chunk['upload_id'],
+                                                 chunk['offset']))
+
+
+@api.route('/files/uploads', methods=['POST'])
+@auth.requires_auth
+def create_upload(user):
+    """Start an upload in chunks, for the files too big to be sent in a
+    single request. The chunks, each one limited by MAX_CONTENT_LENGTH, are
+    sent in any order, possibly in parallel, then the upload is committed
+    to create the file.
+    """
+    values = schemas.upload.post(flask.request.json)
+
+    if values.get('jobstate_id') is None and values.get('job_id') is None:
+        raise dci_exc.DCIException('jobstate_id or job_id must be specified',
+                                   status_code=400)
+
+    # the abandoned uploads are removed along the new ones
+    collect_uploads()
+
+    values.update({
+        'id': utils.gen_uuid(),
+        'created_at': datetime.datetime.utcnow().isoformat(),
+        'team_id': user['team_id'],
+        'committing_at': None
+    })
+    flask.g.db_conn.execute(_UPLOADS.insert().values(**values))
+
+    result = json.dumps({'upload': values})
+    return flask.Response(result, 201, content_type='application/json')
+
+
+@api.route('/files/uploads/<upload_id>', methods=['GET'])
+@auth.requires_auth
+def get_upload(user, upload_id):
+    """Get an upload with the chunks received, to resume it."""
+    upload = dict(_get_upload(user, upload_id))
+    upload['chunks'] = [{'offset': chunk['offset'], 'size': chunk['size'],
+                         'md5': chunk['md5']}
+                        for chunk in _get_chunks(upload_id)]
+
+    return json.jsonify({'upload': upload})
+
+
+@api.route('/files/uploads/<upload_id>/chunks/<int:offset>',
+           methods=['PUT'])
+@auth.requires_auth
+def put_upload_chunk(user, upload_id, offset):
+    """Write the body of the request at offset in the file uploaded. A
+    chunk sent again at the same offset replaces the previous one, its MD5
+    is verified if the DCI-MD5 header is given.
+    """
+    upload = _get_upload(user, upload_id)
+    _lock_upload(upload_id)
+
+    values = {'md5': flask.request.headers.get('DCI-MD5')}
+    key = v1_utils.build_chunk_key(upload_id, offset)
+    # written aside, a commit may start meanwhile
+    tmp_key = '%s.%s.tmp' % (key, utils.gen_uuid())
+
+    digests = _Digests()
+    read = flask.request.stream.read
+    _store().put(tmp_key, digests.update(
+        iter(lambda: read(_CHUNK_SIZE) or None, None)))
+
+    verify_md5(values, digests.md5.hexdigest(), tmp_key)
+    if offset + digests.size > upload['size']:
+        _store().delete(tmp_key)
+        raise dci_exc.DCIException(
+            'The chunk ends after the size of the upload, %s bytes' %
+            upload['size'], status_code=400)
+
+    chunk = {'upload_id': upload_id,
+             'offset': offset,
+             'created_at': datetime.datetime.utcnow().isoformat(),
+             'size': digests.size,
+             'md5': digests.md5.hexdigest()}
+    query = pg.insert(_CHUNKS).values(**chunk)
+    query = query.on_conflict_do_update(
+        index_elements=[_CHUNKS.c.upload_id, _CHUNKS.c.offset],
+        set_={'created_at': query.excluded.created_at,
+              'size': query.excluded.size,
+              'md5': query.excluded.md5})
+    try:
+        with flask.g.db_conn.begin():
+            # a commit or a deletion of the upload waits for the chunk
+            _lock_upload(upload_id, read=True)
+            _store().rename(tmp_key, key)
+            flask.g.db_conn.execute(query)
+    except dci_exc.DCIException:
+        _store().delete(tmp_key)
+        raise
+
+    result = json.dumps({'chunk': chunk})
+    return flask.Response(result, 201, content_type='application/json')
+
+
+def _read_chunks(upload_id, chunks):
+    """Yield the content of the chunks of an upload one after the other."""
+    for chunk in chunks:
+        size = 0
+        key = v1_utils.build_chunk_key(upload_id, chunk['offset'])
+        for data in _store().get(key):
+            size += len(data)
+            yield data
+        if size != chunk['size']:
+            # replaced by a concurrent request
+            raise dci_exc.DCIException(
+                'The chunk at offset %s changed, send it again' %
+                chunk['offset'], status_code=409)
+
+
+def _commit_upload(upload):
+    upload_id = upload['id']
+    chunks = _get_chunks(upload_id)
+
+    # the chunks must follow each other without gap from 0 to the size
+    offset = 0
+    for chunk in chunks:
+        if chunk['offset'] != offset:
+            break
+        offset += chunk['size']
+    if offset != upload['size'] or offset != sum(c['size'] for c in chunks):
+        raise dci_exc.DCIException(
+            'Upload incomplete: chunks missing or overlapping at offset %s' %
+            offset, status_code=409)
+
+    # the file takes the id of the upload, a client which did not get the
+    # answer of the commit finds it there
+    key = v1_utils.build_file_key(upload['team_id'], upload_id)
+    digests = _Digests()
+    encoding = _compression()
+    _write_content(key, digests.update(_read_chunks(upload_id, chunks)),
+                   encoding)
+
+    verify_md5(upload, digests.md5.hexdigest(), key)
+    if (upload['sha256'] is not None and
+            upload['sha256'].lower() != digests.sha256.hexdigest()):
+        _store().delete(key)
+        raise dci_exc.DCIException(
+            'SHA-256 mismatch: expected %s, received %s' %
+            (upload['sha256'], digests.sha256.hexdigest()), status_code=400)
+
+    values = {
+        'id': upload_id,
+        'created_at': datetime.datetime.utcnow().isoformat(),
+        'name': upload['name'],
+        'mime': upload['mime'],
+        'jobstate_id': upload['jobstate_id'],
+        'job_id': upload['job_id'],
+        'team_id': upload['team_id'],
+        'md5': digests.md5.hexdigest(),
+        'sha256': digests.sha256.hexdigest(),
+        'size': digests.size,
+        'encoding': encoding
+    }
+    # the upload is removed with the creation of its file, a commit
+    # interrupted before can be retried
+    key = _insert_file(values, key, [_UPLOADS.delete()
+                                     .where(_UPLOADS.c.id == upload_id)])
+    _delete_chunks(upload_id, chunks)
+
+    if values['mime'] == 'application/junit':
+        create_tests_results(values, key, values['encoding'])
+    return values
+
+
+@api.route('/files/uploads/<upload_id>/commit', methods=['POST'])
+@auth.requires_auth
+def commit_upload(user, upload_id):
+    """Assemble the chunks of an upload in a file. The chunks are read one
+    after the other from the store and the digests computed on the way, the
+    file is never in memory.
+    """
+    _get_upload(user, upload_id)
+
+    # only one commit at a time, the chunks can not be sent during it
+    query = (_UPLOADS.update()
+             .where(sql.and_(_UPLOADS.c.id == upload_id, _upload_idle()))
+             .values(committing_at=datetime.datetime.utcnow())
+             .returning(*_UPLOADS.c))
+    upload = flask.g.db_conn.execute(query).fetchone()
+    if upload is None:
+        raise dci_exc.DCIException('Upload "%s" is being committed' %
+                                   upload_id, status_code=409)
+
+    try:
+        values = _commit_upload(upload)
+    except Exception:
+        # the missing or wrong chunks can be sent again
+        query = (_UPLOADS.update()
+                 .where(_UPLOADS.c.id == upload_id)
+                 .values(committing_at=None))
+        flask.g.db_conn.execute(query)
+        raise
 
-    flask.g.db_conn.execute(query)
     result = json.dumps({'file': values})
     return flask.Response(result, 201, content_type='application/json')
 
 
+@api.route('/files/uploads/<upload_id>', methods=['DELETE'])
+@auth.requires_auth
+def delete_upload(user, upload_id):
+    """Abort an upload and remove its chunks."""
+    _get_upload(user, upload_id)
+
+    with flask.g.db_conn.begin():
+        # the chunks being sent are recorded first
+        _lock_upload(upload_id)
+        chunks = _get_chunks(upload_id)
+        flask.g.db_conn.execute(_UPLOADS.delete()
+                                .where(_UPLOADS.c.id == upload_id))
+    _delete_chunks(upload_id, chunks)
+
+    return flask.Response(None, 204, content_type='application/json')
+
+
 @api.route('/files', methods=['GET'])
 @auth.requires_auth
 def get_all_files(user, j_id=None):
@@ -130,6 +722,7 @@ def get_all_files(user, j_id=None):
 
     q_bd.join(embed)
     q_bd.sort = v1_utils.sort_query(args['sort'], _FILES_COLUMNS)
+    q_bd.paginate(args['sort'], args['cursor'])
     q_bd.where = v1_utils.where_query(args['where'], _TABLE, _FILES_COLUMNS)
 
     # If it's not an admin then restrict the view to the team's file
@@ -140,12 +733,17 @@ def get_all_files(user, j_id=None):
         q_bd.where.append(_TABLE.c.job_id == j_id)
 
     # get the number of rows for the '_meta' section
-    nb_row = flask.g.db_conn.execute(q_bd.build_nb_row()).scalar()
+    nb_row = q_bd.get_count(args['count'])
+    if args['stream'] or v1_utils.request_wants_ndjson():
+        return v1_utils.stream_rows('files', q_bd, embed, nb_row)
+
     rows = flask.g.db_conn.execute(q_bd.build()).fetchall()
+    next_cursor = q_bd.next_cursor(rows)
 
     result = [v1_utils.group_embedded_resources(embed, row) for row in rows]
 
-    return json.jsonify({'files': result, '_meta': {'count': nb_row}})
+    return json.jsonify({'files': result,
+                         '_meta': {'count': nb_row, 'next': next_cursor}})
 
 
 @api.route('/files/<file_id>', methods=['GET'])
@@ -173,6 +771,137 @@ def get_file_by_id_or_name(user, file_id):
     return result
 
 
+def _send_file(file, key, size, encoding):
+    """Send the content of a file with the FILES_DELIVERY mode, the proxy
+    modes free the worker as soon as the access has been checked. A
+    compressed file is sent as is to the clients accepting its encoding and
+    decompressed by the worker for the others.
+
+    size is the size of the content in the store.
+    """
+    config = flask.current_app.config
+    delivery = config.get('FILES_DELIVERY', 'stream')
+    # resolved once, the response is sent out of the application context
+    store = _store()
+    file_path = store.local_path(key)
+    if file_path is None:
+        # the other modes need a local file
+        delivery = 'stream'
+    content_type = file['mime'] or 'text/plain'
+    headers = {}
+    etag = file['sha256'] or file['md5']
+
+    if encoding is not None:
+        headers['Vary'] = 'Accept-Encoding'
+        if flask.request.accept_encodings[encoding]:
+            headers['Content-Encoding'] = encoding
+            # each representation has its own strong ETag
+            etag = etag and '%s-%s' % (etag, encoding)
+            encoding = None
+        else:
+            delivery = 'stream'
+
+    if delivery == 'x-sendfile':
+        headers['X-Sendfile'] = file_path
+        return flask.Response(None, content_type=content_type,
+                              headers=headers)
+    elif delivery == 'x-accel-redirect':
+        location = config.get('FILES_ACCEL_REDIRECT_LOCATION', '/files/')
+        headers['X-Accel-Redirect'] = location.rstrip('/') + '/' + key
+        return flask.Response(None, content_type=content_type,
+                              headers=headers)
+
+    if encoding is not None:
+        size = file['size']
+    headers['Accept-Ranges'] = 'bytes'
+    if etag is not None:
+        headers['ETag'] = '"%s"' % etag
+
+    ranges = _requested_ranges(size, etag)
+    if ranges == []:
+        headers['Content-Range'] = 'bytes */%s' % size
+        return flask.Response(None, 416, content_type=content_type,
+                              headers=headers)
+    elif ranges is not None:
+        return _send_ranges(store, key, size, ranges, content_type,
+                            headers, encoding)
+
+    headers['Content-Length'] = size
+    if delivery == 'file_wrapper':
+        data = werkzeug.wsgi.wrap_file(flask.request.environ,
+                                       open(file_path, 'rb'),
+                                       buffer_size=_CHUNK_SIZE)
+        return flask.Response(data, content_type=content_type,
+                              headers=headers, direct_passthrough=True)
+
+    return flask.Response(_read_content(key, encoding, store),
+                          content_type=content_type, headers=headers)
+
+
+def _requested_ranges(size, etag):
+    """Return the (start, stop) byte ranges of the Range header, an empty
+    list if none can be satisfied or None if the whole file must be sent.
+    """
+    request = flask.request
+    if request.range is None or request.range.units != 'bytes':
+        return None
+    if len(request.range.ranges) > _MAX_RANGES:
+        return None
+
+    # If-Range: the ranges are only sent if the file did not change, a
+    # date or a weak ETag is not precise enough to tell
+    if_range = request.headers.get('If-Range')
+    if if_range is not None and (
+            if_range.startswith('W/') or etag is None or
+            request.if_range.etag != etag):
+        return None
+
+    ranges = []
+    for start, stop in request.range.ranges:
+        if start < 0:
+            start, stop = max(size + start, 0), size
+        else:
+            stop = size if stop is None else min(stop, size)
+        if start < stop:
+            ranges.append((start, stop))
+    return ranges
+
+
+def _send_ranges(store, key, size, ranges, content_type, headers,
+                 encoding):
+    if len(ranges) == 1:
+        start, stop = ranges[0]
+        headers.update({
+            'Content-Range': 'bytes %s-%s/%s' % (start, stop - 1, size),
+            'Content-Length': stop - start
+        })
+        data = _read_range(key, start, stop, encoding, store)
+        return flask.Response(data, 206, content_type=content_type,
+                              headers=headers)
+
+    boundary = utils.gen_uuid()
+    parts = [(('--%s\r\nContent-Type: %s\r\n'
+               'Content-Range: bytes %s-%s/%s\r\n\r\n' %
+               (boundary, content_type, start, stop - 1, size))
+              .encode('utf-8'), start, stop) for start, stop in ranges]
+    end = ('--%s--\r\n' % boundary).encode('utf-8')
+
+    def generate():
+        for part_headers, start, stop in parts:
+            yield part_headers
+            for chunk in _read_range(key, start, stop, encoding, store):
+                yield chunk
+            yield b'\r\n'
+        yield end
+
+    headers['Content-Length'] = len(end) + sum(
+        len(part_headers) + stop - start + 2
+        for part_headers, start, stop in parts)
+    return flask.Response(
+        generate(), 206, headers=headers,
+        content_type='multipart/byteranges; boundary=%s' % boundary)
+
+
 @api.route('/files/<file_id>/content', methods=['GET'])
 @auth.requires_auth
 def get_file_content(user, file_id):
@@ -181,23 +910,23 @@ def get_file_content(user, file_id):
     if not (auth.is_admin(user) or auth.is_in_team(user, file['team_id'])):
         raise auth.UNAUTHORIZED
 
-    file_path = v1_utils.build_file_path(_FILES_FOLDER, file['team_id'],
-                                         file_id, create=False)
+    key, encoding = get_file_key(file)
 
-    if not os.path.exists(file_path):
+    try:
+        size = _store().stat(key)['size']
+    except stores.NotFound:
         raise dci_exc.DCIException('Internal server file: not existing',
                                    status_code=404)
 
     if flask.request.is_xhr and file['mime'] == 'application/junit':
-        data = ''.join([s for s in utils.read(file_path, mode='r')])
-        data = tsfm.junit2json(data)
+        with utils.ChunksReader(_read_content(key, encoding)) as f:
+            data = tsfm.junit_file2json(f)
         headers = {
             'Content-Length': len(data),
             'Content-Disposition': 'attachment; filename=%s' % file['name']
         }
     else:
-        data = utils.read(file_path)
-        headers = {'Content-Length': file['size']}
+        return _send_file(file, key, size, encoding)
 
     return flask.Response(
         data, content_type=file['mime'] or 'text/plain', headers=headers
@@ -220,4 +949,6 @@ def delete_file_by_id(user, file_id):
     if not result.rowcount:
         raise dci_exc.DCIDeleteConflict('File', file_id)
 
+    collect_blobs()
+
     return flask.Response(None, 204, content_type='application/json')
@@ -16,6 +16,8 @@
 
 import datetime
 import flask
+import logging
+import threading
 
 from flask import json
 from sqlalchemy import sql
@@ -25,37 +27,153 @@ from dci.common import exceptions as dci_exc
 from dci.common import schemas
 from dci.common import utils
 from dci.db import models
+from dci import trackers
 from dci.trackers import github
 from dci.trackers import bugzilla
 
 
-_TABLE = models.ISSUES
-
-
-def get_all_issues(job_id):
-    """Get all issues for a specific job."""
-
-    v1_utils.verify_existence_and_get(job_id, models.JOBS)
+LOG = logging.getLogger(__name__)
 
+_TABLE = models.ISSUES
+_TRACKERS = {'github': github.Github, 'bugzilla': bugzilla.Bugzilla}
+
+
+def _retrieve_infos(db_conn, issues):
+    """Retrieve concurrently the informations of the issues from their
+    tracker, store them in the issues table and return them by issue id.
+
+    The issues whose tracker failed or answered an error are left out, they
+    keep their last known informations.
+    """
+    infos = trackers.retrieve_all([
+        (_TRACKERS[issue['tracker']], issue['url'],
+         {'etag': issue['etag'], 'last_modified': issue['last_modified']}
+         if issue['etag'] or issue['last_modified'] else None)
+        for issue in issues])
+    values_by_id = {}
+    for issue, info in zip(issues, infos):
+        if info is None:
+            continue
+        values = {'refreshed_at': datetime.datetime.utcnow()}
+        status_code = info['status_code']
+        if status_code in (200, 404):
+            # the issue changed since the stored informations
+            values.update({'etag': info.pop('etag', None),
+                           'last_modified': info.pop('last_modified', None),
+                           'status_code': info.pop('status_code'),
+                           'data': info})
+        db_conn.execute(_TABLE.update().where(_TABLE.c.id == issue['id'])
+                        .values(**values))
+        if status_code in (200, 304, 404):
+            values_by_id[issue['id']] = values
+    return values_by_id
+
+
+def _dump(issue):
+    """Return the issue merged with its tracker informations."""
+    issue = dict(issue)
+    del issue['etag'], issue['last_modified']
+    issue.update(issue.pop('data') or {})
+    return issue
+
+
+def get_issues(job_id):
+    """Return the issues of a job with the informations of their tracker.
+
+    The informations are stored in the database when the issue is read for
+    the first time, the IssuesRefresher keeps them up to date afterwards.
+    Until a tracker answers, the informations of its issues are missing.
+    """
     JJI = models.JOIN_JOBS_ISSUES
 
     query = (sql.select([_TABLE])
              .select_from(JJI.join(_TABLE))
              .where(JJI.c.job_id == job_id))
-    rows = flask.g.db_conn.execute(query)
-    rows = [dict(row) for row in rows]
+    rows = [dict(row) for row in flask.g.db_conn.execute(query)]
+
+    missing = [row for row in rows if row['status_code'] is None]
+    if missing:
+        infos = _retrieve_infos(flask.g.db_conn, missing)
+        for row in missing:
+            row.update(infos.get(row['id'], {}))
 
-    for row in rows:
-        if row['tracker'] == 'github':
-            l_tracker = github.Github(row['url'])
-        elif row['tracker'] == 'bugzilla':
-            l_tracker = bugzilla.Bugzilla(row['url'])
-        row.update(l_tracker.dump())
+    return [_dump(row) for row in rows]
+
+
+def get_all_issues(job_id):
+    """Get all issues for a specific job."""
+
+    v1_utils.verify_existence_and_get(job_id, models.JOBS)
+    rows = get_issues(job_id)
 
     return flask.jsonify({'issues': rows,
                           '_meta': {'count': len(rows)}})
 
 
+def refresh_issues(db_conn, ttl, limit=100):
+    """Refresh the informations of at most limit issues older than ttl
+    seconds and return the number of issues refreshed.
+
+    The issues are claimed by setting their refreshed_at so that concurrent
+    refreshers, one per API server, do not fetch the same ones.
+    """
+    now = datetime.datetime.utcnow()
+    stale = sql.or_(_TABLE.c.refreshed_at == None,  # noqa
+                    _TABLE.c.refreshed_at <
+                    now - datetime.timedelta(seconds=ttl))
+    claimed = (sql.select([_TABLE.c.id])
+               .where(stale)
+               .order_by(_TABLE.c.refreshed_at.asc().nullsfirst())
+               .limit(limit)
+               .with_for_update(skip_locked=True))
+    query = (_TABLE.update()
+             .where(_TABLE.c.id.in_(claimed))
+             .values(refreshed_at=now)
+             .returning(_TABLE.c.id, _TABLE.c.url, _TABLE.c.tracker,
+                        _TABLE.c.etag, _TABLE.c.last_modified))
+    issues = db_conn.execute(query).fetchall()
+
+    if issues:
+        # the issues whose tracker failed keep their previous informations,
+        # they are retried after the ttl
+        refreshed = _retrieve_infos(db_conn, issues)
+        if len(refreshed) < len(issues):
+            LOG.warning('issues: unable to refresh %s issues' %
+                        (len(issues) - len(refreshed)))
+    return len(issues)
+
+
+class IssuesRefresher(threading.Thread):
+    """Background thread refreshing every interval seconds the issues whose
+    tracker informations are older than ttl seconds.
+    """
+
+    def __init__(self, engine, ttl, interval):
+        super(IssuesRefresher, self).__init__(name='issues-refresher')
+        self.daemon = True
+        self.engine = engine
+        self.ttl = ttl
+        self.interval = interval
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.wait(self.interval):
+            try:
+                with self.engine.connect() as db_conn:
+                    while refresh_issues(db_conn, self.ttl):
+                        pass
+            except Exception:
+                LOG.exception('issues: refresh failed')
+
+    def stop(self, timeout=10):
+        """Stop the thread, waiting for the refresh in progress during at
+        most timeout seconds.
+        """
+        self._stop_event.set()
+        if self.is_alive():
+            self.join(timeout)
+
+
 def unattach_issue(job_id, issue_id):
     """Unattach an issue from a specific job."""
 
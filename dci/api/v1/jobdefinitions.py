@@ -81,7 +81,7 @@ def _get_all_jobdefinitions(user, topic_id=None):
         q_bd.where.append(_TABLE.c.topic_id == topic_id)
 
     # get the number of rows for the '_meta' section
-    nb_row = flask.g.db_conn.execute(q_bd.build_nb_row()).scalar()
+    nb_row = q_bd.get_count(args['count'])
     rows = flask.g.db_conn.execute(q_bd.build()).fetchall()
 
     return flask.jsonify({'jobdefinitions': rows, '_meta': {'count': nb_row}})
@@ -19,11 +19,11 @@ import datetime
 import flask
 from flask import json
 import six
+from sqlalchemy import func
 from sqlalchemy import sql
 
 
 from dci.api.v1 import api
-from dci.api.v1 import transformations as tsfm
 from dci.api.v1 import utils as v1_utils
 from dci import auth
 from dci.common import audits
@@ -35,10 +35,8 @@ from dci.db import models
 from dci.api.v1 import files
 from dci.api.v1 import issues
 from dci.api.v1 import jobstates
-from dci import dci_config
 
 
-_FILES_FOLDER = dci_config.generate_conf()['FILES_UPLOAD_FOLDER']
 _TABLE = models.JOBS
 # associate column names with the corresponding SA Column object
 _JOBS_COLUMNS = v1_utils.get_columns_name_with_objects(_TABLE)
@@ -49,6 +47,8 @@ _VALID_EMBED = {
     'team': v1_utils.embed(models.TEAMS),
     'remoteci': v1_utils.embed(models.REMOTECIS)
 }
+# the status kept for a testcase found in several files of a job, the worst
+_TESTCASES_PRECEDENCE = ['error', 'failure', 'skipped', 'success']
 
 
 @api.route('/jobs', methods=['POST'])
@@ -133,13 +133,39 @@ def search_jobs(user):
 
 
 def _recheck_job(remoteci_id):
-    """Return a job to recheck if one exists."""
+    """Return a job to recheck if one exists.
+
+    The job is locked until the end of the transaction, the jobs already
+    locked by a concurrent scheduling are skipped instead of waited for.
+    """
     # First try to get some job to recheck
     where_clause = sql.expression.and_(
         _TABLE.c.recheck == True,  # noqa
         _TABLE.c.remoteci_id == remoteci_id
     )
-    return sql.select([_TABLE]).where(where_clause).limit(1)
+    return (sql.select([_TABLE]).where(where_clause).limit(1)
+            .with_for_update(skip_locked=True))
+
+
+def _kill_running_jobs(remoteci_id, recheck_job_id=None):
+    """Flag as 'killed' all the running jobs of the remoteci.
+
+    The jobs locked by a concurrent scheduling, for instance the job it is
+    rechecking, are left to it.
+    """
+    where_clause = sql.expression.and_(
+        _TABLE.c.remoteci_id == remoteci_id,
+        _TABLE.c.status.in_(('new', 'pre-run', 'running', 'post-run'))
+    )
+    if recheck_job_id is not None:
+        where_clause = sql.expression.and_(where_clause,
+                                           _TABLE.c.id != recheck_job_id)
+    running_jobs = (sql.select([_TABLE.c.id]).where(where_clause)
+                    .with_for_update(skip_locked=True))
+    kill_query = (_TABLE.update()
+                  .where(_TABLE.c.id.in_(running_jobs))
+                  .values(status='killed'))
+    flask.g.db_conn.execute(kill_query)
 
 
 def _build_recheck(recheck_job, values):
@@ -157,12 +183,64 @@ def _build_recheck(recheck_job, values):
     return recheck_job
 
 
+def _get_latest_components(topic_id, component_types):
+    """Return the ids of the latest components of the topic for each of the
+    given types, in the same order.
+    """
+    # DISTINCT ON keeps the first row of each type according to the ORDER BY
+    # clause, i.e. the most recent component.
+    where_clause = sql.and_(models.COMPONENTS.c.type.in_(component_types),
+                            models.COMPONENTS.c.topic_id == topic_id)
+    query = (sql.select([models.COMPONENTS.c.type, models.COMPONENTS.c.id])
+             .where(where_clause)
+             .order_by(models.COMPONENTS.c.type,
+                       sql.desc(models.COMPONENTS.c.created_at))
+             .distinct(models.COMPONENTS.c.type))
+    latest_components = dict(flask.g.db_conn.execute(query).fetchall())
+
+    missing_types = [ct for ct in component_types
+                     if ct not in latest_components]
+    if missing_types:
+        msg = ('Component of type "%s" not found.' %
+               '", "'.join(missing_types))
+        raise dci_exc.DCIException(msg, payload={'types': missing_types},
+                                   status_code=412)
+
+    return [latest_components[ct] for ct in component_types]
+
+
+def _get_jobdefinition_to_run(topic_id, remoteci_id):
+    """Return the next jobdefinition of the topic to run on the remoteci.
+
+    Only the active jobdefinitions with the highest priority are candidates,
+    the one the remoteci ran the least recently (or never) is chosen so that
+    the remoteci rotates among them. Both lookups are index scans.
+    """
+    JD = models.JOBDEFINITIONS
+    runnable = sql.and_(JD.c.topic_id == topic_id, JD.c.active == True)  # noqa
+
+    top_priority = (sql.select([func.max(JD.c.priority)])
+                    .where(runnable)
+                    .correlate(None))
+
+    last_run = (sql.select([_TABLE.c.created_at])
+                .where(sql.and_(_TABLE.c.remoteci_id == remoteci_id,
+                                _TABLE.c.jobdefinition_id == JD.c.id))
+                .order_by(sql.desc(_TABLE.c.created_at))
+                .limit(1)
+                .as_scalar())
+
+    query = (sql.select([JD])
+             .where(sql.and_(runnable,
+                             JD.c.priority == top_priority.as_scalar()))
+             .order_by(last_run.asc().nullsfirst(),
+                       sql.desc(JD.c.created_at))
+             .limit(1))
+    return flask.g.db_conn.execute(query).fetchone()
+
+
 def _build_new_template(topic_id, remoteci, values):
-    # Get a jobdefinition
-    q_jd = sql.select([models.JOBDEFINITIONS]).where(
-        models.JOBDEFINITIONS.c.topic_id == topic_id).order_by(
-        sql.desc(models.JOBDEFINITIONS.c.created_at))
-    jd_to_run = flask.g.db_conn.execute(q_jd).fetchone()
+    jd_to_run = _get_jobdefinition_to_run(topic_id, remoteci['id'])
 
     if jd_to_run is None:
         msg = 'Jobdefinition not found.'
@@ -176,43 +254,30 @@ def _build_new_template(topic_id, remoteci, values):
                jd_to_run['id'])
         raise dci_exc.DCIException(msg, status_code=412)
 
-    # TODO(yassine): use a tricky join/group by to remove the for clause
-    schedule_components_ids = []
-    for ct in component_types:
-        where_clause = sql.and_(models.COMPONENTS.c.type == ct,
-                                models.COMPONENTS.c.topic_id == topic_id)
-        query = (sql.select([models.COMPONENTS.c.id])
-                 .where(where_clause)
-                 .order_by(sql.desc(models.COMPONENTS.c.created_at)))
-        cmpt_id = flask.g.db_conn.execute(query).fetchone()[0]
-
-        if cmpt_id is None:
-            msg = 'Component of type "%s" not found.' % ct
-            raise dci_exc.DCIException(msg, status_code=412)
+    if len(set(component_types)) != len(component_types):
+        msg = ('Jobdefinition "%s" malformed: component types duplicated.' %
+               jd_to_run['id'])
+        raise dci_exc.DCIException(msg, status_code=412)
 
-        if cmpt_id in schedule_components_ids:
-            msg = ('Jobdefinition "%s" malformed: type "%s" duplicated.' %
-                   (jd_to_run['id'], ct))
-            raise dci_exc.DCIException(msg, status_code=412)
-        schedule_components_ids.append(cmpt_id)
+    schedule_components_ids = _get_latest_components(topic_id,
+                                                     component_types)
 
     values.update({
         'jobdefinition_id': jd_to_run['id'],
         'team_id': remoteci['team_id']
     })
 
-    with flask.g.db_conn.begin():
-        # create the job
-        flask.g.db_conn.execute(_TABLE.insert().values(**values))
-
-        # Adds the components to the jobs using join_jobs_components
-        job_components = [
-            {'job_id': values['id'], 'component_id': sci}
-            for sci in schedule_components_ids
-        ]
-        flask.g.db_conn.execute(
-            models.JOIN_JOBS_COMPONENTS.insert(), job_components
-        )
+    # create the job
+    flask.g.db_conn.execute(_TABLE.insert().values(**values))
+
+    # Adds the components to the jobs using join_jobs_components
+    job_components = [
+        {'job_id': values['id'], 'component_id': sci}
+        for sci in schedule_components_ids
+    ]
+    flask.g.db_conn.execute(
+        models.JOIN_JOBS_COMPONENTS.insert(), job_components
+    )
 
     return values
 
@@ -233,14 +298,6 @@ def _validate_input(values, user):
     remoteci = v1_utils.verify_existence_and_get(remoteci_id, models.REMOTECIS)
     v1_utils.verify_existence_and_get(topic_id, models.TOPICS)
 
-    # let's kill existing running jobs for the remoteci
-    where_clause = sql.expression.and_(
-        _TABLE.c.remoteci_id == remoteci_id,
-        _TABLE.c.status.in_(('new', 'pre-run', 'running', 'post-run'))
-    )
-    kill_query = _TABLE .update().where(where_clause).values(status='killed')
-    flask.g.db_conn.execute(kill_query)
-
     if remoteci['active'] is False:
         message = 'RemoteCI "%s" is disabled.' % remoteci_id
         raise dci_exc.DCIException(message, status_code=412)
@@ -259,11 +316,16 @@ def schedule_jobs(user):
     in the following order:
     - to reuse an existing job associated to the remoteci if the recheck field
       is True. In this case, the job is reinitialized as if it was a new job.
-    - or to search a jobdefinition that has not been proceeded yet and create
-      a fresh job associated to this jobdefinition and remoteci.
+    - or to search the active jobdefinition of the topic with the highest
+      priority, among the ones with the same priority the one the remoteci
+      ran the least recently, and create a fresh job associated to this
+      jobdefinition and remoteci.
     Before a job is dispatched, the server will flag as 'killed' all the
     running jobs that were associated with the remoteci. This is because they
     will never be finished.
+    The whole dispatch is done in one transaction. Concurrent schedulings
+    skip the jobs locked by each other rather than waiting for them, so a
+    job to recheck is never dispatched twice.
     """
     values = schemas.job_schedule.post(flask.request.json)
 
@@ -275,13 +337,19 @@ def schedule_jobs(user):
     })
     topic_id, remoteci = _validate_input(values, user)
 
-    # test if there is some job to recheck
-    query = _recheck_job(remoteci['id'])
-    recheck_job = flask.g.db_conn.execute(query).fetchone()
-    if recheck_job:
-        values = _build_recheck(recheck_job, values)
-    else:
-        values = _build_new_template(topic_id, remoteci, values)
+    with flask.g.db_conn.begin():
+        # test if there is some job to recheck
+        query = _recheck_job(remoteci['id'])
+        recheck_job = flask.g.db_conn.execute(query).fetchone()
+
+        # let's kill existing running jobs for the remoteci
+        _kill_running_jobs(remoteci['id'],
+                           recheck_job['id'] if recheck_job else None)
+
+        if recheck_job:
+            values = _build_recheck(recheck_job, values)
+        else:
+            values = _build_new_template(topic_id, remoteci, values)
 
     return flask.Response(json.dumps({'job': values}), 201,
                           headers={'ETag': values['etag']},
@@ -307,6 +375,7 @@ def get_all_jobs(user, jd_id=None):
     q_bd.ignore_columns(['configuration'])
     q_bd.join(embed)
     q_bd.sort = v1_utils.sort_query(args['sort'], _JOBS_COLUMNS)
+    q_bd.paginate(args['sort'], args['cursor'])
     q_bd.where = v1_utils.where_query(args['where'], _TABLE, _JOBS_COLUMNS)
 
     # If it's not an admin then restrict the view to the team's file
@@ -317,11 +386,16 @@ def get_all_jobs(user, jd_id=None):
         q_bd.where.append(_TABLE.c.jobdefinition_id == jd_id)
 
     # get the number of rows for the '_meta' section
-    nb_row = flask.g.db_conn.execute(q_bd.build_nb_row()).scalar()
+    nb_row = q_bd.get_count(args['count'])
+    if args['stream'] or v1_utils.request_wants_ndjson():
+        return v1_utils.stream_rows('jobs', q_bd, embed, nb_row)
+
     rows = flask.g.db_conn.execute(q_bd.build()).fetchall()
+    next_cursor = q_bd.next_cursor(rows)
     rows = [v1_utils.group_embedded_resources(embed, row) for row in rows]
 
-    return flask.jsonify({'jobs': rows, '_meta': {'count': nb_row}})
+    return flask.jsonify({'jobs': rows,
+                          '_meta': {'count': nb_row, 'next': next_cursor}})
 
 
 @api.route('/jobs/<job_id>/components', methods=['GET'])
@@ -366,9 +440,7 @@ def get_job_by_id(user, jd_id):
         raise dci_exc.DCINotFound('Job', jd_id)
 
     job = v1_utils.group_embedded_resources(embed, row)
-    job['issues'] = (
-        json.loads(issues.get_all_issues(jd_id).response[0])['issues']
-    )
+    job['issues'] = issues.get_issues(jd_id)
     res = flask.jsonify({'job': job})
     res.headers.add_header('ETag', job['etag'])
     return res
@@ -498,35 +570,111 @@ def get_all_results_from_jobs(user, j_id):
     """Get all results from job.
     """
 
-    job_files = json.loads(files.get_all_files(j_id).response[0])['files']
-    r_files = [file for file in job_files
-               if file['mime'] == 'application/junit']
+    tests_results = models.TESTS_RESULTS
+    query = (sql.select([models.FILES.c.id,
+                         models.FILES.c.name.label('filename'),
+                         models.FILES.c.team_id,
+                         models.FILES.c.job_id,
+                         models.FILES.c.jobstate_id,
+                         models.FILES.c.sha256,
+                         models.FILES.c.blob_id,
+                         models.FILES.c.encoding,
+                         models.FILES.c.size,
+                         tests_results.c.file_id,
+                         tests_results.c.name,
+                         tests_results.c.total,
+                         tests_results.c.failures,
+                         tests_results.c.errors,
+                         tests_results.c.skips,
+                         tests_results.c.time,
+                         tests_results.c.success,
+                         tests_results.c.valid])
+             .select_from(models.FILES.outerjoin(tests_results))
+             .where(models.FILES.c.job_id == j_id)
+             .where(models.FILES.c.mime == 'application/junit')
+             .order_by(models.FILES.c.created_at))
+
+    # If it's not an admin then restrict the view to the team's file
+    if not auth.is_admin(user):
+        query = query.where(models.FILES.c.team_id == user['team_id'])
 
     results = []
-    for file in r_files:
-        file_path = v1_utils.build_file_path(_FILES_FOLDER, file['team_id'],
-                                             file['id'], create=False)
-        data = ''.join([s for s in utils.read(file_path, mode='r')])
-        data = json.loads(tsfm.junit2json(data))
-
-        if not isinstance(data['skips'], int):
-            data['skips'] = 0
-
-        success = (int(data['total']) - int(data['failures']) -
-                   int(data['errors']) - int(data['skips']))
-        results.append({'filename': file['name'],
-                        'name': data['name'],
-                        'total': data['total'],
-                        'failures': data['failures'],
-                        'errors': data['errors'],
-                        'skips': data['skips'],
-                        'time': data['time'],
-                        'success': success})
+    for row in flask.g.db_conn.execute(query):
+        summary = dict(row)
+        if row['file_id'] is None:
+            # uploaded before the summaries were stored, compute it once
+            key, encoding = files.get_file_key(row)
+            summary = files.create_tests_results(row, key, encoding)
+        elif not row['valid']:
+            summary = None
+        if summary is None:
+            # not a valid JUnit file
+            continue
+
+        time = summary['time']
+        results.append({'filename': row['filename'],
+                        'name': summary['name'],
+                        'total': six.text_type(summary['total']),
+                        'failures': six.text_type(summary['failures']),
+                        'errors': six.text_type(summary['errors']),
+                        'skips': summary['skips'],
+                        'time': None if time is None else six.text_type(time),
+                        'success': summary['success']})
 
     return flask.jsonify({'results': results,
                           '_meta': {'count': len(results)}})
 
 
+def _job_testcases(job_id, name):
+    """Return the testcases of a job, once each: the retried uploads of a
+    JUnit file repeat them.
+    """
+    tests_cases = models.TESTS_CASES
+    precedence = sql.case([(tests_cases.c.status == status, index)
+                           for index, status
+                           in enumerate(_TESTCASES_PRECEDENCE)])
+    return (sql.select([tests_cases.c.classname,
+                        tests_cases.c.name,
+                        tests_cases.c.status,
+                        tests_cases.c.duration])
+            .where(tests_cases.c.job_id == job_id)
+            .distinct(tests_cases.c.classname, tests_cases.c.name)
+            .order_by(tests_cases.c.classname, tests_cases.c.name,
+                      precedence, tests_cases.c.created_at.desc())
+            .alias(name))
+
+
+@api.route('/jobs/<j_id>/testcases/flipped/<other_j_id>', methods=['GET'])
+@auth.requires_auth
+def get_flipped_testcases(user, j_id, other_j_id):
+    """Get the testcases whose status changed between another job and
+    this one.
+    """
+    for job_id in (j_id, other_j_id):
+        job = v1_utils.verify_existence_and_get(job_id, _TABLE)
+        if not (auth.is_admin(user) or
+                auth.is_in_team(user, job['team_id'])):
+            raise auth.UNAUTHORIZED
+
+    current = _job_testcases(j_id, 'current')
+    other = _job_testcases(other_j_id, 'other')
+    query = (sql.select([current.c.classname,
+                         current.c.name,
+                         current.c.status,
+                         current.c.duration,
+                         other.c.status.label('other_status'),
+                         other.c.duration.label('other_duration')])
+             .select_from(current.join(
+                 other, sql.and_(current.c.classname == other.c.classname,
+                                 current.c.name == other.c.name)))
+             .where(current.c.status != other.c.status)
+             .order_by(current.c.classname, current.c.name))
+    rows = flask.g.db_conn.execute(query).fetchall()
+
+    return flask.jsonify({'testcases': [dict(row) for row in rows],
+                          '_meta': {'count': len(rows)}})
+
+
 @api.route('/jobs/<j_id>', methods=['DELETE'])
 @auth.requires_auth
 def delete_job_by_id(user, j_id):
@@ -547,4 +695,8 @@ def delete_job_by_id(user, j_id):
     if not result.rowcount:
         raise dci_exc.DCIDeleteConflict('Job', j_id)
 
+    # the files of the job are deleted by cascade, its uploads detached
+    files.collect_blobs()
+    files.collect_uploads()
+
     return flask.Response(None, 204, content_type='application/json')
@@ -20,6 +20,7 @@ import flask
 from flask import json
 
 from dci.api.v1 import api
+from dci.api.v1 import files
 from dci.api.v1 import utils as v1_utils
 from dci import auth
 from dci.common import exceptions as dci_exc
@@ -78,11 +79,12 @@ def get_all_jobstates(user, j_id=None):
     args = schemas.args(flask.request.args.to_dict())
     embed = args['embed']
 
-    q_bd = v1_utils.QueryBuilder(_TABLE, args['limit'], args['offset'],
+    q_bd = v1_utils.QueryBuilder(_TABLE, args['offset'], args['limit'],
                                  _VALID_EMBED)
     q_bd.join(embed)
 
     q_bd.sort = v1_utils.sort_query(args['sort'], _JS_COLUMNS)
+    q_bd.paginate(args['sort'], args['cursor'])
     q_bd.where = v1_utils.where_query(args['where'], _TABLE, _JS_COLUMNS)
 
     if not auth.is_admin(user):
@@ -93,11 +95,16 @@ def get_all_jobstates(user, j_id=None):
         q_bd.where.append(_TABLE.c.job_id == j_id)
 
     # get the number of rows for the '_meta' section
-    nb_row = flask.g.db_conn.execute(q_bd.build_nb_row()).scalar()
+    nb_row = q_bd.get_count(args['count'])
+    if args['stream'] or v1_utils.request_wants_ndjson():
+        return v1_utils.stream_rows('jobstates', q_bd, embed, nb_row)
+
     rows = flask.g.db_conn.execute(q_bd.build()).fetchall()
+    next_cursor = q_bd.next_cursor(rows)
 
     rows = q_bd.parse_rows(embed, rows)
-    return flask.jsonify({'jobstates': rows, '_meta': {'count': nb_row}})
+    return flask.jsonify({'jobstates': rows,
+                          '_meta': {'count': nb_row, 'next': next_cursor}})
 
 
 @api.route('/jobstates/<js_id>', methods=['GET'])
@@ -118,7 +125,7 @@ def get_jobstate_by_id(user, js_id):
     if row is None:
         raise dci_exc.DCINotFound('Jobstate', js_id)
 
-    jobstate = v1_utils.group_embedded_resources(embed, row)
+    jobstate = q_bd.parse_rows(embed, [row])[0]
     res = flask.jsonify({'jobstate': jobstate})
     return res
 
@@ -139,4 +146,8 @@ def delete_jobstate_by_id(user, js_id):
     if not result.rowcount:
         raise dci_exc.DCIDeleteConflict('Jobstate', js_id)
 
+    # the files of the jobstate are deleted by cascade, its uploads detached
+    files.collect_blobs()
+    files.collect_uploads()
+
     return flask.Response(None, 204, content_type='application/json')
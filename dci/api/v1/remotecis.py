@@ -87,7 +87,7 @@ def get_all_remotecis(user, t_id=None):
     if t_id is not None:
         q_bd.where.append(_TABLE.c.team_id == t_id)
 
-    nb_row = flask.g.db_conn.execute(q_bd.build_nb_row()).scalar()
+    nb_row = q_bd.get_count(args['count'])
     rows = flask.g.db_conn.execute(q_bd.build()).fetchall()
     rows = [v1_utils.group_embedded_resources(embed, row) for row in rows]
 
@@ -22,6 +22,7 @@ from sqlalchemy import exc as sa_exc
 from sqlalchemy import sql
 
 from dci.api.v1 import api
+from dci.api.v1 import files
 from dci.api.v1 import remotecis
 from dci.api.v1 import utils as v1_utils
 from dci import auth
@@ -79,7 +80,7 @@ def get_all_teams(user):
     if not auth.is_admin(user):
         q_bd.where.append(_TABLE.c.id == user['team_id'])
 
-    nb_row = flask.g.db_conn.execute(q_bd.build_nb_row()).scalar()
+    nb_row = q_bd.get_count(args['count'])
     rows = flask.g.db_conn.execute(q_bd.build()).fetchall()
 
     return flask.jsonify({'teams': rows, '_meta': {'count': nb_row}})
@@ -148,7 +149,7 @@ def delete_team_by_id_or_name(user, t_id):
     if not auth.is_admin(user):
         raise auth.UNAUTHORIZED
 
-    v1_utils.verify_existence_and_get(t_id, _TABLE)
+    team = v1_utils.verify_existence_and_get(t_id, _TABLE)
 
     where_clause = sql.and_(
         _TABLE.c.etag == if_match_etag,
@@ -160,4 +161,10 @@ def delete_team_by_id_or_name(user, t_id):
     if not result.rowcount:
         raise dci_exc.DCIDeleteConflict('Team', t_id)
 
+    # the users of the team are deleted by cascade
+    auth.invalidate_credentials(team_id=team['id'])
+    # and its files, its uploads are detached
+    files.collect_blobs()
+    files.collect_uploads()
+
     return flask.Response(None, 204, content_type='application/json')
@@ -0,0 +1,44 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2016 Red Hat, Inc
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+
+import datetime
+
+import flask
+from flask import json
+
+from dci.api.v1 import api
+from dci import auth
+
+
+@api.route('/tokens', methods=['POST'])
+@auth.requires_auth
+def create_tokens(user):
+    """Deliver a signed token to use as a Bearer authorization.
+
+    Only a Basic authentication can get a token, a token can not be used to
+    renew itself.
+    """
+    if auth.get_bearer_token() is not None:
+        raise auth.UNAUTHORIZED
+
+    token, expires_at = auth.build_token(user)
+    expires_at = datetime.datetime.utcfromtimestamp(expires_at).isoformat()
+
+    return flask.Response(
+        json.dumps({'token': {'value': token, 'expires_at': expires_at}}),
+        201, content_type='application/json'
+    )
@@ -92,7 +92,7 @@ def get_all_topics(user):
         q_bd.sort = v1_utils.sort_query(args['sort'], _T_COLUMNS)
 
         # get the number of rows for the '_meta' section
-        nb_row = flask.g.db_conn.execute(q_bd.build_nb_row()).scalar()
+        nb_row = q_bd.get_count(args['count'])
         rows = flask.g.db_conn.execute(q_bd.build()).fetchall()
 
         return flask.jsonify({'topics': rows, '_meta': {'count': nb_row}})
@@ -200,6 +200,52 @@ def get_all_tests(user, topic_id):
     return tests.get_all_tests(user, topic_id=topic_id)
 
 
+@api.route('/topics/<topic_id>/testcases', methods=['GET'])
+@auth.requires_auth
+def get_testcase_history(user, topic_id):
+    """Get the outcomes of a testcase across the jobs of a topic, the most
+    recent job first.
+    """
+    topic_id = v1_utils.verify_existence_and_get(topic_id, _TABLE, get_id=True)
+    v1_utils.verify_team_in_topic(user, topic_id)
+
+    args = schemas.args(flask.request.args.to_dict())
+    testcase = schemas.testcase_args(flask.request.args.to_dict())
+
+    tests_cases = models.TESTS_CASES
+    where = [models.JOBDEFINITIONS.c.topic_id == topic_id,
+             tests_cases.c.name == testcase['name']]
+    if testcase['classname'] is not None:
+        where.append(tests_cases.c.classname == testcase['classname'])
+    # If it's not an admin then restrict the view to the team's jobs
+    if not auth.is_admin(user):
+        where.append(models.JOBS.c.team_id == user['team_id'])
+
+    from_clause = tests_cases.join(models.JOBS).join(models.JOBDEFINITIONS)
+    query = (sql.select([tests_cases.c.job_id,
+                         tests_cases.c.file_id,
+                         tests_cases.c.classname,
+                         tests_cases.c.name,
+                         tests_cases.c.status,
+                         tests_cases.c.duration,
+                         models.JOBS.c.created_at.label('job_created_at'),
+                         models.JOBS.c.status.label('job_status')])
+             .select_from(from_clause)
+             .where(sql.and_(*where))
+             .order_by(models.JOBS.c.created_at.desc())
+             .limit(args['limit'])
+             .offset(args['offset']))
+    rows = flask.g.db_conn.execute(query).fetchall()
+
+    query = (sql.select([sql.func.count(tests_cases.c.id)])
+             .select_from(from_clause)
+             .where(sql.and_(*where)))
+    nb_row = flask.g.db_conn.execute(query).scalar()
+
+    return flask.jsonify({'testcases': [dict(row) for row in rows],
+                          '_meta': {'count': nb_row}})
+
+
 # teams set apis
 @api.route('/topics/<topic_id>/teams', methods=['POST'])
 @auth.requires_auth
@@ -15,22 +15,42 @@
 # under the License.
 
 import dci
+import itertools
+import json
+import json.encoder
 import logging
 import lxml.etree as ET
 import os
 import pkg_resources
+import threading
+
+from dci.common import utils
 
 LOG = logging.getLogger('__name__')
 
+_XSL = pkg_resources.resource_string(
+    dci.__name__, os.path.join('data', 'junittojson.xsl')
+)
+# lxml XSLT objects must not be used by several threads at the same time,
+# each thread builds its own once
+_local = threading.local()
+
+
+def get_junit_transform():
+    """Return the JUnit to JSON transform of the current thread."""
+
+    transform = getattr(_local, 'junit_transform', None)
+    if transform is None:
+        transform = ET.XSLT(ET.fromstring(_XSL))
+        _local.junit_transform = transform
+    return transform
+
 
 def junit2json(string):
 
     if not string:
         return '{}'
 
-    xslt = ET.fromstring(pkg_resources.resource_string(
-        dci.__name__, os.path.join('data', 'junittojson.xsl')
-    ))
     try:
         dom = ET.fromstring(string)
         for tc in dom.xpath('//testcase'):
@@ -44,10 +64,192 @@ def junit2json(string):
 
                 tc.xpath('child::*')[0].text = to_clean_string
 
-        transform = ET.XSLT(xslt)
-        string = str(transform(dom))
+        string = str(get_junit_transform()(dom))
     except ET.XMLSyntaxError as e:
         string = '{ "error": "XMLSyntaxError: %s " }' % str(e)
         LOG.info('transformations.junittojson: XMLSyntaxError %s' % str(e))
 
     return string
+
+
+# size of the chunks read from the files
+_CHUNK_SIZE = 1024 ** 2
+
+_encode = json.encoder.encode_basestring_ascii
+_TESTCASE_JSON = ('{"name": %s, "classname": %s, "file": %s, "time": %s, '
+                  '"result": %s}')
+_PASSED_JSON = '{"action": "passed"}'
+# when a testcase has several results the first one in this order is kept
+_JUNIT_ACTIONS = ('passed', 'skipped', 'failure', 'error')
+
+
+def _junit_result(testcase):
+    result = None
+    for child in testcase:
+        if child.tag in _JUNIT_ACTIONS and (
+                result is None or
+                _JUNIT_ACTIONS.index(child.tag) <
+                _JUNIT_ACTIONS.index(result.tag)):
+            result = child
+
+    if result is None:
+        return _PASSED_JSON
+    value = ''.join(result.itertext()).replace('"', "'")
+    return json.dumps({'action': result.tag,
+                       'message': result.get('message', ''),
+                       'type': result.get('type', ''),
+                       'value': value})
+
+
+def junit_file2json(f):
+    """Convert the JUnit file object f to the JSON built by junit2json.
+
+    The file is parsed incrementally and every testcase is freed once
+    converted, the memory used does not depend on the number of testcases.
+    """
+
+    first = f.read(1)
+    if not first:
+        return '{}'
+    # the byte read is given back to the parser
+    chunks = iter(lambda: f.read(_CHUNK_SIZE) or None, None)
+    return _junit_file2json(
+        utils.ChunksReader(itertools.chain([first], chunks)))
+
+
+def _junit_file2json(f):
+    properties = []
+    testcases = []
+    parser = ET.iterparse(f, tag=('testcase', 'property'))
+    try:
+        for _, elem in parser:
+            parent = elem.getparent()
+            if elem.tag == 'property':
+                if (parent.tag == 'properties' and
+                        parent.getparent().getparent() is None):
+                    properties.append({'name': elem.get('name', ''),
+                                       'value': elem.get('value', '')})
+            elif parent.getparent() is None:
+                get = elem.get
+                testcases.append(_TESTCASE_JSON % (
+                    _encode(get('name', '')),
+                    _encode(get('classname', '')),
+                    _encode(get('file', '')),
+                    _encode(get('time', '')),
+                    _junit_result(elem)))
+                elem.clear()
+                while elem.getprevious() is not None:
+                    del parent[0]
+    except ET.XMLSyntaxError as e:
+        LOG.info('transformations.junit_file2json: XMLSyntaxError %s' %
+                 str(e))
+        return '{ "error": "XMLSyntaxError: %s " }' % str(e)
+
+    root = parser.root
+    if root.tag != 'testsuite':
+        return '{}'
+
+    suite = json.dumps({
+        'name': root.get('name', ''),
+        'total': root.get('tests', ''),
+        'failures': root.get('failures', ''),
+        'errors': root.get('errors', ''),
+        'skips': root.get('skips', ''),
+        'time': root.get('time', ''),
+        'properties': properties
+    })
+    # testcases are already serialized, add them to the suite's object
+    return '%s, "testscases": [%s]}' % (suite[:-1], ', '.join(testcases))
+
+
+def _to_int(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return 0
+
+
+def junit_summary(f):
+    """Return the totals of the JUnit file object f, read from the
+    attributes of its root element, or None if it is not a valid JUnit file.
+    """
+
+    # only the root element is needed, stop at its start tag
+    return junit_parse(f)[0]
+
+
+def junit_parse(f):
+    """Return the summary of the JUnit file object f and an iterator of its
+    testcases, read in a single pass over the file. The summary is None and
+    there is no testcase if it is not a valid JUnit file.
+    """
+
+    events = ET.iterparse(f, events=('start', 'end'))
+    try:
+        _, root = next(events)
+    except (ET.XMLSyntaxError, StopIteration) as e:
+        LOG.info('transformations.junit_parse: %s' % str(e))
+        return None, iter([])
+
+    return _summary(root), _testcases(
+        testcase for event, testcase in events
+        if event == 'end' and testcase.tag == 'testcase')
+
+
+def _summary(root):
+    try:
+        time = float(root.get('time'))
+    except (TypeError, ValueError):
+        time = None
+
+    summary = {
+        'name': root.get('name'),
+        'total': _to_int(root.get('tests')),
+        'failures': _to_int(root.get('failures')),
+        'errors': _to_int(root.get('errors')),
+        'skips': _to_int(root.get('skips', root.get('skipped'))),
+        'time': time
+    }
+    summary['success'] = (summary['total'] - summary['failures'] -
+                          summary['errors'] - summary['skips'])
+    return summary
+
+
+# the child element of a testcase giving its status, none means success
+_TESTCASE_STATUSES = {
+    'failure': 'failure',
+    'error': 'error',
+    'skipped': 'skipped'
+}
+
+
+def junit_testcases(f):
+    """Yield the classname, name, status and duration of every testcase of
+    the JUnit file object f, freeing the elements as they are read.
+    """
+
+    return _testcases(testcase for _, testcase
+                      in ET.iterparse(f, tag='testcase'))
+
+
+def _testcases(testcases):
+    for testcase in testcases:
+        status = 'success'
+        for child in testcase:
+            if child.tag in _TESTCASE_STATUSES:
+                status = _TESTCASE_STATUSES[child.tag]
+                break
+
+        try:
+            duration = float(testcase.get('time'))
+        except (TypeError, ValueError):
+            duration = None
+
+        yield {'classname': testcase.get('classname', ''),
+               'name': testcase.get('name', ''),
+               'status': status,
+               'duration': duration}
+
+        testcase.clear()
+        while testcase.getprevious() is not None:
+            del testcase.getparent()[0]
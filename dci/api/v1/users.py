@@ -110,7 +110,7 @@ def get_all_users(user, team_id=None):
         q_bd.where.append(_TABLE.c.team_id == team_id)
 
     # get the number of rows for the '_meta' section
-    nb_row = flask.g.db_conn.execute(q_bd.build_nb_row()).scalar()
+    nb_row = q_bd.get_count(args['count'])
     rows = flask.g.db_conn.execute(q_bd.build()).fetchall()
 
     return flask.jsonify({'users': rows, '_meta': {'count': nb_row}})
@@ -176,6 +176,9 @@ def put_user(user, user_id):
     if not result.rowcount:
         raise dci_exc.DCIConflict('User', user_id)
 
+    # the password, the role or the team may have changed
+    auth.invalidate_credentials(id=puser['id'])
+
     return flask.Response(None, 204, headers={'ETag': values['etag']},
                           content_type='application/json')
 
@@ -203,4 +206,6 @@ def delete_user_by_id_or_name(user, user_id):
     if not result.rowcount:
         raise dci_exc.DCIDeleteConflict('User', user_id)
 
+    auth.invalidate_credentials(id=duser['id'])
+
     return flask.Response(None, 204, content_type='application/json')
@@ -18,13 +18,18 @@ import flask
 import six
 from sqlalchemy import sql, func
 from sqlalchemy import Table as sa_Table
+from sqlalchemy.sql import util as sql_util
 
 from dci import auth
 from dci.common import exceptions as dci_exc
 from dci.common import utils
 from dci.db import models
 
+import base64
 import collections
+import datetime
+import itertools
+import json
 import os
 
 
@@ -196,6 +201,59 @@ def where_query(where, table, columns):
     return where_conds
 
 
+def encode_cursor(values):
+    """Encode the sort key values of a row into an opaque cursor."""
+
+    values = [v.isoformat() if isinstance(v, datetime.datetime) else v
+              for v in values]
+    cursor = base64.urlsafe_b64encode(json.dumps(values).encode('utf8'))
+    return cursor.decode('utf8')
+
+
+def decode_cursor(cursor, nb_values):
+    try:
+        values = json.loads(base64.urlsafe_b64decode(
+            cursor.encode('utf8')).decode('utf8'))
+    except (TypeError, ValueError):
+        values = None
+
+    if not isinstance(values, list) or len(values) != nb_values:
+        raise dci_exc.DCIException('Invalid cursor: "%s"' % cursor)
+    return values
+
+
+def keyset_where(keyset, values):
+    """Build the condition selecting the rows after the given sort key
+    values, keyset is the list of (column, descending) of the sort.
+    """
+    if len(set(descending for _, descending in keyset)) == 1:
+        # same direction for all the keys, use a row comparison which can be
+        # resolved with an index
+        columns = sql.tuple_(*[column for column, _ in keyset])
+        values = sql.tuple_(*values)
+        return columns < values if keyset[0][1] else columns > values
+
+    conditions = []
+    for i, (column, descending) in enumerate(keyset):
+        condition = [c == v for (c, _), v in zip(keyset[:i], values[:i])]
+        condition.append(column < values[i] if descending
+                         else column > values[i])
+        conditions.append(sql.and_(*condition))
+    return sql.or_(*conditions)
+
+
+def estimate_nb_row(query):
+    """Return the number of rows of the query estimated by the planner from
+    the table statistics.
+    """
+    compiled = query.compile(dialect=flask.g.db_conn.dialect)
+    plan = flask.g.db_conn.execute('EXPLAIN (FORMAT JSON) %s' % compiled,
+                                   compiled.params).scalar()
+    if isinstance(plan, six.string_types):
+        plan = json.loads(plan)
+    return int(plan[0]['Plan']['Plan Rows'])
+
+
 def request_wants_html():
     best = (flask.request.accept_mimetypes
             .best_match(['text/html', 'application/json']))
@@ -205,6 +263,58 @@ def request_wants_html():
             flask.request.accept_mimetypes['application/json'])
 
 
+def request_wants_ndjson():
+    best = (flask.request.accept_mimetypes
+            .best_match(['application/json', 'application/x-ndjson']))
+
+    return best == 'application/x-ndjson'
+
+
+def stream_rows(resource, q_bd, embed_list, nb_row):
+    """Return a response encoding the rows of the query as they are fetched
+    with a server side cursor, so that the memory used does not depend on the
+    number of rows.
+
+    The body is the same document as the one of the regular list response,
+    or one resource per line followed by the '_meta' line if the client
+    accepts 'application/x-ndjson'.
+    """
+    ndjson = request_wants_ndjson()
+    query = q_bd.build().execution_options(stream_results=True)
+    result = flask.g.db_conn.execute(query)
+    # number of rows fetched and the last one, to compute the next cursor
+    fetched = [0, None]
+
+    def fetch():
+        for row in result:
+            fetched[0] += 1
+            fetched[1] = row
+            yield row
+
+    def generate():
+        try:
+            if not ndjson:
+                yield '{"%s": [' % resource
+            for i, row in enumerate(q_bd.iter_rows(embed_list, fetch())):
+                if ndjson:
+                    yield flask.json.dumps(row) + '\n'
+                else:
+                    yield (',' if i else '') + flask.json.dumps(row)
+        finally:
+            result.close()
+
+        meta = {'count': nb_row,
+                'next': q_bd.cursor_after(fetched[0], fetched[1])}
+        if ndjson:
+            yield flask.json.dumps({'_meta': meta}) + '\n'
+        else:
+            yield '], "_meta": %s}' % flask.json.dumps(meta)
+
+    mimetype = 'application/x-ndjson' if ndjson else 'application/json'
+    return flask.Response(flask.stream_with_context(generate()),
+                          mimetype=mimetype)
+
+
 class QueryBuilder(object):
 
     def __init__(self, table, offset=None, limit=None, embed=None):
@@ -216,6 +326,9 @@ class QueryBuilder(object):
         self.select = [table]
         self._join = []
         self.valid_embed = embed or {}
+        self._keyset = []
+        self._cursor_where = None
+        self._many = []
 
     def ignore_columns(self, columns):
         """Remove the specified set of columns from the SQL query."""
@@ -264,35 +377,128 @@ class QueryBuilder(object):
                     payload={'Valid elements': list(self.valid_embed)}
                 )
             e = self.valid_embed[embed]
+            if e.many:
+                # joining would repeat the row for each embedded resource,
+                # they are loaded afterwards by load_many
+                self._many.append(embed)
+                continue
             # flatten all tables for the SQL select
             self.select.extend(flatten_columns(embed, e))
 
             # order is important for the SQL join
             self._join.append(e.model)
 
+    def paginate(self, sort, cursor=None):
+        """Sort the rows by the given keys then by id so that the pages can
+        be walked with a cursor instead of an offset.
+
+        Fetching the page after a cursor costs the same whatever its
+        position, unlike an offset which reads and drops all the previous
+        rows. Only the columns of the table which cannot be NULL are valid
+        keys, the default one being created_at: a row comparison with NULL is
+        never true, the rows with a NULL key would be skipped.
+        """
+        keyset = []
+        for sort_elem in sort or ['created_at']:
+            descending = sort_elem.startswith('-')
+            sort_elem = sort_elem.strip(' -')
+            embed = self.valid_embed.get(sort_elem.rsplit('.', 1)[0])
+            if embed is not None and embed.many:
+                # only orders the embedded resources, see load_many
+                continue
+            if (sort_elem not in self.table.c or
+                    self.table.c[sort_elem].nullable):
+                if cursor is not None:
+                    valid_keys = [c.name for c in self.table.c
+                                  if not c.nullable]
+                    raise dci_exc.DCIException(
+                        'Invalid sort key for a cursor: "%s"' % sort_elem,
+                        payload={'Valid sort keys': valid_keys}
+                    )
+                # fall back to the regular sort, without cursor
+                return
+            keyset.append((self.table.c[sort_elem], descending))
+            if sort_elem == 'id':
+                break
+
+        if not keyset:
+            keyset.append((self.table.c.created_at, False))
+        if keyset[-1][0] is not self.table.c.id:
+            # the id makes the order total, follow the last key direction
+            keyset.append((self.table.c.id, keyset[-1][1]))
+
+        self._keyset = keyset
+        self.sort = [sql.desc(column) if descending else sql.asc(column)
+                     for column, descending in keyset] + [
+            sort for sort in self.sort if self._many_embed_of(sort)]
+
+        if cursor is not None:
+            values = decode_cursor(cursor, len(keyset))
+            self._cursor_where = keyset_where(keyset, values)
+
+    def next_cursor(self, rows):
+        """Return the cursor of the page following the rows or None if it
+        is the last one.
+        """
+        return self.cursor_after(len(rows), rows[-1] if rows else None)
+
+    def cursor_after(self, nb_rows, last_row):
+        if not self._keyset or not self.limit or nb_rows < self.limit:
+            return None
+        return encode_cursor([last_row[column.name]
+                              for column, _ in self._keyset])
+
+    def _many_embed_of(self, clause):
+        """Return the name of the many embed whose columns are used by the
+        clause, if any.
+        """
+        tables = sql_util.find_tables(clause, check_columns=True)
+        for name, embed in six.iteritems(self.valid_embed):
+            if embed.many and embed.model in tables:
+                return name
+        return None
+
+    def load_many(self, rows):
+        """Add the many embeds to the parsed rows, with one query per embed
+        selecting the resources of all the rows at once.
+
+        Unlike a join this does not repeat the rows for each embedded
+        resource, and the limit applies to the rows themselves.
+        """
+        ids = [row['id'] for row in rows]
+        for name in self._many:
+            model = self.valid_embed[name].model
+            foreign_key = [fk.parent for fk in model.foreign_keys
+                           if fk.references(self.table)][0]
+            embedded = collections.defaultdict(list)
+            if ids:
+                query = sql.select([model]).where(foreign_key.in_(ids))
+                for sort in self.sort:
+                    if self._many_embed_of(sort) == name:
+                        query = query.order_by(sort)
+                for obj in flask.g.db_conn.execute(query):
+                    embedded[obj[foreign_key.name]].append(dict(obj))
+            for row in rows:
+                row[name] = embedded[row['id']]
+        return rows
+
     def parse_rows(self, embed_list, rows):
-        aggregates = dict.fromkeys(
-            [e for e in embed_list if self.valid_embed[e].many],
-            collections.defaultdict(list)
-        )
-        parsed_rows = collections.OrderedDict()
-
-        for row in rows:
-            row = group_embedded_resources(embed_list, row)
-            for aggr, aggr_dict in six.iteritems(aggregates):
-                try:
-                    obj = row.pop(aggr)
-                    if any(v is not None for v in obj.values()):
-                        aggr_dict[row['id']].append(obj)
-                except KeyError:
-                    pass
-            parsed_rows[row['id']] = row
-
-        for row_id, row in six.iteritems(parsed_rows):
-            for aggr, aggr_dict in six.iteritems(aggregates):
-                row[aggr] = aggr_dict[row_id]
-
-        return list(parsed_rows.values())
+        embed_list = [e for e in embed_list if e not in self._many]
+        rows = [group_embedded_resources(embed_list, row) for row in rows]
+        return self.load_many(rows)
+
+    def iter_rows(self, embed_list, rows, batch_size=100):
+        """Lazy version of parse_rows, the many embeds are loaded for each
+        batch of rows.
+        """
+        rows = iter(rows)
+        while True:
+            batch = self.parse_rows(embed_list,
+                                    itertools.islice(rows, batch_size))
+            if not batch:
+                break
+            for row in batch:
+                yield row
 
     def build(self):
         query = sql.select(self.select)
@@ -300,8 +506,12 @@ class QueryBuilder(object):
         for where in self.where:
             query = query.where(where)
 
+        if self._cursor_where is not None:
+            query = query.where(self._cursor_where)
+
         for sort in self.sort:
-            query = query.order_by(sort)
+            if not self._many_embed_of(sort):
+                query = query.order_by(sort)
 
         if self.limit:
             query = query.limit(self.limit)
@@ -317,12 +527,20 @@ class QueryBuilder(object):
 
         return query
 
-    def build_nb_row(self):
-        query = sql.select([func.count(self.table.c.id)])
+    def build_nb_row(self, columns=None):
+        """Build the query counting the rows, or selecting the given columns
+        of all the rows, without the pagination.
+        """
+        query = sql.select(columns or [func.count(self.table.c.id)])
         for where in self.where:
             query = query.where(where)
 
-        if self._join:
+        # the embedded tables are only needed if they are filtered on
+        where_tables = set()
+        for where in self.where:
+            where_tables.update(sql_util.find_tables(where,
+                                                     check_columns=True))
+        if self._join and where_tables - set([self.table]):
             query_join = self.table
             for join in self._join:
                 query_join = query_join.outerjoin(join)
@@ -331,6 +549,18 @@ class QueryBuilder(object):
 
         return query
 
+    def get_count(self, count='exact'):
+        """Return the number of rows for the '_meta' section.
+
+        The count can be 'exact', an 'estimate' of the database planner
+        which does not read the rows, or 'none' to skip it.
+        """
+        if count == 'none':
+            return None
+        if count == 'estimate':
+            return estimate_nb_row(self.build_nb_row([self.table.c.id]))
+        return flask.g.db_conn.execute(self.build_nb_row()).scalar()
+
 
 def flask_headers_to_dict(headers):
     """Parse headers for finding dci related ones
@@ -354,3 +584,19 @@ def build_file_path(file_folder, team_id, file_id, create=True):
         os.makedirs(directory)
 
     return os.path.join(directory, file_id)
+
+
+def build_file_key(team_id, file_id):
+    """Return the key of the content of a file in the stores."""
+    return '/'.join([team_id, file_id[0:2], file_id[2:4], file_id[4:6],
+                     file_id])
+
+
+def build_blob_key(blob_id):
+    """Return the key of a blob in the stores."""
+    return '/'.join(['blobs', blob_id[0:2], blob_id[2:4], blob_id])
+
+
+def build_chunk_key(upload_id, offset):
+    """Return the key of a chunk of an upload in the stores."""
+    return '/'.join(['uploads', upload_id, str(offset)])
@@ -16,16 +16,20 @@
 
 
 from dci.api import v1 as api_v1
+from dci.api.v1 import issues
+from dci import auth
 from dci.common import exceptions
 from dci.common import utils
 from dci.elasticsearch import engine as es_engine
 
+import atexit
 import flask
 import logging
 
 from sqlalchemy import exc as sa_exc
 
 from dci import dci_config
+from dci import trackers
 
 
 class DciControlServer(flask.Flask):
@@ -36,6 +40,16 @@ class DciControlServer(flask.Flask):
         self.url_map.strict_slashes = False
         self.engine = dci_config.get_engine(conf)
         self.es_engine = es_engine.DCIESEngine(conf)
+        self.credentials_cache = auth.CredentialsCache(
+            conf['AUTH_CACHE_SIZE'], conf['AUTH_CACHE_TTL'])
+        trackers.configure(conf)
+        self.issues_refresher = None
+        if conf['ISSUES_REFRESH_ENABLED']:
+            self.issues_refresher = issues.IssuesRefresher(
+                self.engine, conf['ISSUES_CACHE_TTL'],
+                conf['ISSUES_REFRESH_INTERVAL'])
+            self.issues_refresher.start()
+            atexit.register(self.issues_refresher.stop)
 
     def make_default_options_response(self):
         resp = super(DciControlServer, self).make_default_options_response()
@@ -14,11 +14,19 @@
 # License for the specific language governing permissions and limitations
 # under the License.
 
+import base64
+import collections
 import flask
 from functools import wraps
+import hashlib
+import hmac
 import json
+import os
 from passlib.apps import custom_app_context as pwd_context
+import six
 import sqlalchemy.sql
+import threading
+import time
 
 from dci.common import exceptions as exc
 from dci.db import models
@@ -32,10 +40,93 @@ def hash_password(password):
     return pwd_context.encrypt(password)
 
 
+class CredentialsCache(object):
+    """Bounded cache of the successful username/password verifications.
+
+    Checking a password against its passlib hash is deliberately slow, this
+    cache remembers the users already authenticated for ttl seconds. Entries
+    are keyed on a salted digest of the credentials so that no clear text
+    password is kept in memory. The cache is local to the process, the ttl
+    bounds how long another worker may still accept an outdated password.
+    """
+
+    def __init__(self, size=1024, ttl=300):
+        self.size = size
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._salt = os.urandom(16)
+        self._entries = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def _key(self, username, password):
+        credentials = '%s:%s' % (username, password)
+        return hmac.new(self._salt, credentials.encode('utf8'),
+                        hashlib.sha256).hexdigest()
+
+    def get(self, username, password):
+        """Return the cached user or None if it is unknown or expired."""
+
+        key = self._key(username, password)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[1] > time.time():
+                self.hits += 1
+                return dict(entry[0])
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+        return None
+
+    def add(self, username, password, user):
+        if self.size <= 0:
+            return
+        key = self._key(username, password)
+        with self._lock:
+            self._entries.pop(key, None)
+            self._entries[key] = (dict(user), time.time() + self.ttl)
+            while len(self._entries) > self.size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, **kwargs):
+        """Remove the entries of the users matching all the given fields.
+
+        For instance invalidate(id=user_id) or invalidate(team_id=team_id).
+        """
+        with self._lock:
+            for key, (user, _) in list(self._entries.items()):
+                if all(user.get(k) == v for k, v in kwargs.items()):
+                    del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            return {'size': len(self._entries), 'max_size': self.size,
+                    'ttl': self.ttl, 'hits': self.hits,
+                    'misses': self.misses}
+
+
+def invalidate_credentials(**kwargs):
+    """Drop the cached credentials of the users matching kwargs."""
+
+    cache = getattr(flask.current_app, 'credentials_cache', None)
+    if cache is not None:
+        cache.invalidate(**kwargs)
+
+
 def build_auth(username, password):
     """Check the combination username/password that is valid on the
     database.
     """
+    cache = getattr(flask.current_app, 'credentials_cache', None)
+    if cache is not None:
+        user = cache.get(username, password)
+        if user is not None:
+            return user, True
+
     query_get_user = (sqlalchemy.sql
                       .select([models.USERS])
                       .where(models.USERS.c.name == username))
@@ -45,7 +136,88 @@ def build_auth(username, password):
         return None, False
     user = dict(user)
 
-    return user, pwd_context.verify(password, user.get('password'))
+    is_authenticated = pwd_context.verify(password, user.get('password'))
+    if is_authenticated and cache is not None:
+        cache.add(username, password, user)
+
+    return user, is_authenticated
+
+
+# fields of the user embedded in the signed tokens
+_TOKEN_FIELDS = ('id', 'name', 'team_id', 'role')
+
+
+def _b64encode(data):
+    return base64.urlsafe_b64encode(data).rstrip(b'=')
+
+
+def _b64decode(data):
+    return base64.urlsafe_b64decode(data + b'=' * (-len(data) % 4))
+
+
+def _sign(secret, data):
+    return _b64encode(hmac.new(secret.encode('utf8'), data,
+                               hashlib.sha256).digest())
+
+
+def _get_token_secret():
+    secret = flask.current_app.config.get('TOKEN_SECRET_KEY')
+    if not secret:
+        raise exc.DCIException('Token authentication is not configured.',
+                               status_code=412)
+    return secret
+
+
+def build_token(user, ttl=None):
+    """Build a signed token carrying the identity of the user.
+
+    The token is made of the base64 encoded payload and of its HMAC-SHA256
+    signature, separated by a dot. It stays valid until its expiration
+    even if the user is modified in the meantime.
+    """
+    ttl = ttl or flask.current_app.config['TOKEN_TTL']
+    payload = dict((k, user[k]) for k in _TOKEN_FIELDS)
+    payload['exp'] = int(time.time()) + ttl
+
+    data = _b64encode(json.dumps(payload, sort_keys=True).encode('utf8'))
+    token = data + b'.' + _sign(_get_token_secret(), data)
+    return token.decode('utf8'), payload['exp']
+
+
+def verify_token(token):
+    """Return the user embedded in the token or None if the token is not
+    valid or expired.
+    """
+    secret = flask.current_app.config.get('TOKEN_SECRET_KEY')
+    if not secret:
+        return None
+
+    if isinstance(token, six.text_type):
+        token = token.encode('utf8')
+    try:
+        data, signature = token.split(b'.')
+    except ValueError:
+        return None
+
+    if not hmac.compare_digest(signature, _sign(secret, data)):
+        return None
+
+    try:
+        payload = json.loads(_b64decode(data).decode('utf8'))
+    except (TypeError, ValueError):
+        return None
+
+    if payload.get('exp', 0) <= time.time():
+        return None
+    return dict((k, payload.get(k)) for k in _TOKEN_FIELDS)
+
+
+def get_bearer_token():
+    authorization = flask.request.headers.get('Authorization', '')
+    scheme, _, token = authorization.partition(' ')
+    if scheme.lower() != 'bearer' or not token:
+        return None
+    return token.strip()
 
 
 def reject():
@@ -56,7 +228,8 @@ def reject():
     auth_message = json.dumps({'_status': 'Unauthorized',
                                'message': auth_message})
 
-    headers = {'WWW-Authenticate': 'Basic realm="Login required"'}
+    headers = {'WWW-Authenticate': 'Basic realm="Login required", '
+                                   'Bearer realm="Login required"'}
     return flask.Response(auth_message, 401, headers=headers,
                           content_type='application/json')
 
@@ -78,6 +251,13 @@ def is_in_team(user, team_id):
 def requires_auth(f):
     @wraps(f)
     def decorated(*args, **kwargs):
+        token = get_bearer_token()
+        if token is not None:
+            user = verify_token(token)
+            if user is None:
+                return reject()
+            return f(user, *args, **kwargs)
+
         auth = flask.request.authorization
         if not auth:
             return reject()
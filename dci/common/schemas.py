@@ -38,6 +38,8 @@ def Url(value):
 VALID_STATUS_UPDATE = ['failure', 'success', 'killed', 'product-failure',
                        'deployment-failure']
 
+COUNT_MODES = ['exact', 'estimate', 'none']
+
 INVALID_LIST = 'not a valid list'
 INVALID_UUID = 'not a valid uuid'
 INVALID_JSON = 'not a valid json'
@@ -56,6 +58,10 @@ INVALID_ROLE = ('not a valid role (must be %s)' %
                 ' or '.join(models.USER_ROLES))
 INVALID_OFFSET = 'not a valid offset integer (must be greater than 0)'
 INVALID_LIMIT = 'not a valid limit integer (must be greater than 0)'
+INVALID_COUNT = ('not a valid count (must be %s)' %
+                 ' or '.join(COUNT_MODES))
+INVALID_STREAM = 'not a valid boolean'
+INVALID_SIZE = 'not a valid size integer (must be greater than 0)'
 
 INVALID_REQUIRED = 'required key not provided'
 INVALID_OBJECT = 'not a valid object'
@@ -125,7 +131,16 @@ args = Schema({
                                               msg=INVALID_OFFSET),
     v.Optional('sort', default=[]): split_coerce,
     v.Optional('where', default=[]): split_coerce,
-    v.Optional('embed', default=[]): split_coerce
+    v.Optional('embed', default=[]): split_coerce,
+    v.Optional('cursor', default=None): six.text_type,
+    v.Optional('count', default='exact'): v.Any(*COUNT_MODES,
+                                                msg=INVALID_COUNT),
+    v.Optional('stream', default=False): v.Boolean(msg=INVALID_STREAM)
+}, extra=v.REMOVE_EXTRA)
+
+testcase_args = Schema({
+    v.Required('name'): six.text_type,
+    v.Optional('classname', default=None): six.text_type
 }, extra=v.REMOVE_EXTRA)
 
 ###############################################################################
@@ -303,6 +318,19 @@ file = utils.dict_merge(base, {
 
 file = schema_factory(file)
 
+upload = utils.dict_merge(base, {
+    'size': v.All(v.Any(*six.integer_types), v.Range(0), msg=INVALID_SIZE),
+    v.Optional('md5', default=None): six.text_type,
+    v.Optional('sha256', default=None): six.text_type,
+    v.Optional('mime', default=None): six.text_type,
+    v.Optional('jobstate_id', default=None): v.Any(UUID_FIELD,
+                                                   msg=INVALID_JOB_STATE),
+    v.Optional('job_id', default=None): v.Any(UUID_FIELD,
+                                              msg=INVALID_JOB),
+})
+
+upload = schema_factory(upload)
+
 ###############################################################################
 #                                                                             #
 #                                Topic schemas                                #
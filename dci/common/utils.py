@@ -20,6 +20,7 @@ import functools
 import hashlib
 import itertools
 import uuid
+import zlib
 
 import flask
 import six
@@ -28,6 +29,10 @@ from dci.common import exceptions
 from sqlalchemy.engine import result
 
 
+# size of the chunks read from the files
+_CHUNK_SIZE = 1024 ** 2
+
+
 def read(file_path, chunk_size=None, mode='rb'):
     chunk_size = chunk_size or 1024 ** 2  #  1MB
     with open(file_path, mode) as f:
@@ -35,6 +40,99 @@ def read(file_path, chunk_size=None, mode='rb'):
             yield chunk
 
 
+def read_range(file_path, start, stop, chunk_size=None):
+    """Read the bytes of a file from start to stop excluded."""
+    chunk_size = chunk_size or 1024 ** 2  # 1MB
+    with open(file_path, 'rb') as f:
+        f.seek(start)
+        remaining = stop - start
+        while remaining > 0:
+            chunk = f.read(min(chunk_size, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+
+
+def slice_chunks(chunks, start, stop):
+    """Yield the bytes of chunks from start to stop excluded."""
+    offset = 0
+    for chunk in chunks:
+        if offset >= stop:
+            break
+        if offset + len(chunk) > start:
+            yield chunk[max(start - offset, 0):stop - offset]
+        offset += len(chunk)
+
+
+def gzip_chunks(chunks, level=6):
+    """Compress chunks of bytes in the gzip format, the default level 9 is
+    much slower for little gain on logs.
+    """
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def gunzip_chunks(chunks):
+    """Decompress chunks of bytes in the gzip format, the chunks yielded
+    are not bigger than _CHUNK_SIZE.
+    """
+    decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        while chunk:
+            data = decompressor.decompress(chunk, _CHUNK_SIZE)
+            chunk = decompressor.unconsumed_tail
+            if data:
+                yield data
+    data = decompressor.flush()
+    if data:
+        yield data
+
+
+class ChunksReader(object):
+    """Read-only file object over an iterator of chunks of bytes, for the
+    parsers reading a content which is not in a local file.
+    """
+
+    def __init__(self, chunks):
+        self._chunks = iter(chunks)
+        self._chunk = b''
+        self._offset = 0
+
+    def read(self, size=-1):
+        parts = []
+        while size != 0:
+            if self._offset == len(self._chunk):
+                self._chunk = next(self._chunks, None)
+                self._offset = 0
+                if self._chunk is None:
+                    self._chunk = b''
+                    break
+            if size < 0:
+                part = self._chunk[self._offset:]
+            else:
+                part = self._chunk[self._offset:self._offset + size]
+                size -= len(part)
+            self._offset += len(part)
+            parts.append(part)
+        return b''.join(parts)
+
+    def close(self):
+        close = getattr(self._chunks, 'close', None)
+        if close is not None:
+            close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
 class JSONEncoder(flask.json.JSONEncoder):
     """Default JSON encoder."""
     def default(self, o):
@@ -35,6 +35,9 @@ STATUSES = sa.Enum(*JOB_STATUSES, name='statuses')
 ISSUE_TRACKERS = ['github', 'bugzilla']
 TRACKERS = sa.Enum(*ISSUE_TRACKERS, name='trackers')
 
+TESTCASE_STATUSES = ['success', 'failure', 'error', 'skipped']
+TESTCASES_STATUSES = sa.Enum(*TESTCASE_STATUSES, name='testcases_statuses')
+
 COMPONENTS = sa.Table(
     'components', metadata,
     sa.Column('id', sa.String(36), primary_key=True,
@@ -55,7 +58,9 @@ COMPONENTS = sa.Table(
               sa.ForeignKey('topics.id', ondelete='CASCADE'),
               nullable=True),
     sa.UniqueConstraint('name', 'topic_id',
-                        name='components_name_topic_id_key'))
+                        name='components_name_topic_id_key'),
+    sa.Index('components_topic_id_type_created_at_idx',
+             'topic_id', 'type', 'created_at'))
 
 
 TOPICS = sa.Table(
@@ -79,7 +84,8 @@ JOINS_TOPICS_TEAMS = sa.Table(
               nullable=False, primary_key=True),
     sa.Column('team_id', sa.String(36),
               sa.ForeignKey('teams.id', ondelete='CASCADE'),
-              nullable=False, primary_key=True)
+              nullable=False, primary_key=True),
+    sa.Index('topics_teams_team_id_idx', 'team_id')
 )
 
 TESTS = sa.Table(
@@ -92,7 +98,8 @@ TESTS = sa.Table(
     sa.Column('data', sa_utils.JSONType),
     sa.Column('topic_id', sa.String(36),
               sa.ForeignKey('topics.id', ondelete='CASCADE'),
-              nullable=True))
+              nullable=True),
+    sa.Index('tests_topic_id_idx', 'topic_id'))
 
 JOBDEFINITIONS = sa.Table(
     'jobdefinitions', metadata,
@@ -106,13 +113,19 @@ JOBDEFINITIONS = sa.Table(
     sa.Column('etag', sa.String(40), nullable=False, default=utils.gen_etag,
               onupdate=utils.gen_etag),
     sa.Column('name', sa.String(255)),
-    sa.Column('priority', sa.Integer, default=0),
+    sa.Column('priority', sa.Integer, default=0, server_default='0',
+              nullable=False),
     sa.Column('topic_id', sa.String(36),
               sa.ForeignKey('topics.id', ondelete='CASCADE'),
               nullable=True),
-    sa.Column('active', sa.BOOLEAN, default=True),
+    sa.Column('active', sa.BOOLEAN, default=True, server_default='true',
+              nullable=False),
     sa.Column('comment', sa.Text),
     sa.Column('component_types', pg.JSON, default=[]),
+    sa.Index('jobdefinitions_topic_id_created_at_idx',
+             'topic_id', 'created_at'),
+    sa.Index('jobdefinitions_topic_id_active_priority_idx',
+             'topic_id', 'active', 'priority')
 )
 
 JOIN_JOBDEFINITIONS_TESTS = sa.Table(
@@ -122,7 +135,8 @@ JOIN_JOBDEFINITIONS_TESTS = sa.Table(
               nullable=False, primary_key=True),
     sa.Column('test_id', sa.String(36),
               sa.ForeignKey('tests.id', ondelete='CASCADE'),
-              nullable=False, primary_key=True)
+              nullable=False, primary_key=True),
+    sa.Index('jobdefinition_tests_test_id_idx', 'test_id')
 )
 
 TEAMS = sa.Table(
@@ -155,7 +169,8 @@ REMOTECIS = sa.Table(
     sa.Column('team_id', sa.String(36),
               sa.ForeignKey('teams.id', ondelete='CASCADE'),
               nullable=False),
-    sa.UniqueConstraint('name', 'team_id', name='remotecis_name_team_id_key')
+    sa.UniqueConstraint('name', 'team_id', name='remotecis_name_team_id_key'),
+    sa.Index('remotecis_team_id_idx', 'team_id')
 )
 
 JOBS = sa.Table(
@@ -183,7 +198,15 @@ JOBS = sa.Table(
               sa.ForeignKey('teams.id', ondelete='CASCADE'),
               nullable=False),
     sa.Column('user_agent', sa.String(255)),
-    sa.Column('client_version', sa.String(255)))
+    sa.Column('client_version', sa.String(255)),
+    sa.Index('jobs_jobdefinition_id_idx', 'jobdefinition_id'),
+    sa.Index('jobs_remoteci_id_jobdefinition_id_created_at_idx',
+             'remoteci_id', 'jobdefinition_id', 'created_at'),
+    sa.Index('jobs_team_id_idx', 'team_id'),
+    sa.Index('jobs_status_idx', 'status'),
+    # only the jobs to recheck are looked up by this flag
+    sa.Index('jobs_recheck_idx', 'remoteci_id',
+             postgresql_where=sa.text('recheck')))
 
 JOIN_JOBS_COMPONENTS = sa.Table(
     'jobs_components', metadata,
@@ -192,7 +215,8 @@ JOIN_JOBS_COMPONENTS = sa.Table(
               nullable=False, primary_key=True),
     sa.Column('component_id', sa.String(36),
               sa.ForeignKey('components.id', ondelete='CASCADE'),
-              nullable=False, primary_key=True))
+              nullable=False, primary_key=True),
+    sa.Index('jobs_components_component_id_idx', 'component_id'))
 
 JOIN_JOBS_ISSUES = sa.Table(
     'jobs_issues', metadata,
@@ -201,7 +225,8 @@ JOIN_JOBS_ISSUES = sa.Table(
               nullable=False, primary_key=True),
     sa.Column('issue_id', sa.String(36),
               sa.ForeignKey('issues.id', ondelete='CASCADE'),
-              nullable=False, primary_key=True))
+              nullable=False, primary_key=True),
+    sa.Index('jobs_issues_issue_id_idx', 'issue_id'))
 
 JOBSTATES = sa.Table(
     'jobstates', metadata,
@@ -216,7 +241,18 @@ JOBSTATES = sa.Table(
               nullable=False),
     sa.Column('team_id', sa.String(36),
               sa.ForeignKey('teams.id', ondelete='CASCADE'),
-              nullable=False))
+              nullable=False),
+    sa.Index('jobstates_job_id_idx', 'job_id'),
+    sa.Index('jobstates_team_id_idx', 'team_id'))
+
+BLOBS = sa.Table(
+    'blobs', metadata,
+    sa.Column('id', sa.String(64), primary_key=True),
+    sa.Column('created_at', sa.DateTime(),
+              default=datetime.datetime.utcnow, nullable=False),
+    sa.Column('size', sa.BIGINT, nullable=True),
+    sa.Column('encoding', sa.String(16)),
+    sa.Column('refcount', sa.Integer, nullable=False, default=0))
 
 FILES = sa.Table(
     'files', metadata,
@@ -227,7 +263,12 @@ FILES = sa.Table(
     sa.Column('name', sa.String(255), nullable=False),
     sa.Column('mime', sa.String),
     sa.Column('md5', sa.String(32)),
+    sa.Column('sha256', sa.String(64)),
     sa.Column('size', sa.BIGINT, nullable=True),
+    sa.Column('encoding', sa.String(16)),
+    sa.Column('blob_id', sa.String(64),
+              sa.ForeignKey('blobs.id'),
+              nullable=True),
     sa.Column('jobstate_id', sa.String(36),
               sa.ForeignKey('jobstates.id', ondelete='CASCADE'),
               nullable=True),
@@ -236,7 +277,111 @@ FILES = sa.Table(
               nullable=False),
     sa.Column('job_id', sa.String(36),
               sa.ForeignKey('jobs.id', ondelete='CASCADE'),
-              nullable=True))
+              nullable=True),
+    sa.Index('files_job_id_idx', 'job_id'),
+    sa.Index('files_jobstate_id_idx', 'jobstate_id'),
+    sa.Index('files_team_id_idx', 'team_id'),
+    sa.Index('files_blob_id_idx', 'blob_id'))
+
+# a blob loses a reference with every file deleted, the ones deleted by
+# cascade with their job, jobstate or team included
+sa.event.listen(FILES, 'after_create', sa.DDL("""
+CREATE OR REPLACE FUNCTION files_release_blob() RETURNS trigger AS $$
+BEGIN
+    UPDATE blobs SET refcount = refcount - 1 WHERE id = OLD.blob_id;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql
+"""))
+sa.event.listen(FILES, 'after_create', sa.DDL("""
+CREATE TRIGGER files_release_blob AFTER DELETE ON files
+FOR EACH ROW WHEN (OLD.blob_id IS NOT NULL)
+EXECUTE PROCEDURE files_release_blob()
+"""))
+# the trigger is dropped with the table, not its function
+sa.event.listen(FILES, 'after_drop', sa.DDL(
+    'DROP FUNCTION IF EXISTS files_release_blob()'))
+
+UPLOADS = sa.Table(
+    'uploads', metadata,
+    sa.Column('id', sa.String(36), primary_key=True,
+              default=utils.gen_uuid),
+    sa.Column('created_at', sa.DateTime(),
+              default=datetime.datetime.utcnow, nullable=False),
+    sa.Column('name', sa.String(255), nullable=False),
+    sa.Column('mime', sa.String),
+    sa.Column('md5', sa.String(32)),
+    sa.Column('sha256', sa.String(64)),
+    sa.Column('size', sa.BIGINT, nullable=False),
+    sa.Column('committing_at', sa.DateTime(), nullable=True),
+    # not deleted by cascade with their team, job or jobstate, the content
+    # of their chunks is removed with them by files.collect_uploads
+    sa.Column('jobstate_id', sa.String(36),
+              sa.ForeignKey('jobstates.id', ondelete='SET NULL'),
+              nullable=True),
+    sa.Column('team_id', sa.String(36),
+              sa.ForeignKey('teams.id', ondelete='SET NULL'),
+              nullable=True),
+    sa.Column('job_id', sa.String(36),
+              sa.ForeignKey('jobs.id', ondelete='SET NULL'),
+              nullable=True),
+    sa.Index('uploads_team_id_idx', 'team_id'),
+    sa.Index('uploads_created_at_idx', 'created_at'))
+
+UPLOADS_CHUNKS = sa.Table(
+    'uploads_chunks', metadata,
+    sa.Column('upload_id', sa.String(36),
+              sa.ForeignKey('uploads.id', ondelete='CASCADE'),
+              primary_key=True),
+    sa.Column('offset', sa.BIGINT, primary_key=True),
+    sa.Column('created_at', sa.DateTime(),
+              default=datetime.datetime.utcnow, nullable=False),
+    sa.Column('size', sa.BIGINT, nullable=False),
+    sa.Column('md5', sa.String(32), nullable=False))
+
+TESTS_RESULTS = sa.Table(
+    'tests_results', metadata,
+    sa.Column('id', sa.String(36), primary_key=True,
+              default=utils.gen_uuid),
+    sa.Column('created_at', sa.DateTime(),
+              default=datetime.datetime.utcnow, nullable=False),
+    sa.Column('name', sa.String(255)),
+    sa.Column('total', sa.Integer, nullable=False),
+    sa.Column('success', sa.Integer, nullable=False),
+    sa.Column('skips', sa.Integer, nullable=False),
+    sa.Column('failures', sa.Integer, nullable=False),
+    sa.Column('errors', sa.Integer, nullable=False),
+    sa.Column('time', sa.Float),
+    # false for a file which is not a valid JUnit file, not parsed again
+    sa.Column('valid', sa.Boolean, nullable=False, default=True),
+    sa.Column('file_id', sa.String(36),
+              sa.ForeignKey('files.id', ondelete='CASCADE'),
+              nullable=False, unique=True),
+    sa.Column('job_id', sa.String(36),
+              sa.ForeignKey('jobs.id', ondelete='CASCADE'),
+              nullable=True),
+    sa.Index('tests_results_job_id_idx', 'job_id'))
+
+TESTS_CASES = sa.Table(
+    'tests_cases', metadata,
+    sa.Column('id', sa.String(36), primary_key=True,
+              default=utils.gen_uuid),
+    sa.Column('created_at', sa.DateTime(),
+              default=datetime.datetime.utcnow, nullable=False),
+    sa.Column('classname', sa.Text, nullable=False),
+    sa.Column('name', sa.Text, nullable=False),
+    sa.Column('status', TESTCASES_STATUSES, nullable=False),
+    sa.Column('duration', sa.Float),
+    sa.Column('file_id', sa.String(36),
+              sa.ForeignKey('files.id', ondelete='CASCADE'),
+              nullable=False),
+    sa.Column('job_id', sa.String(36),
+              sa.ForeignKey('jobs.id', ondelete='CASCADE'),
+              nullable=True),
+    sa.Index('tests_cases_file_id_idx', 'file_id'),
+    sa.Index('tests_cases_job_id_classname_name_idx',
+             'job_id', 'classname', 'name'),
+    sa.Index('tests_cases_name_classname_idx', 'name', 'classname'))
 
 USERS = sa.Table(
     'users', metadata,
@@ -254,7 +399,8 @@ USERS = sa.Table(
     sa.Column('role', ROLES, default=USER_ROLES[0], nullable=False),
     sa.Column('team_id', sa.String(36),
               sa.ForeignKey('teams.id', ondelete='CASCADE'),
-              nullable=False))
+              nullable=False),
+    sa.Index('users_team_id_idx', 'team_id'))
 
 JOIN_USER_REMOTECIS = sa.Table(
     'user_remotecis', metadata,
@@ -263,7 +409,8 @@ JOIN_USER_REMOTECIS = sa.Table(
               nullable=False, primary_key=True),
     sa.Column('remoteci_id', sa.String(36),
               sa.ForeignKey('remotecis.id', ondelete='CASCADE'),
-              nullable=False, primary_key=True)
+              nullable=False, primary_key=True),
+    sa.Index('user_remotecis_remoteci_id_idx', 'remoteci_id')
 )
 
 LOGS = sa.Table(
@@ -278,7 +425,9 @@ LOGS = sa.Table(
     sa.Column('team_id', sa.String(36),
               sa.ForeignKey('teams.id', ondelete='CASCADE'),
               nullable=False),
-    sa.Column('action', sa.Text, nullable=False))
+    sa.Column('action', sa.Text, nullable=False),
+    sa.Index('logs_team_id_created_at_idx', 'team_id', 'created_at'),
+    sa.Index('logs_user_id_idx', 'user_id'))
 
 ISSUES = sa.Table(
     'issues', metadata,
@@ -290,4 +439,12 @@ ISSUES = sa.Table(
               onupdate=datetime.datetime.utcnow,
               default=datetime.datetime.utcnow, nullable=False),
     sa.Column('url', sa.Text, unique=True),
-    sa.Column('tracker', TRACKERS, nullable=False))
+    sa.Column('tracker', TRACKERS, nullable=False),
+    # informations retrieved from the tracker, see issues.refresh_issues
+    sa.Column('data', pg.JSON),
+    sa.Column('status_code', sa.Integer),
+    sa.Column('refreshed_at', sa.DateTime()),
+    # validators of the last tracker response, for conditional requests
+    sa.Column('etag', sa.Text),
+    sa.Column('last_modified', sa.Text),
+    sa.Index('issues_refreshed_at_idx', 'refreshed_at'))
@@ -40,6 +40,35 @@ SQLALCHEMY_POOL_SIZE = 20
 SQLALCHEMY_MAX_OVERFLOW = 0
 SQLALCHEMY_NATIVE_UNICODE = True
 
+# Successful authentications are cached in each worker to avoid checking
+# the password hash on every request. A size of 0 disables the cache.
+AUTH_CACHE_SIZE = 1024
+AUTH_CACHE_TTL = 300  # seconds
+
+# Secret used to sign the tokens delivered by /api/v1/tokens, token
+# authentication is disabled as long as it is not set. It must be the same
+# on all the API servers.
+TOKEN_SECRET_KEY = None
+TOKEN_TTL = 3600  # seconds
+
+# The informations of the issues are retrieved from their tracker the first
+# time they are read then served from the database. When
+# ISSUES_REFRESH_ENABLED, a background thread of the application refreshes
+# every ISSUES_REFRESH_INTERVAL the ones older than ISSUES_CACHE_TTL, it
+# should be enabled in a single process of the deployment.
+ISSUES_CACHE_TTL = 3600  # seconds
+ISSUES_REFRESH_ENABLED = False
+ISSUES_REFRESH_INTERVAL = 300  # seconds
+
+# The issue trackers are requested concurrently by TRACKERS_POOL_SIZE
+# threads with a timeout. A tracker which failed TRACKERS_BREAKER_THRESHOLD
+# times in a row is not requested for TRACKERS_BREAKER_RESET seconds, the
+# last known informations of its issues are returned meanwhile.
+TRACKERS_TIMEOUT = 5  # seconds
+TRACKERS_POOL_SIZE = 8
+TRACKERS_BREAKER_THRESHOLD = 5
+TRACKERS_BREAKER_RESET = 60  # seconds
+
 
 # Logging related parameters
 PROD_LOG_FORMAT = '[%(asctime)s] %(levelname)s in %(module)s: %(message)s'
@@ -67,3 +96,41 @@ X_HEADERS = 'Authorization, Content-Type, If-Match, ETag, X-Requested-With'
 MAX_CONTENT_LENGTH = 20 * 1024 * 1024
 
 FILES_UPLOAD_FOLDER = '/var/lib/dci-control-server/files'
+# Where the content of the files is stored:
+# - 'file': in FILES_UPLOAD_FOLDER, shared by the API nodes with NFS if
+#   there are several of them,
+# - 'swift': in the container of an OpenStack Swift, or Swift compatible,
+#   object storage at FILES_SWIFT_URL, for instance
+#   https://swift.example.com/v1/AUTH_dci/files. FILES_SWIFT_TOKEN is sent
+#   in the X-Auth-Token header. Only the 'stream' FILES_DELIVERY is
+#   available with it.
+FILES_STORE = 'file'
+FILES_SWIFT_URL = None
+FILES_SWIFT_TOKEN = None
+FILES_SWIFT_TIMEOUT = 60  # seconds
+# In the content addressed storage the identical uploads share a single
+# blob named by the SHA-256 of their content. The files uploaded before it
+# was enabled are moved to their blob the first time they are read.
+FILES_CONTENT_ADDRESSED = False
+
+# How the content of the files is sent:
+# - 'stream': read in chunks by the WSGI worker,
+# - 'file_wrapper': given to the wsgi.file_wrapper of the WSGI server, which
+#   may send it with sendfile(2),
+# - 'x-sendfile': left to the front server with an X-Sendfile header
+#   holding the path of the file (Apache mod_xsendfile, lighttpd),
+# - 'x-accel-redirect': left to nginx with an X-Accel-Redirect header, the
+#   path of the file relative to FILES_UPLOAD_FOLDER is appended to
+#   FILES_ACCEL_REDIRECT_LOCATION, an internal location of nginx.
+FILES_DELIVERY = 'stream'
+FILES_ACCEL_REDIRECT_LOCATION = '/files/'
+
+# The uploads in chunks not committed after FILES_UPLOADS_TTL are removed
+# with their chunks. A commit interrupted, by a restart of the server for
+# instance, can be retried after FILES_UPLOADS_COMMIT_TIMEOUT.
+FILES_UPLOADS_TTL = 24 * 3600  # seconds
+FILES_UPLOADS_COMMIT_TIMEOUT = 3600  # seconds
+
+# Compress the files uploaded on disk, None or 'gzip'. They are sent
+# compressed to the clients accepting it and decompressed for the others.
+FILES_COMPRESSION = None
@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2016 Red Hat, Inc
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+import abc
+
+import six
+
+
+class NotFound(Exception):
+    """The content of the key does not exist in the store."""
+
+
+@six.add_metaclass(abc.ABCMeta)
+class Store(object):
+    """Where the content of the files is stored. The contents are named by
+    keys like relative paths, 'team_id/xx/yy/zz/file_id' for instance, and
+    read and written as iterators of chunks of bytes so that no content is
+    loaded in memory.
+    """
+
+    @abc.abstractmethod
+    def put(self, key, chunks):
+        """Write the chunks of bytes as the content of key."""
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def get(self, key):
+        """Return an iterator of the chunks of bytes of the content of key,
+        raise NotFound if it does not exist.
+        """
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def get_range(self, key, start, stop):
+        """Return an iterator of the chunks of bytes of the content of key
+        from start to stop excluded.
+        """
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def delete(self, key):
+        """Remove the content of key if it exists."""
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def stat(self, key):
+        """Return the informations of the content of key, its 'size' for
+        now, raise NotFound if it does not exist.
+        """
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def copy(self, key, new_key):
+        """Copy the content of key to new_key, raise NotFound if it does
+        not exist.
+        """
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def rename(self, key, new_key):
+        """Move the content of key to new_key."""
+        raise NotImplementedError
+
+    def local_path(self, key):
+        """Return the path of the content of key in the local file system,
+        None if the store is not local.
+        """
+        return None
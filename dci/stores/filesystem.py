@@ -0,0 +1,106 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2016 Red Hat, Inc
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+
+import errno
+import os
+
+from dci.common import utils
+from dci import stores
+
+
+def _makedirs(directory):
+    try:
+        os.makedirs(directory)
+    except OSError as e:
+        # created by a concurrent request
+        if e.errno != errno.EEXIST:
+            raise
+
+
+class FileStore(stores.Store):
+    """Store the files in a folder of the local file system, or of a
+    shared one like NFS to serve them from several API nodes.
+    """
+
+    def __init__(self, folder):
+        self.folder = folder
+
+    def local_path(self, key):
+        return os.path.join(self.folder, key)
+
+    def put(self, key, chunks):
+        path = self.local_path(key)
+        _makedirs(os.path.dirname(path))
+        # written aside then renamed, the readers and the concurrent writers
+        # of the same key never see a partial content
+        tmp_path = '%s.%s.tmp' % (path, utils.gen_uuid())
+        with open(tmp_path, 'wb') as f:
+            try:
+                for chunk in chunks:
+                    f.write(chunk)
+            except Exception:
+                # the upload failed
+                os.remove(tmp_path)
+                raise
+        os.rename(tmp_path, path)
+
+    def get(self, key):
+        path = self.local_path(key)
+        if not os.path.exists(path):
+            raise stores.NotFound(key)
+        return utils.read(path)
+
+    def get_range(self, key, start, stop):
+        path = self.local_path(key)
+        if not os.path.exists(path):
+            raise stores.NotFound(key)
+        return utils.read_range(path, start, stop)
+
+    def delete(self, key):
+        try:
+            os.remove(self.local_path(key))
+        except OSError as e:
+            if e.errno != errno.ENOENT:
+                raise
+
+    def stat(self, key):
+        try:
+            return {'size': os.path.getsize(self.local_path(key))}
+        except OSError as e:
+            if e.errno != errno.ENOENT:
+                raise
+            raise stores.NotFound(key)
+
+    def copy(self, key, new_key):
+        path, new_path = self.local_path(key), self.local_path(new_key)
+        if not os.path.exists(path):
+            raise stores.NotFound(key)
+        _makedirs(os.path.dirname(new_path))
+        tmp_path = '%s.%s.tmp' % (new_path, utils.gen_uuid())
+        try:
+            # the content is shared, not copied
+            os.link(path, tmp_path)
+        except OSError:
+            # a file system without hard links
+            self.put(new_key, self.get(key))
+        else:
+            os.rename(tmp_path, new_path)
+
+    def rename(self, key, new_key):
+        new_path = self.local_path(new_key)
+        _makedirs(os.path.dirname(new_path))
+        os.rename(self.local_path(key), new_path)
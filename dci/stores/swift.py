@@ -0,0 +1,107 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2016 Red Hat, Inc
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+
+from dci.common import utils
+from dci import stores
+
+import requests
+from six.moves.urllib.parse import quote
+from six.moves.urllib.parse import urlparse
+
+
+# size of the chunks read from the responses
+_CHUNK_SIZE = 1024 ** 2
+
+# one session shared by the stores to reuse the connections
+session = requests.Session()
+
+
+class SwiftStore(stores.Store):
+    """Store the files as the objects of a container of an OpenStack Swift
+    object storage, or of a service implementing its API like Ceph RGW.
+    All the API nodes see the same files without sharing a file system.
+
+    container_url is the URL of the container, for instance
+    https://swift.example.com/v1/AUTH_dci/files, token is sent in the
+    X-Auth-Token header.
+    """
+
+    def __init__(self, container_url, token=None, timeout=60):
+        self.container_url = container_url.rstrip('/')
+        self.container = urlparse(self.container_url).path.split('/')[-1]
+        self.headers = {'X-Auth-Token': token} if token else {}
+        self.timeout = timeout
+
+    def _request(self, method, key, headers=None, **kwargs):
+        all_headers = dict(self.headers)
+        all_headers.update(headers or {})
+        result = session.request(method,
+                                 '%s/%s' % (self.container_url, quote(key)),
+                                 headers=all_headers, timeout=self.timeout,
+                                 **kwargs)
+        if result.status_code == 404:
+            result.close()
+            raise stores.NotFound(key)
+        result.raise_for_status()
+        return result
+
+    @staticmethod
+    def _iter_content(result):
+        try:
+            for chunk in result.iter_content(_CHUNK_SIZE):
+                yield chunk
+        finally:
+            result.close()
+
+    def put(self, key, chunks):
+        # the chunks are sent with a chunked transfer encoding as they come
+        self._request('PUT', key, data=iter(chunks)).close()
+
+    def get(self, key):
+        return self._iter_content(self._request('GET', key, stream=True))
+
+    def get_range(self, key, start, stop):
+        if start >= stop:
+            return iter([])
+        headers = {'Range': 'bytes=%s-%s' % (start, stop - 1)}
+        result = self._request('GET', key, headers=headers, stream=True)
+        chunks = self._iter_content(result)
+        if result.status_code != 206:
+            # the whole content was sent
+            chunks = utils.slice_chunks(chunks, start, stop)
+        return chunks
+
+    def delete(self, key):
+        try:
+            self._request('DELETE', key).close()
+        except stores.NotFound:
+            pass
+
+    def stat(self, key):
+        result = self._request('HEAD', key)
+        result.close()
+        return {'size': int(result.headers['Content-Length'])}
+
+    def copy(self, key, new_key):
+        # server side copy, the content does not go through the API node
+        headers = {'X-Copy-From': '/%s/%s' % (self.container, quote(key)),
+                   'Content-Length': '0'}
+        self._request('PUT', new_key, headers=headers).close()
+
+    def rename(self, key, new_key):
+        self.copy(key, new_key)
+        self.delete(key)
@@ -14,6 +14,156 @@
 # License for the specific language governing permissions and limitations
 # under the License.
 
+from dci import settings
+
+import collections
+import multiprocessing
+from multiprocessing import pool as mp_pool
+import requests
+from requests import adapters
+from six.moves.urllib.parse import urlparse
+import threading
+import time
+
+
+# the defaults, the configuration of the application is applied by
+# configure
+TIMEOUT = settings.TRACKERS_TIMEOUT
+POOL_SIZE = settings.TRACKERS_POOL_SIZE
+
+# one session shared by all the trackers to reuse the connections
+session = requests.Session()
+
+
+def _mount_adapters():
+    session.mount('http://', adapters.HTTPAdapter(pool_maxsize=POOL_SIZE))
+    session.mount('https://', adapters.HTTPAdapter(pool_maxsize=POOL_SIZE))
+
+
+_mount_adapters()
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+class CircuitOpen(requests.exceptions.RequestException):
+    """The tracker host is considered down, it is not contacted."""
+
+
+class CircuitBreaker(object):
+    """Count the consecutive failures of each tracker host. Once a host
+    reached threshold failures, the requests to it fail immediately during
+    reset_timeout seconds before it is tried again.
+    """
+
+    def __init__(self, threshold, reset_timeout):
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+        self._failures = {}
+        self._lock = threading.Lock()
+
+    def check(self, host):
+        with self._lock:
+            failures, failed_at = self._failures.get(host, (0, None))
+        if (failures >= self.threshold and
+                time.time() - failed_at < self.reset_timeout):
+            raise CircuitOpen('%s is unavailable' % host)
+
+    def success(self, host):
+        with self._lock:
+            self._failures.pop(host, None)
+
+    def failure(self, host):
+        with self._lock:
+            failures, _ = self._failures.get(host, (0, None))
+            self._failures[host] = (failures + 1, time.time())
+
+
+breaker = CircuitBreaker(settings.TRACKERS_BREAKER_THRESHOLD,
+                         settings.TRACKERS_BREAKER_RESET)
+
+
+def configure(conf):
+    """Apply the TRACKERS_* settings of the configuration of the
+    application.
+    """
+    global TIMEOUT, POOL_SIZE, _pool
+    TIMEOUT = conf['TRACKERS_TIMEOUT']
+    breaker.threshold = conf['TRACKERS_BREAKER_THRESHOLD']
+    breaker.reset_timeout = conf['TRACKERS_BREAKER_RESET']
+    if conf['TRACKERS_POOL_SIZE'] != POOL_SIZE:
+        POOL_SIZE = conf['TRACKERS_POOL_SIZE']
+        _mount_adapters()
+        with _pool_lock:
+            if _pool is not None:
+                _pool.close()
+                _pool = None
+
+
+def get(url, headers=None):
+    """GET the url with the shared session and the timeout, through the
+    circuit breaker of its host.
+    """
+    host = urlparse(url).netloc
+    breaker.check(host)
+    try:
+        result = session.get(url, headers=headers, timeout=TIMEOUT)
+    except requests.exceptions.RequestException:
+        breaker.failure(host)
+        raise
+
+    if result.status_code >= 500:
+        breaker.failure(host)
+    else:
+        breaker.success(host)
+    return result
+
+
+def _get_pool():
+    # created on first use, the threads would not survive a fork of the
+    # worker processes
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = mp_pool.ThreadPool(POOL_SIZE)
+    return _pool
+
+
+def retrieve_all(issues):
+    """Retrieve concurrently the informations of the (tracker class, url,
+    validators) issues and return their dumps in the same order.
+
+    The validators are the etag and last_modified of the previous dump of
+    the issue, if any, for the trackers supporting conditional requests.
+    The dump of an issue is None if its tracker failed or did not answer in
+    time, the others are still returned.
+    """
+    issues_by_class = collections.OrderedDict()
+    for index, (tracker_class, url, validators) in enumerate(issues):
+        issues_by_class.setdefault(tracker_class, []).append(
+            (index, url, validators))
+
+    results = []
+    for tracker_class, class_issues in issues_by_class.items():
+        for batch in tracker_class.batches(class_issues):
+            result = _get_pool().apply_async(
+                tracker_class.retrieve_batch,
+                ([(url, validators) for _, url, validators in batch],))
+            results.append(([index for index, _, _ in batch], result))
+
+    deadline = time.time() + TIMEOUT
+    dumps = [None] * len(issues)
+    for indexes, result in results:
+        try:
+            batch_dumps = result.get(max(deadline - time.time(), 0))
+        except (multiprocessing.TimeoutError,
+                requests.exceptions.RequestException):
+            continue
+        for index, dump in zip(indexes, batch_dumps):
+            dumps[index] = dump
+
+    return dumps
+
 
 class Tracker(object):
 
@@ -36,6 +186,22 @@ class Tracker(object):
         """Retrieve informations for a specific issue in a tracker."""
         raise Exception('Not Implemented')
 
+    @classmethod
+    def batches(cls, issues):
+        """Split the (index, url, validators) issues in the groups retrieved
+        together, one issue per group unless the tracker supports
+        retrieve_batch.
+        """
+        return [[issue] for issue in issues]
+
+    @classmethod
+    def retrieve_batch(cls, issues):
+        """Retrieve the (url, validators) issues of a group and return their
+        dumps.
+        """
+        return [cls(url, **(validators or {})).dump()
+                for url, validators in issues]
+
     def dump(self):
         """Return the object itself."""
 
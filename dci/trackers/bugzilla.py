@@ -14,56 +14,103 @@
 # License for the specific language governing permissions and limitations
 # under the License.
 
-import requests
-
 from dci import trackers
 from six.moves.urllib.parse import urlparse
 from xml.etree import ElementTree
 
+import collections
+
 
 _URI_BASE = 'show_bug.cgi?ctype=xml&id='
 
+# number of bugs requested at once, to keep the url short enough
+BATCH_SIZE = 50
+
+
+def _split_url(url):
+    """Return the base url of the Bugzilla and the ticket id of the url."""
+
+    parsed_url = urlparse(url)
+    for item in parsed_url.query.split('&'):
+        if 'id=' in item:
+            ticket_id = item.split('=')[1]
+            break
+
+    return '%s://%s' % (parsed_url.scheme, parsed_url.netloc), ticket_id
+
 
 class Bugzilla(trackers.Tracker):
 
-    def __init__(self, url):
+    def __init__(self, url, status_code=None, bug=None):
+        # set when the bug has already been retrieved by retrieve_batch
+        self._retrieved = status_code, bug
         super(Bugzilla, self).__init__(url)
 
-    def retrieve_info(self):
-        """Query Bugzilla API to retrieve the needed infos."""
+    @classmethod
+    def batches(cls, issues):
+        """Group the issues by Bugzilla host."""
 
-        scheme = urlparse(self.url).scheme
-        netloc = urlparse(self.url).netloc
-        query = urlparse(self.url).query
+        batches = collections.OrderedDict()
+        for issue in issues:
+            batches.setdefault(_split_url(issue[1])[0], []).append(issue)
+        return [issues[i:i + BATCH_SIZE]
+                for issues in batches.values()
+                for i in range(0, len(issues), BATCH_SIZE)]
 
-        for item in query.split('&'):
-            if 'id=' in item:
-                ticket_id = item.split('=')[1]
-                break
+    @classmethod
+    def retrieve_batch(cls, issues):
+        """Retrieve the bugs of a same Bugzilla in one request."""
 
-        bugzilla_url = '%s://%s/%s%s' % (scheme, netloc, _URI_BASE, ticket_id)
-
-        result = requests.get(bugzilla_url)
-        self.status_code = result.status_code
+        urls = [url for url, _ in issues]
+        base_url = _split_url(urls[0])[0]
+        ticket_ids = [_split_url(url)[1] for url in urls]
+        bugzilla_url = '%s/%s%s' % (base_url, _URI_BASE,
+                                    '&id='.join(ticket_ids))
 
+        result = trackers.get(bugzilla_url)
+        bugs = {}
         if result.status_code == 200:
             tree = ElementTree.fromstring(result.content)
+            for bug in tree.findall('./bug'):
+                bugs[bug.findtext('bug_id')] = bug
+
+        return [cls(url, result.status_code, bugs.get(ticket_id)).dump()
+                for url, ticket_id in zip(urls, ticket_ids)]
+
+    def retrieve_info(self):
+        """Query Bugzilla API to retrieve the needed infos."""
+
+        status_code, bug = self._retrieved
+        if status_code is None:
+            base_url, ticket_id = _split_url(self.url)
+            bugzilla_url = '%s/%s%s' % (base_url, _URI_BASE, ticket_id)
+
+            result = trackers.get(bugzilla_url)
+            status_code = result.status_code
+            if status_code == 200:
+                bug = ElementTree.fromstring(result.content).find('./bug')
+
+        self.status_code = status_code
+        if status_code != 200:
+            return
+        if bug is None or bug.get('error'):
+            # the bug does not exist or is private
+            self.status_code = 404
+            return
 
-            self.title = tree.findall("./bug/short_desc").pop().text
-            self.issue_id = tree.findall("./bug/bug_id").pop().text
-            self.reporter = tree.findall("./bug/reporter").pop().text
-            self.assignee = tree.findall("./bug/assigned_to").pop().text
-            self.status = tree.findall("./bug/bug_status").pop().text
-            self.product = tree.findall("./bug/product").pop().text
-            self.component = tree.findall("./bug/component").pop().text
-            self.created_at = tree.findall("./bug/creation_ts").pop().text
-            self.updated_at = tree.findall("./bug/delta_ts").pop().text
-            try:
-                self.closed_at = (
-                    tree.findall("./bug/cf_last_closed").pop().text
-                )
-            except IndexError:
-                # cf_last_closed is present only if the issue has been closed
-                # if not present it raises an IndexError, meaning the issue
-                # isn't closed yet, which is a valid use case.
-                pass
+        self.title = bug.findall("./short_desc").pop().text
+        self.issue_id = bug.findall("./bug_id").pop().text
+        self.reporter = bug.findall("./reporter").pop().text
+        self.assignee = bug.findall("./assigned_to").pop().text
+        self.status = bug.findall("./bug_status").pop().text
+        self.product = bug.findall("./product").pop().text
+        self.component = bug.findall("./component").pop().text
+        self.created_at = bug.findall("./creation_ts").pop().text
+        self.updated_at = bug.findall("./delta_ts").pop().text
+        try:
+            self.closed_at = bug.findall("./cf_last_closed").pop().text
+        except IndexError:
+            # cf_last_closed is present only if the issue has been closed
+            # if not present it raises an IndexError, meaning the issue
+            # isn't closed yet, which is a valid use case.
+            pass
@@ -14,8 +14,6 @@
 # License for the specific language governing permissions and limitations
 # under the License.
 
-import requests
-
 from dci import trackers
 from six.moves.urllib.parse import urlparse
 
@@ -25,7 +23,11 @@ _URL_BASE = 'https://api.github.com/repos'
 
 class Github(trackers.Tracker):
 
-    def __init__(self, url):
+    def __init__(self, url, etag=None, last_modified=None):
+        # validators of the previous response, GitHub answers 304 without
+        # counting it in the rate limit if the issue did not change
+        self.etag = etag
+        self.last_modified = last_modified
         super(Github, self).__init__(url)
 
     def retrieve_info(self):
@@ -37,10 +39,18 @@ class Github(trackers.Tracker):
         github_url = '%s/%s/%s/issues/%s' % (_URL_BASE, path[0],
                                              path[1], path[3])
 
-        result = requests.get(github_url)
+        headers = {}
+        if self.etag:
+            headers['If-None-Match'] = self.etag
+        if self.last_modified:
+            headers['If-Modified-Since'] = self.last_modified
+
+        result = trackers.get(github_url, headers=headers)
         self.status_code = result.status_code
 
         if result.status_code == 200:
+            self.etag = result.headers.get('ETag')
+            self.last_modified = result.headers.get('Last-Modified')
             result = result.json()
             self.title = result['title']
             self.issue_id = result['number']
@@ -53,3 +63,8 @@ class Github(trackers.Tracker):
             self.created_at = result['created_at']
             self.updated_at = result['updated_at']
             self.closed_at = result['closed_at']
+
+    def dump(self):
+        dump = super(Github, self).dump()
+        dump.update({'etag': self.etag, 'last_modified': self.last_modified})
+        return dump
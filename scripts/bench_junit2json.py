@@ -0,0 +1,71 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2016 Red Hat, Inc
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+"""Measure the time spent by transformations.junit2json per JUnit file.
+
+usage: bench_junit2json.py [number of testcases per file]
+"""
+
+from __future__ import print_function
+
+import sys
+import timeit
+
+import lxml.etree as ET
+
+from dci.api.v1 import transformations
+
+TESTCASE = ('<testcase classname="tests.test_app" file="tests/test_app.py" '
+            'name="test_%s" time="0.5"/>')
+
+
+def junit(nb_testcases):
+    return ('<testsuite errors="0" failures="0" name="bench" skips="0" '
+            'tests="%s" time="1">%s</testsuite>' %
+            (nb_testcases, ''.join(TESTCASE % i
+                                   for i in range(nb_testcases))))
+
+
+def junit2json_uncached(string):
+    # junit2json before the transform was cached
+    xslt = ET.fromstring(transformations._XSL)
+    dom = ET.fromstring(string)
+    for tc in dom.xpath('//testcase'):
+        if len(tc.xpath('child::*')) > 0:
+            to_clean_string = tc.xpath('child::*')[0].text or ''
+            to_clean_string = to_clean_string.replace('"', "'")
+            to_clean_string = to_clean_string.replace('\n', '\\n')
+            tc.xpath('child::*')[0].text = to_clean_string
+    transform = ET.XSLT(xslt)
+    return str(transform(dom))
+
+
+def main():
+    nb_testcases = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    string = junit(nb_testcases)
+    number = 1000
+
+    for name, func in (('uncached', junit2json_uncached),
+                       ('cached', transformations.junit2json)):
+        seconds = min(timeit.repeat(lambda: func(string), number=number,
+                                    repeat=3))
+        print('%-8s %8.1f us per file of %s testcases' %
+              (name, seconds / number * 1e6, nb_testcases))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,104 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2016 Red Hat, Inc
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+"""Compare the time and the memory used by junit2json and junit_file2json
+on a synthetic JUnit file, one failure every ten testcases.
+
+usage: bench_junit_file2json.py [number of testcases]
+"""
+
+from __future__ import print_function
+
+import hashlib
+import json
+import multiprocessing
+import os
+import resource
+import sys
+import tempfile
+import time
+
+from dci.api.v1 import transformations
+
+TESTCASE = ('<testcase classname="tempest.api.compute.test_servers" '
+            'file="tempest/api/compute/test_servers.py" '
+            'name="test_%s[id-%s,smoke]" time="0.5">%s</testcase>\n')
+FAILURE = ('<failure message="assertion failed" type="AssertionError">'
+           'Traceback (most recent call last):\n  File "test.py", line 1\n'
+           'AssertionError: "a" != "b"\n</failure>')
+
+
+def write_junit(f, nb_testcases):
+    f.write('<testsuite errors="0" failures="%s" name="bench" skips="0" '
+            'tests="%s" time="1">\n' % (nb_testcases // 10, nb_testcases))
+    f.write('<properties><property name="x" value="y"/></properties>\n')
+    for i in range(nb_testcases):
+        f.write(TESTCASE % (i, i, FAILURE if i % 10 == 0 else ''))
+    f.write('</testsuite>\n')
+
+
+def from_string(file_path):
+    with open(file_path) as f:
+        return transformations.junit2json(f.read())
+
+
+def from_file(file_path):
+    with open(file_path, 'rb') as f:
+        return transformations.junit_file2json(f)
+
+
+def run(func, file_path, queue):
+    start = time.time()
+    result = func(file_path)
+    seconds = time.time() - start
+    # ru_maxrss is in kilobytes on Linux
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # only a digest goes back, the parent must stay small for the next fork
+    result = json.dumps(json.loads(result), sort_keys=True)
+    queue.put((seconds, max_rss, hashlib.md5(result.encode()).hexdigest()))
+
+
+def main():
+    nb_testcases = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    fd, file_path = tempfile.mkstemp(suffix='.xml')
+    with os.fdopen(fd, 'w') as f:
+        write_junit(f, nb_testcases)
+    print('%s testcases, %.1f MB' %
+          (nb_testcases, os.path.getsize(file_path) / 1024.0 / 1024))
+
+    results = []
+    try:
+        for name, func in (('junit2json', from_string),
+                           ('junit_file2json', from_file)):
+            # a process per converter to measure its own peak memory
+            queue = multiprocessing.Queue()
+            process = multiprocessing.Process(target=run,
+                                              args=(func, file_path, queue))
+            process.start()
+            seconds, max_rss, result = queue.get()
+            process.join()
+            results.append(result)
+            print('%-16s %6.2f s %8.1f MB max RSS' %
+                  (name, seconds, max_rss / 1024.0))
+    finally:
+        os.unlink(file_path)
+
+    print('same JSON: %s' % (results[0] == results[1]))
+
+
+if __name__ == '__main__':
+    main()
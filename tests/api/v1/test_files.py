@@ -18,8 +18,13 @@ from __future__ import unicode_literals
 import pytest
 
 from dci.api.v1 import utils as v1_utils
+from dci.db import models
 
 import collections
+import datetime
+import gzip
+import hashlib
+import io
 import os
 import tests.utils
 
@@ -52,6 +57,24 @@ def test_create_files(admin, jobstate_id, team_admin_id):
         assert f.read() == 'content'
 
 
+def test_create_files_digests(admin, jobstate_id):
+    headers = {'DCI-JOBSTATE-ID': jobstate_id, 'DCI-NAME': 'kikoolol',
+               'DCI-MD5': hashlib.md5(b'content').hexdigest(),
+               'Content-Type': 'text/plain'}
+    file = admin.post('/api/v1/files', headers=headers, data='content')
+    assert file.status_code == 201
+
+    file = admin.get('/api/v1/files/%s' % file.data['file']['id']).data
+    assert file['file']['md5'] == hashlib.md5(b'content').hexdigest()
+    assert (file['file']['sha256'] ==
+            hashlib.sha256(b'content').hexdigest())
+
+    headers['DCI-MD5'] = hashlib.md5(b'other').hexdigest()
+    file = admin.post('/api/v1/files', headers=headers, data='content')
+    assert file.status_code == 400
+    assert admin.get('/api/v1/files').data['_meta']['count'] == 1
+
+
 def test_create_files_jobstate_id_and_job_id_missing(admin, team_admin_id):
     file = admin.post('/api/v1/files', headers={'DCI-NAME': 'kikoolol'},
                       data='content')
@@ -201,6 +224,216 @@ def test_delete_file_by_id(admin, jobstate_id):
     gfile = admin.get(url)
     assert gfile.status_code == 404
 
+
+def test_create_files_content_addressed(app, engine, admin, jobstate_id):
+    app.config['FILES_CONTENT_ADDRESSED'] = True
+    files_ids = [post_file(admin, jobstate_id, FileDesc('foo', 'content')),
+                 post_file(admin, jobstate_id, FileDesc('bar', 'content'))]
+
+    sha256 = hashlib.sha256(b'content').hexdigest()
+    blob_path = os.path.join(_FILES_FOLDER, v1_utils.build_blob_key(sha256))
+    blob = engine.execute(models.BLOBS.select()).fetchone()
+    assert blob['id'] == sha256
+    assert blob['refcount'] == 2
+    assert os.path.exists(blob_path)
+
+    for file_id in files_ids:
+        file = admin.get('/api/v1/files/%s' % file_id).data['file']
+        assert file['blob_id'] == sha256
+        content = admin.get('/api/v1/files/%s/content' % file_id)
+        assert content.data == 'content'
+
+    admin.delete('/api/v1/files/%s' % files_ids[0])
+    assert engine.execute(models.BLOBS.select()).fetchone()['refcount'] == 1
+    assert os.path.exists(blob_path)
+
+    admin.delete('/api/v1/files/%s' % files_ids[1])
+    assert engine.execute(models.BLOBS.select()).fetchone() is None
+    assert not os.path.exists(blob_path)
+
+
+def test_delete_job_releases_blobs(app, engine, admin, job_id, jobstate_id):
+    app.config['FILES_CONTENT_ADDRESSED'] = True
+    post_file(admin, jobstate_id, FileDesc('foo', 'content'))
+    sha256 = hashlib.sha256(b'content').hexdigest()
+    blob_path = os.path.join(_FILES_FOLDER, v1_utils.build_blob_key(sha256))
+    assert os.path.exists(blob_path)
+
+    job_etag = admin.get('/api/v1/jobs/%s' % job_id).headers.get('ETag')
+    deleted_job = admin.delete('/api/v1/jobs/%s' % job_id,
+                               headers={'If-match': job_etag})
+    assert deleted_job.status_code == 204
+
+    # the file is deleted by cascade, its blob with it
+    assert engine.execute(models.BLOBS.select()).fetchone() is None
+    assert not os.path.exists(blob_path)
+
+
+def test_get_file_content_moved_to_blob(app, admin, jobstate_id,
+                                        team_admin_id):
+    file_id = post_file(admin, jobstate_id, FileDesc('foo', 'content'))
+    file_path = v1_utils.build_file_path(_FILES_FOLDER, team_admin_id,
+                                         file_id, create=False)
+    assert os.path.exists(file_path)
+
+    app.config['FILES_CONTENT_ADDRESSED'] = True
+    content = admin.get('/api/v1/files/%s/content' % file_id)
+    assert content.data == 'content'
+
+    file = admin.get('/api/v1/files/%s' % file_id).data['file']
+    assert file['blob_id'] == hashlib.sha256(b'content').hexdigest()
+    assert not os.path.exists(file_path)
+    assert admin.get('/api/v1/files/%s/content' % file_id).data == 'content'
+
+
+def create_upload(client, jobstate_id, content, **kwargs):
+    data = {'name': 'big', 'size': len(content), 'jobstate_id': jobstate_id}
+    data.update(kwargs)
+    res = client.post('/api/v1/files/uploads', data=data,
+                      headers={'Content-Type': 'application/json'})
+    assert res.status_code == 201
+    return res.data['upload']['id']
+
+
+def put_chunk(client, upload_id, offset, content, headers=None):
+    all_headers = {'Content-Type': 'application/octet-stream'}
+    all_headers.update(headers or {})
+    return client.put('/api/v1/files/uploads/%s/chunks/%s' %
+                      (upload_id, offset), headers=all_headers, data=content)
+
+
+def test_upload_in_chunks(admin, jobstate_id, team_admin_id):
+    content = '0123456789abcdefghijklmnopqrst'
+    upload_id = create_upload(
+        admin, jobstate_id, content,
+        md5=hashlib.md5(content.encode('utf-8')).hexdigest())
+
+    # the chunks are sent in any order
+    for offset in (20, 0, 10):
+        chunk = put_chunk(admin, upload_id, offset,
+                          content[offset:offset + 10])
+        assert chunk.status_code == 201
+        assert chunk.data['chunk']['size'] == 10
+
+    upload = admin.get('/api/v1/files/uploads/%s' % upload_id).data
+    assert [c['offset'] for c in upload['upload']['chunks']] == [0, 10, 20]
+
+    file = admin.post('/api/v1/files/uploads/%s/commit' % upload_id)
+    assert file.status_code == 201
+    assert file.data['file']['id'] == upload_id
+    assert file.data['file']['size'] == 30
+    assert (file.data['file']['sha256'] ==
+            hashlib.sha256(content.encode('utf-8')).hexdigest())
+
+    get_file = admin.get('/api/v1/files/%s/content' % upload_id)
+    assert get_file.data == content
+
+    # the upload and its chunks are removed
+    upload = admin.get('/api/v1/files/uploads/%s' % upload_id)
+    assert upload.status_code == 404
+    for offset in (0, 10, 20):
+        key = v1_utils.build_chunk_key(upload_id, offset)
+        assert not os.path.exists(os.path.join(_FILES_FOLDER, key))
+
+
+def test_upload_resumed(admin, jobstate_id):
+    upload_id = create_upload(admin, jobstate_id, 'abcdef')
+    put_chunk(admin, upload_id, 0, 'abX')
+
+    url = '/api/v1/files/uploads/%s/commit' % upload_id
+    assert admin.post(url).status_code == 409
+    assert put_chunk(admin, upload_id, 3, 'defg').status_code == 400
+
+    # a chunk sent again replaces the previous one
+    put_chunk(admin, upload_id, 0, 'abc')
+    put_chunk(admin, upload_id, 3, 'def')
+    file = admin.post(url)
+    assert file.status_code == 201
+    assert admin.get('/api/v1/files/%s/content' % upload_id).data == 'abcdef'
+
+
+def test_upload_digest_mismatch(admin, jobstate_id):
+    upload_id = create_upload(admin, jobstate_id, 'abc', sha256='0' * 64)
+    put_chunk(admin, upload_id, 0, 'abc')
+
+    url = '/api/v1/files/uploads/%s' % upload_id
+    assert admin.post(url + '/commit').status_code == 400
+    assert admin.get('/api/v1/files/%s' % upload_id).status_code == 404
+    assert admin.get(url).data['upload']['committing_at'] is None
+
+    assert admin.delete(url).status_code == 204
+    assert admin.get(url).status_code == 404
+
+    upload_id = create_upload(admin, jobstate_id, 'abc')
+    chunk = put_chunk(admin, upload_id, 0, 'abc', {'DCI-MD5': '0' * 32})
+    assert chunk.status_code == 400
+
+
+def test_upload_commit_interrupted(app, engine, admin, jobstate_id):
+    upload_id = create_upload(admin, jobstate_id, 'abc')
+    put_chunk(admin, upload_id, 0, 'abc')
+    url = '/api/v1/files/uploads/%s' % upload_id
+
+    def set_committing_at(committing_at):
+        engine.execute(models.UPLOADS.update()
+                       .where(models.UPLOADS.c.id == upload_id)
+                       .values(committing_at=committing_at))
+
+    # being committed, the upload can not change
+    set_committing_at(datetime.datetime.utcnow())
+    assert put_chunk(admin, upload_id, 0, 'abc').status_code == 409
+    assert admin.post(url + '/commit').status_code == 409
+    assert admin.delete(url).status_code == 409
+
+    # the commit is given up after the timeout
+    set_committing_at(datetime.datetime.utcnow() -
+                      datetime.timedelta(hours=2))
+    assert admin.post(url + '/commit').status_code == 201
+    assert admin.get('/api/v1/files/%s/content' % upload_id).data == 'abc'
+
+
+def test_upload_expired(app, admin, jobstate_id):
+    upload_id = create_upload(admin, jobstate_id, 'abc')
+    put_chunk(admin, upload_id, 0, 'abc')
+    chunk_path = os.path.join(_FILES_FOLDER,
+                              v1_utils.build_chunk_key(upload_id, 0))
+    assert os.path.exists(chunk_path)
+
+    app.config['FILES_UPLOADS_TTL'] = 0
+    url = '/api/v1/files/uploads/%s' % upload_id
+    assert admin.get(url).status_code == 404
+    assert put_chunk(admin, upload_id, 0, 'abc').status_code == 404
+
+    # removed with its chunks by the next upload
+    create_upload(admin, jobstate_id, 'abc')
+    assert not os.path.exists(chunk_path)
+
+
+def test_delete_job_removes_uploads(app, engine, admin, job_id, jobstate_id):
+    upload_id = create_upload(admin, jobstate_id, 'abc')
+    put_chunk(admin, upload_id, 0, 'abc')
+    chunk_path = os.path.join(_FILES_FOLDER,
+                              v1_utils.build_chunk_key(upload_id, 0))
+    assert os.path.exists(chunk_path)
+
+    job_etag = admin.get('/api/v1/jobs/%s' % job_id).headers.get('ETag')
+    deleted_job = admin.delete('/api/v1/jobs/%s' % job_id,
+                               headers={'If-match': job_etag})
+    assert deleted_job.status_code == 204
+
+    assert engine.execute(models.UPLOADS.select()).fetchone() is None
+    assert not os.path.exists(chunk_path)
+
+
+def test_upload_as_user(admin, user, jobstate_id):
+    upload_id = create_upload(admin, jobstate_id, 'abc')
+    url = '/api/v1/files/uploads/%s' % upload_id
+
+    assert user.get(url).status_code == 401
+    assert put_chunk(user, upload_id, 0, 'abc').status_code == 401
+    assert user.post(url + '/commit').status_code == 401
+    assert user.delete(url).status_code == 401
+
 # Tests for the isolation
 
 
@@ -256,6 +489,157 @@ def test_get_file_content(admin, jobstate_id):
     assert get_file.data == data
 
 
+def test_get_file_content_range(admin, jobstate_id):
+    file_id = post_file(admin, jobstate_id, FileDesc('foo', 'abcdefghij'))
+    url = '/api/v1/files/%s/content' % file_id
+    etag = '"%s"' % hashlib.sha256(b'abcdefghij').hexdigest()
+
+    get_file = admin.get(url)
+    assert get_file.headers['ETag'] == etag
+    assert get_file.headers['Accept-Ranges'] == 'bytes'
+
+    get_file = admin.get(url, headers={'Range': 'bytes=2-4'})
+    assert get_file.status_code == 206
+    assert get_file.data == 'cde'
+    assert get_file.headers['Content-Range'] == 'bytes 2-4/10'
+
+    get_file = admin.get(url, headers={'Range': 'bytes=-3'})
+    assert get_file.status_code == 206
+    assert get_file.data == 'hij'
+
+    get_file = admin.get(url, headers={'Range': 'bytes=8-'})
+    assert get_file.status_code == 206
+    assert get_file.data == 'ij'
+
+    get_file = admin.get(url, headers={'Range': 'bytes=20-'})
+    assert get_file.status_code == 416
+    assert get_file.headers['Content-Range'] == 'bytes */10'
+
+
+def test_get_file_content_if_range(admin, jobstate_id):
+    file_id = post_file(admin, jobstate_id, FileDesc('foo', 'abcdefghij'))
+    url = '/api/v1/files/%s/content' % file_id
+    etag = '"%s"' % hashlib.sha256(b'abcdefghij').hexdigest()
+
+    get_file = admin.get(url, headers={'Range': 'bytes=0-1',
+                                       'If-Range': etag})
+    assert get_file.status_code == 206
+    assert get_file.data == 'ab'
+
+    # the file changed, it is sent again
+    get_file = admin.get(url, headers={'Range': 'bytes=0-1',
+                                       'If-Range': '"other"'})
+    assert get_file.status_code == 200
+    assert get_file.data == 'abcdefghij'
+
+
+def test_get_file_content_multiple_ranges(admin, jobstate_id):
+    file_id = post_file(admin, jobstate_id, FileDesc('foo', 'abcdefghij'))
+    url = '/api/v1/files/%s/content' % file_id
+
+    get_file = admin.get(url, headers={'Range': 'bytes=0-1,8-9'})
+    assert get_file.status_code == 206
+    content_type = get_file.headers['Content-Type']
+    assert content_type.startswith('multipart/byteranges; boundary=')
+
+    boundary = content_type.split('boundary=')[1]
+    assert get_file.data == (
+        '--%(b)s\r\nContent-Type: text/plain\r\n'
+        'Content-Range: bytes 0-1/10\r\n\r\nab\r\n'
+        '--%(b)s\r\nContent-Type: text/plain\r\n'
+        'Content-Range: bytes 8-9/10\r\n\r\nij\r\n'
+        '--%(b)s--\r\n' % {'b': boundary})
+    assert int(get_file.headers['Content-Length']) == len(get_file.data)
+
+
+def test_create_files_compressed(app, admin, jobstate_id, team_admin_id):
+    app.config['FILES_COMPRESSION'] = 'gzip'
+    file_id = post_file(admin, jobstate_id, FileDesc('foo', 'content'))
+    file_path = v1_utils.build_file_path(_FILES_FOLDER, team_admin_id,
+                                         file_id, create=False)
+
+    file = admin.get('/api/v1/files/%s' % file_id).data['file']
+    assert file['encoding'] == 'gzip'
+    assert file['size'] == 7
+    assert file['md5'] == hashlib.md5(b'content').hexdigest()
+    with gzip.open(file_path, 'rb') as f:
+        assert f.read() == b'content'
+
+    url = '/api/v1/files/%s/content' % file_id
+    get_file = admin.get(url)
+    assert get_file.data == 'content'
+    assert 'Content-Encoding' not in get_file.headers
+    assert admin.get(url, headers={'Range': 'bytes=1-3'}).data == 'ont'
+
+    token = admin.post('/api/v1/tokens').data['token']['value']
+    headers = {'Authorization': 'Bearer %s' % token,
+               'Accept-Encoding': 'gzip'}
+    get_file = app.test_client().get(url, headers=headers)
+    assert get_file.headers['Content-Encoding'] == 'gzip'
+    assert get_file.headers['Vary'] == 'Accept-Encoding'
+    assert (int(get_file.headers['Content-Length']) ==
+            os.path.getsize(file_path))
+    content = gzip.GzipFile(fileobj=io.BytesIO(get_file.data)).read()
+    assert content == b'content'
+
+
+def test_get_file_content_file_wrapper(app, admin, jobstate_id):
+    app.config['FILES_DELIVERY'] = 'file_wrapper'
+    file_id = post_file(admin, jobstate_id, FileDesc('foo', 'content'))
+
+    get_file = admin.get('/api/v1/files/%s/content' % file_id)
+    assert get_file.status_code == 200
+    assert get_file.data == 'content'
+    assert get_file.headers['Content-Length'] == '7'
+
+
+def test_get_file_content_from_front_server(app, admin, jobstate_id,
+                                            team_admin_id):
+    file_id = post_file(admin, jobstate_id, FileDesc('foo', 'content'))
+    file_path = v1_utils.build_file_path(_FILES_FOLDER, team_admin_id,
+                                         file_id, create=False)
+    url = '/api/v1/files/%s/content' % file_id
+
+    app.config['FILES_DELIVERY'] = 'x-sendfile'
+    get_file = admin.get(url)
+    assert get_file.status_code == 200
+    assert get_file.headers['X-Sendfile'] == file_path
+    assert not get_file.data
+
+    app.config['FILES_DELIVERY'] = 'x-accel-redirect'
+    get_file = admin.get(url)
+    assert get_file.status_code == 200
+    assert (get_file.headers['X-Accel-Redirect'] ==
+            '/files/' + os.path.relpath(file_path, _FILES_FOLDER))
+    assert not get_file.data
+
+
+def test_create_files_swift(app, admin, jobstate_id, team_admin_id,
+                            fake_swift):
+    app.config.update({'FILES_STORE': 'swift',
+                       'FILES_SWIFT_URL': fake_swift.url,
+                       'FILES_SWIFT_TOKEN': fake_swift.token,
+                       'FILES_DELIVERY': 'x-sendfile'})
+    file_id = post_file(admin, jobstate_id, FileDesc('foo', 'content'))
+    key = v1_utils.build_file_key(team_admin_id, file_id)
+
+    assert fake_swift.objects[key] == b'content'
+    assert not os.path.exists(os.path.join(_FILES_FOLDER, key))
+
+    # the file is not local, it is streamed by the worker
+    url = '/api/v1/files/%s/content' % file_id
+    get_file = admin.get(url)
+    assert get_file.data == 'content'
+    assert 'X-Sendfile' not in get_file.headers
+    assert admin.get(url, headers={'Range': 'bytes=1-3'}).data == 'ont'
+
+    admin.delete('/api/v1/files/%s' % file_id)
+    app.config['FILES_CONTENT_ADDRESSED'] = True
+    post_file(admin, jobstate_id, FileDesc('foo', 'content'))
+    blob_key = v1_utils.build_blob_key(hashlib.sha256(b'content').hexdigest())
+    assert fake_swift.objects[blob_key] == b'content'
+
+
 def test_get_file_content_as_user(user, file_id, file_user_id):
     url = '/api/v1/files/%s/content'
 
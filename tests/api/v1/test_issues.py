@@ -16,11 +16,32 @@
 
 from __future__ import unicode_literals
 
+import json
 import mock
+import pytest
 import requests
-
-GITHUB_TRACKER = 'dci.trackers.github.requests'
-BUGZILLA_TRACKER = 'dci.trackers.bugzilla.requests'
+import time
+
+from dci.api.v1 import issues
+from dci import settings
+from dci import trackers
+from dci.trackers import bugzilla
+from dci.trackers import github
+
+GITHUB_TRACKER = 'dci.trackers.session'
+BUGZILLA_TRACKER = 'dci.trackers.session'
+
+GITHUB_ISSUE = {
+    'number': 1,
+    'title': 'Create a GET handler for /componenttype/<ct_name>',
+    'user': {'login': 'Spredzy'},
+    'assignee': None,
+    'state': 'closed',
+    'created_at': '2015-12-09T09:29:26Z',
+    'updated_at': '2015-12-18T15:19:41Z',
+    'closed_at': '2015-12-18T15:19:41Z',
+}
+GITHUB_PATH = '/repos/redhat-cip/dci-control-server/issues/1'
 
 
 def test_attach_issue_to_job(admin, job_id):
@@ -30,6 +51,7 @@ def test_attach_issue_to_job(admin, job_id):
         mock_github_request.get.return_value = mock_github_result
 
         mock_github_result.status_code = 200
+        mock_github_result.headers = {}
         mock_github_result.json.return_value = {
             'number': 1,  # issue_id
             'title': 'Create a GET handler for /componenttype/<ct_name>',
@@ -57,6 +79,7 @@ def test_unattach_issue_from_job(admin, job_id):
         mock_github_request.get.return_value = mock_github_result
 
         mock_github_result.status_code = 200
+        mock_github_result.headers = {}
         mock_github_result.json.return_value = {
             'number': 1,  # issue_id
             'title': 'Create a GET handler for /componenttype/<ct_name>',
@@ -88,6 +111,7 @@ def test_github_tracker(admin, job_id):
         mock_github_request.get.return_value = mock_github_result
 
         mock_github_result.status_code = 200
+        mock_github_result.headers = {}
         mock_github_result.json.return_value = {
             'number': 1,  # issue_id
             'title': 'Create a GET handler for /componenttype/<ct_name>',
@@ -223,3 +247,222 @@ def test_bugzilla_tracker_with_non_existent_issue(admin, job_id):
         assert result['created_at'] is None
         assert result['updated_at'] is None
         assert result['closed_at'] is None
+
+
+def test_issues_served_from_database(app, admin, job_id, fake_tracker):
+    fake_tracker.add(GITHUB_PATH, json.dumps(GITHUB_ISSUE))
+    data = {
+        'url': 'https://github.com/redhat-cip/dci-control-server/issues/1'
+    }
+
+    with mock.patch('dci.trackers.github._URL_BASE',
+                    fake_tracker.url + '/repos'):
+        admin.post('/api/v1/jobs/%s/issues' % job_id, data=data)
+        result = (
+            admin.get('/api/v1/jobs/%s/issues' % job_id).data['issues'][0]
+        )
+        assert result['status'] == 'closed'
+        job = admin.get('/api/v1/jobs/%s' % job_id).data['job']
+        assert job['issues'][0]['status'] == 'closed'
+        assert fake_tracker.requests == [GITHUB_PATH]
+
+        # the changes of the issue are seen once it is refreshed
+        fake_tracker.add(GITHUB_PATH,
+                         json.dumps(dict(GITHUB_ISSUE, state='open')))
+        with app.engine.connect() as db_conn:
+            assert issues.refresh_issues(db_conn, ttl=3600) == 0
+            assert issues.refresh_issues(db_conn, ttl=0) == 1
+
+        result = (
+            admin.get('/api/v1/jobs/%s/issues' % job_id).data['issues'][0]
+        )
+        assert result['status'] == 'open'
+        assert len(fake_tracker.requests) == 2
+
+
+def test_github_conditional_requests(app, admin, job_id, fake_tracker):
+    fake_tracker.add(GITHUB_PATH, json.dumps(GITHUB_ISSUE),
+                     headers={'ETag': '"etag_1"'})
+    data = {
+        'url': 'https://github.com/redhat-cip/dci-control-server/issues/1'
+    }
+
+    with mock.patch('dci.trackers.github._URL_BASE',
+                    fake_tracker.url + '/repos'):
+        admin.post('/api/v1/jobs/%s/issues' % job_id, data=data)
+        admin.get('/api/v1/jobs/%s/issues' % job_id)
+        assert 'If-None-Match' not in fake_tracker.requests_headers[0]
+
+        # unchanged, the stored informations are kept
+        with app.engine.connect() as db_conn:
+            assert issues.refresh_issues(db_conn, ttl=0) == 1
+        assert fake_tracker.requests_headers[1]['If-None-Match'] == \
+            '"etag_1"'
+        result = (
+            admin.get('/api/v1/jobs/%s/issues' % job_id).data['issues'][0]
+        )
+        assert result['status'] == 'closed'
+        assert result['status_code'] == 200
+        assert 'etag' not in result
+
+        fake_tracker.add(GITHUB_PATH,
+                         json.dumps(dict(GITHUB_ISSUE, state='open')),
+                         headers={'ETag': '"etag_2"'})
+        with app.engine.connect() as db_conn:
+            assert issues.refresh_issues(db_conn, ttl=0) == 1
+        result = (
+            admin.get('/api/v1/jobs/%s/issues' % job_id).data['issues'][0]
+        )
+        assert result['status'] == 'open'
+
+
+def test_refresh_issues_tracker_down(app, admin, job_id, fake_tracker):
+    fake_tracker.add('/show_bug.cgi?ctype=xml&id=1184949', """
+<bugzilla>
+    <bug>
+          <bug_id>1184949</bug_id>
+          <creation_ts>2015-01-22 09:46:00 -0500</creation_ts>
+          <short_desc>Timeouts in haproxy for keystone can be</short_desc>
+          <delta_ts>2016-06-29 18:50:43 -0400</delta_ts>
+          <product>Red Hat OpenStack</product>
+          <component>rubygem-staypuft</component>
+          <bug_status>NEW</bug_status>
+          <reporter name="Alfredo Moralejo">amoralej</reporter>
+          <assigned_to name="Mike Burns">mburns</assigned_to>
+    </bug>
+</bugzilla>
+""")
+    data = {'url': '%s/show_bug.cgi?id=1184949' % fake_tracker.url}
+    admin.post('/api/v1/jobs/%s/issues' % job_id, data=data)
+    result = admin.get('/api/v1/jobs/%s/issues' % job_id).data['issues'][0]
+    assert result['status'] == 'NEW'
+
+    # the last known informations are kept
+    fake_tracker.stop()
+    with app.engine.connect() as db_conn:
+        assert issues.refresh_issues(db_conn, ttl=0) == 1
+    result = admin.get('/api/v1/jobs/%s/issues' % job_id).data['issues'][0]
+    assert result['status'] == 'NEW'
+    assert result['status_code'] == 200
+
+
+def test_refresh_issues_tracker_error(app, admin, job_id, fake_tracker):
+    fake_tracker.add(GITHUB_PATH, json.dumps(GITHUB_ISSUE))
+    data = {
+        'url': 'https://github.com/redhat-cip/dci-control-server/issues/1'
+    }
+
+    with mock.patch('dci.trackers.github._URL_BASE',
+                    fake_tracker.url + '/repos'):
+        admin.post('/api/v1/jobs/%s/issues' % job_id, data=data)
+        result = (
+            admin.get('/api/v1/jobs/%s/issues' % job_id).data['issues'][0]
+        )
+        assert result['status'] == 'closed'
+
+        # the last known informations are kept
+        fake_tracker.add(GITHUB_PATH, 'Internal Server Error', status=500)
+        with app.engine.connect() as db_conn:
+            assert issues.refresh_issues(db_conn, ttl=0) == 1
+        assert len(fake_tracker.requests) == 2
+        result = (
+            admin.get('/api/v1/jobs/%s/issues' % job_id).data['issues'][0]
+        )
+        assert result['status'] == 'closed'
+        assert result['title'] == GITHUB_ISSUE['title']
+        assert result['status_code'] == 200
+
+
+def test_retrieve_all_with_slow_tracker(fake_tracker):
+    fake_tracker.add('/show_bug.cgi?ctype=xml&id=1', '<bugzilla/>',
+                     status=404)
+    fake_tracker.add(GITHUB_PATH, json.dumps(GITHUB_ISSUE), delay=2)
+    tracker_issues = [
+        (bugzilla.Bugzilla, '%s/show_bug.cgi?id=1' % fake_tracker.url, None),
+        (github.Github,
+         'https://github.com/redhat-cip/dci-control-server/issues/1', None)
+    ]
+
+    with mock.patch('dci.trackers.TIMEOUT', 0.5):
+        with mock.patch('dci.trackers.github._URL_BASE',
+                        fake_tracker.url + '/repos'):
+            dumps = trackers.retrieve_all(tracker_issues)
+
+    # the slow issue is missing, the other one is returned
+    assert dumps[0]['status_code'] == 404
+    assert dumps[1] is None
+
+
+def test_bugzilla_batch(fake_tracker):
+    fake_tracker.add('/show_bug.cgi?ctype=xml&id=1&id=2&id=3', """
+<bugzilla>
+    <bug>
+          <bug_id>2</bug_id>
+          <creation_ts>2015-01-22 09:46:00 -0500</creation_ts>
+          <short_desc>Timeouts in haproxy for keystone can be</short_desc>
+          <delta_ts>2016-06-29 18:50:43 -0400</delta_ts>
+          <product>Red Hat OpenStack</product>
+          <component>rubygem-staypuft</component>
+          <bug_status>NEW</bug_status>
+          <reporter name="Alfredo Moralejo">amoralej</reporter>
+          <assigned_to name="Mike Burns">mburns</assigned_to>
+    </bug>
+    <bug error="NotFound">
+          <bug_id>3</bug_id>
+    </bug>
+</bugzilla>
+""")
+    urls = ['%s/show_bug.cgi?id=%s' % (fake_tracker.url, i)
+            for i in (1, 2, 3)]
+    urls.append('http://127.0.0.2:1/show_bug.cgi?id=4')
+
+    with mock.patch('dci.trackers.TIMEOUT', 1):
+        dumps = trackers.retrieve_all([(bugzilla.Bugzilla, url, None)
+                                       for url in urls])
+
+    # one request for the bugs of the same host
+    assert fake_tracker.requests == ['/show_bug.cgi?ctype=xml&id=1&id=2&id=3']
+    assert [d and d['status_code'] for d in dumps] == [404, 200, 404, None]
+    assert dumps[1]['issue_id'] == '2'
+    assert dumps[1]['title'] == 'Timeouts in haproxy for keystone can be'
+    assert dumps[2]['title'] is None
+
+
+def test_circuit_breaker():
+    breaker = trackers.CircuitBreaker(threshold=2, reset_timeout=60)
+    breaker.failure('bugzilla.redhat.com')
+    breaker.check('bugzilla.redhat.com')
+    breaker.failure('bugzilla.redhat.com')
+
+    with pytest.raises(trackers.CircuitOpen):
+        breaker.check('bugzilla.redhat.com')
+    breaker.check('github.com')
+
+    with mock.patch('time.time', return_value=time.time() + 61):
+        breaker.check('bugzilla.redhat.com')
+
+    breaker.success('bugzilla.redhat.com')
+    breaker.failure('bugzilla.redhat.com')
+    breaker.check('bugzilla.redhat.com')
+
+
+def test_trackers_configure():
+    conf = {'TRACKERS_TIMEOUT': 2, 'TRACKERS_POOL_SIZE': 4,
+            'TRACKERS_BREAKER_THRESHOLD': 3, 'TRACKERS_BREAKER_RESET': 10}
+    defaults = dict((key, getattr(settings, key)) for key in conf)
+    try:
+        trackers.configure(conf)
+        assert trackers.TIMEOUT == 2
+        assert trackers.POOL_SIZE == 4
+        assert trackers.breaker.threshold == 3
+        assert trackers.breaker.reset_timeout == 10
+    finally:
+        trackers.configure(defaults)
+    assert trackers.TIMEOUT == settings.TRACKERS_TIMEOUT
+
+
+def test_issues_refresher_stop():
+    refresher = issues.IssuesRefresher(mock.Mock(), ttl=3600, interval=300)
+    refresher.start()
+    refresher.stop()
+    assert not refresher.is_alive()
@@ -15,7 +15,35 @@
 # under the License.
 
 from __future__ import unicode_literals
+import flask
+import mock
 import pytest
+import threading
+
+from dci.api.v1 import utils as v1_utils
+from dci.db import models
+import tests.utils as utils
+
+
+def parallel_schedule(app, schedules):
+    """Fire the schedule calls at once, one thread and one client each."""
+    barrier = threading.Semaphore(0)
+    results = [None] * len(schedules)
+
+    def schedule(index, data):
+        client = utils.generate_client(app, ('admin', 'admin'))
+        barrier.acquire()
+        results[index] = client.post('/api/v1/jobs/schedule', data=data)
+
+    threads = [threading.Thread(target=schedule, args=(i, data))
+               for i, data in enumerate(schedules)]
+    for thread in threads:
+        thread.start()
+    for _ in threads:
+        barrier.release()
+    for thread in threads:
+        thread.join()
+    return results
 
 
 def test_create_jobs(admin, jobdefinition_id, team_id, remoteci_id,
@@ -143,6 +171,39 @@ def test_schedule_jobs_not_active(admin, jobdefinition_id, team_id,
     assert job.status_code == 412
 
 
+def test_schedule_jobs_by_priority(admin, jobdefinition_factory,
+                                   remoteci_id, topic_id):
+    """The active jobdefinition with the highest priority is run first."""
+    data = {'name': 'high', 'topic_id': topic_id, 'priority': 10,
+            'component_types': ['type_1', 'type_2', 'type_3']}
+    jd_high = admin.post('/api/v1/jobdefinitions', data=data).data
+    jd_high_id = jd_high['jobdefinition']['id']
+    # the newest jobdefinition but with the default priority
+    jobdefinition_factory('low')
+
+    r = admin.post('/api/v1/jobs/schedule',
+                   data={'remoteci_id': remoteci_id, 'topic_id': topic_id})
+    assert r.status_code == 201
+    assert r.data['job']['jobdefinition_id'] == jd_high_id
+
+
+def test_schedule_jobs_rotate_same_priority(admin, jobdefinition_factory,
+                                            remoteci_id, topic_id):
+    """The remoteci rotates among the jobdefinitions of same priority."""
+    jds_ids = set(jobdefinition_factory(name)['jobdefinition']['id']
+                  for name in ('1st', '2nd', '3rd'))
+
+    scheduled_jds_ids = []
+    for _ in range(len(jds_ids)):
+        r = admin.post('/api/v1/jobs/schedule',
+                       data={'remoteci_id': remoteci_id,
+                             'topic_id': topic_id})
+        assert r.status_code == 201
+        scheduled_jds_ids.append(r.data['job']['jobdefinition_id'])
+
+    assert set(scheduled_jds_ids) == jds_ids
+
+
 def test_schedule_kill_old_jobs(admin, jobdefinition_factory, remoteci_id,
                                 topic_id):
     """when a job is scheduled for a remoteci, the old ones must be killed."""
@@ -196,6 +257,55 @@ def test_schedule_give_latest_components(admin, jobdefinition_factory,
     assert c1[0]['id'] != c2[0]['id']
 
 
+def test_schedule_jobs_concurrently(app, admin, jobdefinition_factory,
+                                    team_id, topic_id):
+    """Parallel schedulings of distinct remotecis do not block each other."""
+    jobdefinition_factory()
+    remotecis_ids = []
+    for i in range(8):
+        data = {'name': 'rci-%s' % i, 'team_id': team_id}
+        remoteci = admin.post('/api/v1/remotecis', data=data).data
+        remotecis_ids.append(remoteci['remoteci']['id'])
+
+    results = parallel_schedule(app, [{'remoteci_id': r_id,
+                                       'topic_id': topic_id}
+                                      for r_id in remotecis_ids])
+
+    assert [r.status_code for r in results] == [201] * 8
+    assert (sorted(r.data['job']['remoteci_id'] for r in results) ==
+            sorted(remotecis_ids))
+
+
+def test_schedule_recheck_concurrently(app, admin, job_id, remoteci_id,
+                                       topic_id):
+    """A job to recheck must be dispatched only once."""
+    for _ in range(4):
+        admin.post('/api/v1/jobs/%s/recheck' % job_id)
+
+    results = parallel_schedule(app, [{'remoteci_id': remoteci_id,
+                                       'topic_id': topic_id}] * 8)
+
+    assert [r.status_code for r in results] == [201] * 8
+    jobs_ids = [r.data['job']['id'] for r in results]
+    assert len(set(jobs_ids)) == len(jobs_ids)
+
+
+def test_schedule_component_type_not_found(admin, remoteci_id, topic_id):
+    data = {'name': 'pname', 'topic_id': topic_id,
+            'component_types': ['type_1', 'type_2', 'type_missing']}
+    admin.post('/api/v1/jobdefinitions', data=data)
+    for ct in ['type_1', 'type_2']:
+        admin.post('/api/v1/components',
+                   data={'name': 'name-%s' % ct, 'type': ct,
+                         'topic_id': topic_id})
+
+    r = admin.post('/api/v1/jobs/schedule',
+                   data={'remoteci_id': remoteci_id,
+                         'topic_id': topic_id})
+    assert r.status_code == 412
+    assert r.data['payload'] == {'types': ['type_missing']}
+
+
 def test_get_all_jobs(admin, jobdefinition_id, team_id, remoteci_id,
                       components_ids):
     job_1 = admin.post('/api/v1/jobs',
@@ -249,6 +359,112 @@ def test_get_all_jobs_with_pagination(admin, jobdefinition_id, team_id,
     assert jobs.data['jobs'] == []
 
 
+def test_get_all_jobs_count(admin, jobdefinition_id, team_id, remoteci_id,
+                            components_ids):
+    data = {'jobdefinition_id': jobdefinition_id,
+            'team_id': team_id,
+            'remoteci_id': remoteci_id,
+            'components': components_ids}
+    admin.post('/api/v1/jobs', data=data)
+    admin.post('/api/v1/jobs', data=data)
+
+    jobs = admin.get('/api/v1/jobs?count=exact').data
+    assert jobs['_meta']['count'] == 2
+
+    jobs = admin.get('/api/v1/jobs?count=estimate').data
+    assert isinstance(jobs['_meta']['count'], int)
+    assert len(jobs['jobs']) == 2
+
+    jobs = admin.get('/api/v1/jobs?count=none').data
+    assert jobs['_meta']['count'] is None
+    assert len(jobs['jobs']) == 2
+
+    assert admin.get('/api/v1/jobs?count=foo').status_code == 400
+
+
+def test_get_all_jobs_with_cursor(admin, jobdefinition_id, team_id,
+                                  remoteci_id, components_ids):
+    data = {'jobdefinition_id': jobdefinition_id,
+            'team_id': team_id,
+            'remoteci_id': remoteci_id,
+            'components': components_ids}
+    jobs_ids = [admin.post('/api/v1/jobs', data=data).data['job']['id']
+                for _ in range(5)]
+
+    for sort in ('created_at', '-created_at'):
+        url = '/api/v1/jobs?limit=2&sort=%s' % sort
+        walked_ids = []
+        jobs = admin.get(url).data
+        while True:
+            assert jobs['_meta']['count'] == 5
+            walked_ids.extend(job['id'] for job in jobs['jobs'])
+            if jobs['_meta']['next'] is None:
+                break
+            jobs = admin.get('%s&cursor=%s' % (url, jobs['_meta']['next']))
+            jobs = jobs.data
+
+        if sort == '-created_at':
+            walked_ids.reverse()
+        assert walked_ids == jobs_ids
+
+
+def test_get_all_jobs_with_nullable_sort(admin, jobdefinition_id, team_id,
+                                         remoteci_id, components_ids):
+    data = {'jobdefinition_id': jobdefinition_id,
+            'team_id': team_id,
+            'remoteci_id': remoteci_id,
+            'components': components_ids}
+    jobs_ids = [admin.post('/api/v1/jobs',
+                           data=dict(data, **comment)).data['job']['id']
+                for comment in ({}, {'comment': 'a'}, {})]
+
+    # the comment can be NULL, the pages are walked with the offset
+    url = '/api/v1/jobs?limit=2&sort=comment'
+    jobs = admin.get(url).data
+    assert jobs['_meta']['next'] is None
+    walked_ids = [job['id'] for job in jobs['jobs']]
+    jobs = admin.get('%s&offset=2' % url).data
+    walked_ids.extend(job['id'] for job in jobs['jobs'])
+    assert sorted(walked_ids) == sorted(jobs_ids)
+
+    cursor = v1_utils.encode_cursor(['a', jobs_ids[1]])
+    result = admin.get('%s&cursor=%s' % (url, cursor))
+    assert result.status_code == 400
+    assert 'comment' not in result.data['payload']['Valid sort keys']
+
+
+def test_get_all_jobs_stream(admin, jobdefinition_id, team_id, remoteci_id,
+                             components_ids):
+    data = {'jobdefinition_id': jobdefinition_id,
+            'team_id': team_id,
+            'remoteci_id': remoteci_id,
+            'components': components_ids}
+    jobs_ids = [admin.post('/api/v1/jobs', data=data).data['job']['id']
+                for _ in range(3)]
+
+    jobs = admin.get('/api/v1/jobs?stream=true&sort=created_at&limit=2').data
+    assert [job['id'] for job in jobs['jobs']] == jobs_ids[:2]
+    assert jobs['_meta']['count'] == 3
+
+    jobs = admin.get('/api/v1/jobs?stream=true&sort=created_at&embed=team'
+                     '&cursor=%s' % jobs['_meta']['next']).data
+    assert [job['id'] for job in jobs['jobs']] == jobs_ids[2:]
+    assert jobs['jobs'][0]['team']['id'] == team_id
+    assert jobs['_meta']['next'] is None
+
+    jobs = admin.get('/api/v1/jobs?sort=created_at',
+                     headers={'Accept': 'application/x-ndjson'})
+    assert jobs.headers['Content-Type'] == 'application/x-ndjson'
+    lines = [flask.json.loads(line) for line in jobs.data.splitlines()]
+    assert [job['id'] for job in lines[:-1]] == jobs_ids
+    assert lines[-1] == {'_meta': {'count': 3, 'next': None}}
+
+
+def test_get_all_jobs_with_invalid_cursor(admin):
+    result = admin.get('/api/v1/jobs?limit=2&cursor=kikoolol')
+    assert result.status_code == 400
+
+
 def test_get_all_jobs_with_embed(admin, jobdefinition_id, team_id,
                                  remoteci_id, components_ids):
     # create 2 jobs and check meta data count
@@ -591,6 +807,43 @@ def test_get_results_by_job_id(user, job_id):
     assert file_from_job.status_code == 200
     assert file_from_job.data['_meta']['count'] == 1
     assert file_from_job.data['results'][0]['total'] == '3'
+    assert file_from_job.data['results'][0]['skips'] == 1
+    assert file_from_job.data['results'][0]['success'] == 2
+
+
+def test_get_results_from_summaries(engine, user, job_id,
+                                    file_job_junit_user_id):
+    query = models.TESTS_RESULTS.select().where(
+        models.TESTS_RESULTS.c.file_id == file_job_junit_user_id)
+    summary = engine.execute(query).fetchone()
+    assert summary['job_id'] == job_id
+    assert summary['total'] == 3
+    assert summary['skips'] == 1
+
+    # the summaries missing are computed again from the files
+    engine.execute(models.TESTS_RESULTS.delete())
+    results = user.get('/api/v1/jobs/%s/results' % job_id).data
+    assert results['results'][0]['success'] == 2
+    assert engine.execute(query).fetchone()['total'] == 3
+
+
+def test_get_results_invalid_junit(engine, user, job_id):
+    headers = {'DCI-JOB-ID': job_id,
+               'Content-Type': 'application/junit',
+               'DCI-MIME': 'application/junit',
+               'DCI-NAME': 'res_junit.xml'}
+    file_id = user.post('/api/v1/files', headers=headers,
+                        data='not a junit file').data['file']['id']
+    query = models.TESTS_RESULTS.select().where(
+        models.TESTS_RESULTS.c.file_id == file_id)
+    assert engine.execute(query).fetchone()['valid'] is False
+
+    # the file is not read again
+    with mock.patch('dci.api.v1.files._read_content',
+                    side_effect=AssertionError):
+        results = user.get('/api/v1/jobs/%s/results' % job_id)
+    assert results.status_code == 200
+    assert results.data['_meta']['count'] == 0
 
 
 @pytest.mark.usefixtures('file_job_junit_empty_user_id')
@@ -604,6 +857,74 @@ def test_get_empty_results_by_job_id(user, job_id):
     assert file_from_job.data['results'][0]['total'] == '0'
 
 
+def test_get_flipped_testcases(admin, user, jobdefinition_id, team_id,
+                               remoteci_id, components_ids):
+    jobs_ids = []
+    for status in ('failure', 'error'):
+        job = admin.post('/api/v1/jobs',
+                         data={'jobdefinition_id': jobdefinition_id,
+                               'team_id': team_id,
+                               'remoteci_id': remoteci_id,
+                               'components': components_ids},
+                         headers={'Content-Type': 'application/json'}).data
+        jobs_ids.append(job['job']['id'])
+        junit = ('<testsuite tests="2">'
+                 '<testcase classname="a.B" name="test_1"/>'
+                 '<testcase classname="a.B" name="test_2">'
+                 '<%s>boom</%s></testcase>'
+                 '</testsuite>' % (status, status))
+        admin.post('/api/v1/files',
+                   headers={'DCI-JOB-ID': job['job']['id'],
+                            'Content-Type': 'application/junit',
+                            'DCI-MIME': 'application/junit',
+                            'DCI-NAME': 'res_junit.xml'},
+                   data=junit)
+
+    url = '/api/v1/jobs/%s/testcases/flipped/%s' % tuple(reversed(jobs_ids))
+    flipped = admin.get(url).data
+    assert flipped['_meta']['count'] == 1
+    assert flipped['testcases'][0]['name'] == 'test_2'
+    assert flipped['testcases'][0]['status'] == 'error'
+    assert flipped['testcases'][0]['other_status'] == 'failure'
+
+    assert user.get(url).status_code == 401
+
+
+def test_get_flipped_testcases_several_files(admin, jobdefinition_id,
+                                             team_id, remoteci_id,
+                                             components_ids):
+    junit = ('<testsuite tests="2">'
+             '<testcase classname="a.B" name="test_1">%s</testcase>'
+             '<testcase classname="a.B" name="test_2">%s</testcase>'
+             '</testsuite>')
+    failure = '<failure>boom</failure>'
+    jobs_ids = []
+    # the first job has a JUnit file uploaded again, the failure kept
+    for junits in ((junit % (failure, ''), junit % ('', '')),
+                   (junit % (failure, failure),)):
+        job = admin.post('/api/v1/jobs',
+                         data={'jobdefinition_id': jobdefinition_id,
+                               'team_id': team_id,
+                               'remoteci_id': remoteci_id,
+                               'components': components_ids},
+                         headers={'Content-Type': 'application/json'}).data
+        jobs_ids.append(job['job']['id'])
+        for content in junits:
+            admin.post('/api/v1/files',
+                       headers={'DCI-JOB-ID': job['job']['id'],
+                                'Content-Type': 'application/junit',
+                                'DCI-MIME': 'application/junit',
+                                'DCI-NAME': 'res_junit.xml'},
+                       data=content)
+
+    url = '/api/v1/jobs/%s/testcases/flipped/%s' % tuple(jobs_ids)
+    flipped = admin.get(url).data
+    assert flipped['_meta']['count'] == 1
+    assert flipped['testcases'][0]['name'] == 'test_2'
+    assert flipped['testcases'][0]['status'] == 'success'
+    assert flipped['testcases'][0]['other_status'] == 'failure'
+
+
 def test_job_search(user, jobdefinition_id, team_user_id, remoteci_id,
                     components_ids):
 
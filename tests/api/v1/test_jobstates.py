@@ -122,6 +122,26 @@ def test_get_all_jobstates_with_embed(admin, job_id, team_admin_id):
     assert js_2['files'][0]['name'] == 'foo'
 
 
+def test_get_all_jobstates_with_embed_and_limit(admin, job_id):
+    data = {'job_id': job_id, 'status': 'running'}
+    js_1 = admin.post('/api/v1/jobstates', data=data).data['jobstate']
+    js_2 = admin.post('/api/v1/jobstates', data=data).data['jobstate']
+    for name in ('foo', 'bar', 'baz'):
+        files.post_file(admin, js_1['id'], files.FileDesc(name, 'content'))
+
+    # the limit applies to the jobstates, not to the jobstates and files
+    js = admin.get('/api/v1/jobstates?embed=files&sort=-files.name'
+                   '&limit=2').data
+    assert [j['id'] for j in js['jobstates']] == [js_1['id'], js_2['id']]
+    assert [f['name'] for f in js['jobstates'][0]['files']] == \
+        ['foo', 'baz', 'bar']
+    assert js['jobstates'][1]['files'] == []
+    assert js['_meta']['count'] == 2
+
+    js = admin.get('/api/v1/jobstates/%s?embed=files' % js_1['id']).data
+    assert len(js['jobstate']['files']) == 3
+
+
 def test_get_all_jobstates_with_where(admin, job_id, team_id):
     js = admin.post('/api/v1/jobstates',
                     data={'job_id': job_id, 'status': 'running',
@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2016 Red Hat, Inc
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+
+from __future__ import unicode_literals
+
+import flask
+import mock
+import time
+
+
+def bearer_get(app, token, url):
+    headers = {'Authorization': 'Bearer %s' % token}
+    return app.test_client().get(url, headers=headers)
+
+
+def test_create_token(admin):
+    result = admin.post('/api/v1/tokens')
+    assert result.status_code == 201
+    assert result.data['token']['value']
+    assert result.data['token']['expires_at']
+
+
+def test_create_token_unauthorized(unauthorized):
+    assert unauthorized.post('/api/v1/tokens').status_code == 401
+
+
+def test_token_authentication(app, user, team_user_id):
+    token = user.post('/api/v1/tokens').data['token']['value']
+
+    result = bearer_get(app, token, '/api/v1/users')
+    assert result.status_code == 200
+
+    users = flask.json.loads(result.data)['users']
+    assert len(users) == 2
+    for guser in users:
+        assert guser['team_id'] == team_user_id
+
+
+def test_token_cannot_renew_itself(app, admin):
+    token = admin.post('/api/v1/tokens').data['token']['value']
+    headers = {'Authorization': 'Bearer %s' % token}
+    result = app.test_client().post('/api/v1/tokens', headers=headers)
+    assert result.status_code == 401
+
+
+def test_token_tampered(app, user):
+    token = user.post('/api/v1/tokens').data['token']['value']
+    data, signature = token.split('.')
+
+    assert bearer_get(app, data + '.x' + signature,
+                      '/api/v1/users').status_code == 401
+    assert bearer_get(app, 'kikoolol', '/api/v1/users').status_code == 401
+
+
+def test_token_expired(app, admin):
+    token = admin.post('/api/v1/tokens').data['token']['value']
+    ttl = app.config['TOKEN_TTL']
+
+    with mock.patch('time.time', return_value=time.time() + ttl + 1):
+        result = bearer_get(app, token, '/api/v1/users')
+    assert result.status_code == 401
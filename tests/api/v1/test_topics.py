@@ -284,3 +284,36 @@ def test_delete_team_from_topic_as_user(admin, user):
     status_code = user.delete(
         '/api/v1/topics/%s/teams/%s' % (pt_id, team_id)).status_code
     assert status_code == 401
+
+
+def test_get_testcase_history(admin, topic_id, jobdefinition_id, team_id,
+                              remoteci_id, components_ids):
+    for status in ('<failure/>', ''):
+        job = admin.post('/api/v1/jobs',
+                         data={'jobdefinition_id': jobdefinition_id,
+                               'team_id': team_id,
+                               'remoteci_id': remoteci_id,
+                               'components': components_ids},
+                         headers={'Content-Type': 'application/json'}).data
+        junit = ('<testsuite tests="1">'
+                 '<testcase classname="a.B" name="test_1" time="1.5">'
+                 '%s</testcase></testsuite>' % status)
+        admin.post('/api/v1/files',
+                   headers={'DCI-JOB-ID': job['job']['id'],
+                            'Content-Type': 'application/junit',
+                            'DCI-MIME': 'application/junit',
+                            'DCI-NAME': 'res_junit.xml'},
+                   data=junit)
+
+    url = '/api/v1/topics/%s/testcases?name=test_1' % topic_id
+    history = admin.get(url).data
+    assert history['_meta']['count'] == 2
+    assert history['testcases'][0]['job_id'] == job['job']['id']
+    assert history['testcases'][0]['status'] == 'success'
+    assert history['testcases'][1]['status'] == 'failure'
+    assert history['testcases'][1]['duration'] == 1.5
+
+    url = '/api/v1/topics/%s/testcases?name=test_1&classname=c' % topic_id
+    assert admin.get(url).data['_meta']['count'] == 0
+    assert admin.get('/api/v1/topics/%s/testcases' %
+                     topic_id).status_code == 400
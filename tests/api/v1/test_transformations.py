@@ -47,6 +47,24 @@ def test_junit2json_valid():
     assert len(result['properties']) == 2
 
 
+def test_junit_file2json(tmpdir):
+    junit = tmpdir.join('junit.xml')
+    junit.write(JUNIT)
+    with junit.open('rb') as f:
+        result = transformations.junit_file2json(f)
+
+    assert json.loads(result) == json.loads(transformations.junit2json(JUNIT))
+
+    junit.write(JUNIT.replace('</testcase>', '', 1))
+    with junit.open('rb') as f:
+        result = json.loads(transformations.junit_file2json(f))
+    assert 'XMLSyntaxError' in result['error']
+
+    junit.write('')
+    with junit.open('rb') as f:
+        assert json.loads(transformations.junit_file2json(f)) == {}
+
+
 def test_retrieve_junit2json(admin, job_id):
     headers = {'DCI-NAME': 'junit_file.xml', 'DCI-JOB-ID': job_id,
                'DCI-MIME': 'application/junit',
@@ -17,8 +17,10 @@
 from dci.api.v1 import utils
 from dci.common import exceptions as dci_exc
 
+import datetime
 import pytest
 import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
 
 # Use a fake model for testing
 stub = utils.embed(sa.Table('stubs', sa.MetaData()))
@@ -55,3 +57,94 @@ def test_group_embedded_resources():
             'a': {'id': '123', 'name': 'lol2',
                   'c': {'id': '12345', 'name': 'mdr1'}},
             'b': {'id': '1234', 'name': 'lol3'}} == result
+
+
+def test_cursor():
+    values = [datetime.datetime(2016, 8, 1, 12, 30), 'kikoolol']
+    cursor = utils.encode_cursor(values)
+
+    assert utils.decode_cursor(cursor, 2) == ['2016-08-01T12:30:00',
+                                              'kikoolol']
+    pytest.raises(dci_exc.DCIException, utils.decode_cursor, cursor, 3)
+    pytest.raises(dci_exc.DCIException, utils.decode_cursor, 'lol', 2)
+
+
+def test_paginate():
+    table = sa.Table('stubs', sa.MetaData(),
+                     sa.Column('id', sa.String, primary_key=True),
+                     sa.Column('name', sa.String, nullable=False),
+                     sa.Column('created_at', sa.DateTime, nullable=False),
+                     sa.Column('comment', sa.String))
+    qb = utils.QueryBuilder(table, limit=2)
+    cursor = utils.encode_cursor(['2016-08-01T12:30:00', 'id_1'])
+    qb.paginate(['-created_at'], cursor)
+
+    query = str(qb.build().compile(dialect=postgresql.dialect()))
+    assert '(stubs.created_at, stubs.id) < (' in query
+    assert 'ORDER BY stubs.created_at DESC, stubs.id DESC' in query
+
+    qb = utils.QueryBuilder(table, limit=2)
+    cursor = utils.encode_cursor(['name', '2016-08-01T12:30:00', 'id_1'])
+    qb.paginate(['name', '-created_at'], cursor)
+
+    query = str(qb.build().compile(dialect=postgresql.dialect()))
+    assert 'stubs.name > ' in query
+    assert 'stubs.created_at < ' in query
+
+    rows = [{'id': 'id_2', 'name': 'n', 'created_at': 'c'}] * 2
+    assert (utils.decode_cursor(qb.next_cursor(rows), 3) ==
+            ['n', 'c', 'id_2'])
+    assert qb.next_cursor(rows[:1]) is None
+
+    # the rows with a NULL key would be skipped
+    qb = utils.QueryBuilder(table, limit=2)
+    with pytest.raises(dci_exc.DCIException):
+        qb.paginate(['comment'], utils.encode_cursor(['c', 'id_1']))
+    qb.paginate(['comment'])
+    assert qb.next_cursor(rows) is None
+
+
+def test_build_nb_row_without_join():
+    metadata = sa.MetaData()
+    parents = sa.Table('parents', metadata, sa.Column('id', sa.String))
+    children = sa.Table('children', metadata, sa.Column('id', sa.String),
+                        sa.Column('parent_id', sa.String,
+                                  sa.ForeignKey('parents.id')))
+    qb = utils.QueryBuilder(parents,
+                            embed={'children': utils.embed(children)})
+    qb.join(['children'])
+    qb.where.append(parents.c.id == 'id_1')
+
+    assert 'JOIN' not in str(qb.build_nb_row())
+
+    qb.where.append(children.c.id == 'id_2')
+    assert 'LEFT OUTER JOIN children' in str(qb.build_nb_row())
+
+
+def test_iter_rows():
+    qb = utils.QueryBuilder(None, embed={'a': stub})
+    rows = [{'id': str(i), 'a_name': 'a%s' % i} for i in range(5)]
+
+    assert list(qb.iter_rows(['a'], rows, batch_size=2)) == \
+        qb.parse_rows(['a'], rows)
+    assert list(qb.iter_rows(['a'], [], batch_size=2)) == []
+
+
+def test_join_many():
+    metadata = sa.MetaData()
+    parents = sa.Table('parents', metadata, sa.Column('id', sa.String),
+                       sa.Column('created_at', sa.DateTime))
+    children = sa.Table('children', metadata, sa.Column('id', sa.String),
+                        sa.Column('parent_id', sa.String,
+                                  sa.ForeignKey('parents.id')))
+    qb = utils.QueryBuilder(parents, limit=10,
+                            embed={'children': utils.embed(children, True)})
+    qb.join(['children'])
+    qb.sort = [sa.desc(children.c.id)]
+    qb.paginate(['-children.id'])
+
+    query = str(qb.build())
+    assert 'children' not in query
+    assert 'ORDER BY parents.created_at ASC, parents.id ASC' in query
+    assert qb._many == ['children']
+    assert qb._many_embed_of(qb.sort[-1]) == 'children'
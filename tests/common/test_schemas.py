@@ -607,7 +607,10 @@ class TestArgs(object):
         'offset': '10',
         'sort': 'field_1,field_2',
         'where': 'field_1:value_1,field_2:value_2',
-        'embed': 'resource_1,resource_2'
+        'embed': 'resource_1,resource_2',
+        'cursor': 'WyJ2YWx1ZSJd',
+        'count': 'estimate',
+        'stream': 'true'
     }
 
     data_expected = {
@@ -615,7 +618,10 @@ class TestArgs(object):
         'offset': 10,
         'sort': ['field_1', 'field_2'],
         'where': ['field_1:value_1', 'field_2:value_2'],
-        'embed': ['resource_1', 'resource_2']
+        'embed': ['resource_1', 'resource_2'],
+        'cursor': 'WyJ2YWx1ZSJd',
+        'count': 'estimate',
+        'stream': True
     }
 
     def test_extra_args(self):
@@ -628,17 +634,23 @@ class TestArgs(object):
             'offset': None,
             'sort': [],
             'where': [],
-            'embed': []
+            'embed': [],
+            'cursor': None,
+            'count': 'exact',
+            'stream': False
         }
         assert schemas.args({}) == expected
 
     def test_invalid_args(self):
         errors = {'limit': schemas.INVALID_LIMIT,
-                  'offset': schemas.INVALID_OFFSET}
+                  'offset': schemas.INVALID_OFFSET,
+                  'count': schemas.INVALID_COUNT,
+                  'stream': schemas.INVALID_STREAM}
 
-        data = {'limit': -1, 'offset': -1}
+        data = {'limit': -1, 'offset': -1, 'count': 'foo', 'stream': 'foo'}
         utils.invalid_args(data, errors)
-        data = {'limit': 'foo', 'offset': 'bar'}
+        data = {'limit': 'foo', 'offset': 'bar', 'count': 'bar',
+                'stream': 'bar'}
         utils.invalid_args(data, errors)
 
     def test_args(self):
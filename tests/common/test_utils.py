@@ -16,6 +16,9 @@
 
 import dci.common.utils as utils
 
+import gzip
+import io
+
 
 def test_dict_merge():
     a = {'jim': 123, 'a': {'b': {'c': {'d': 'bob'}}}, 'rob': 34}
@@ -28,3 +31,29 @@ def test_dict_merge():
         'rob': 34,
         'tot': {'a': {'b': 'string'}, 'c': [1, 2, 3, 4]}
     }
+
+
+def test_gzip_chunks():
+    chunks = [b'content' * 1000, b'', b'end']
+    compressed = b''.join(utils.gzip_chunks(iter(chunks)))
+
+    assert gzip.GzipFile(fileobj=io.BytesIO(compressed)).read() == (
+        b''.join(chunks))
+    assert b''.join(utils.gunzip_chunks([compressed[:10], compressed[10:]])
+                    ) == b''.join(chunks)
+
+
+def test_chunks_reader():
+    f = utils.ChunksReader(iter([b'abc', b'', b'defg', b'h']))
+
+    assert f.read(2) == b'ab'
+    assert f.read(4) == b'cdef'
+    assert f.read() == b'gh'
+    assert f.read(1) == b''
+
+
+def test_slice_chunks():
+    chunks = [b'abc', b'defg', b'h']
+
+    assert b''.join(utils.slice_chunks(chunks, 2, 5)) == b'cde'
+    assert b''.join(utils.slice_chunks(chunks, 3, 20)) == b'defgh'
@@ -306,6 +306,22 @@ def file_job_junit_empty_user_id(user, job_id, team_user_id):
     return file['file']['id']
 
 
+@pytest.fixture
+def fake_tracker(request):
+    tracker = utils.FakeTracker()
+    tracker.start()
+    request.addfinalizer(tracker.stop)
+    return tracker
+
+
+@pytest.fixture
+def fake_swift(request):
+    swift = utils.FakeSwift()
+    swift.start()
+    request.addfinalizer(swift.stop)
+    return swift
+
+
 @pytest.fixture
 def es_clean(request):
     conn = es_engine.DCIESEngine(utils.conf)
@@ -26,3 +26,7 @@ SQLALCHEMY_DATABASE_URI = "postgresql:///%s?host=%s" % (
 )
 
 FILES_UPLOAD_FOLDER = '/tmp/dci-control-server'
+
+TOKEN_SECRET_KEY = 'dci-tests-secret'
+
+ISSUES_REFRESH_ENABLED = False
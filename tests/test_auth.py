@@ -14,6 +14,12 @@
 # License for the specific language governing permissions and limitations
 # under the License.
 
+from dci import auth
+import tests.utils as utils
+
+import mock
+import time
+
 
 def test_api_with_unauthorized_credentials(unauthorized, topic_id):
     assert unauthorized.get(
@@ -29,3 +35,66 @@ def test_api_with_unauthorized_credentials(unauthorized, topic_id):
     assert unauthorized.get('/api/v1/users').status_code == 401
     assert unauthorized.get('/api/v1/files').status_code == 401
     assert unauthorized.get('/api/v1/topics')
+
+
+def test_credentials_cache():
+    cache = auth.CredentialsCache(size=2, ttl=300)
+    user = {'id': 'u1', 'name': 'bob', 'team_id': 't1'}
+
+    assert cache.get('bob', 'pass') is None
+    cache.add('bob', 'pass', user)
+    assert cache.get('bob', 'pass') == user
+    assert cache.get('bob', 'wrong') is None
+    assert cache.stats()['hits'] == 1
+    assert cache.stats()['misses'] == 2
+
+
+def test_credentials_cache_is_bounded():
+    cache = auth.CredentialsCache(size=2, ttl=300)
+    for name in ('a', 'b', 'c'):
+        cache.add(name, name, {'id': name})
+
+    assert cache.stats()['size'] == 2
+    assert cache.get('a', 'a') is None
+    assert cache.get('c', 'c') == {'id': 'c'}
+
+
+def test_credentials_cache_expiration():
+    cache = auth.CredentialsCache(size=2, ttl=300)
+    cache.add('bob', 'pass', {'id': 'u1'})
+
+    with mock.patch('time.time', return_value=time.time() + 301):
+        assert cache.get('bob', 'pass') is None
+    assert cache.stats()['size'] == 0
+
+
+def test_credentials_cache_invalidate():
+    cache = auth.CredentialsCache(size=10, ttl=300)
+    cache.add('bob', 'pass', {'id': 'u1', 'team_id': 't1'})
+    cache.add('alice', 'pass', {'id': 'u2', 'team_id': 't1'})
+    cache.add('eve', 'pass', {'id': 'u3', 'team_id': 't2'})
+
+    cache.invalidate(id='u1')
+    assert cache.get('bob', 'pass') is None
+    assert cache.get('alice', 'pass') is not None
+
+    cache.invalidate(team_id='t1')
+    assert cache.get('alice', 'pass') is None
+    assert cache.get('eve', 'pass') is not None
+
+
+def test_password_change_invalidates_credentials(admin, app, team_id):
+    pu = admin.post('/api/v1/users',
+                    data={'name': 'pname', 'password': 'ppass',
+                          'team_id': team_id})
+    pu_etag = pu.headers.get('ETag')
+    pname = utils.generate_client(app, ('pname', 'ppass'))
+    assert pname.get('/api/v1/users/pname').status_code == 200
+
+    ppu = admin.put('/api/v1/users/pname', data={'password': 'npass'},
+                    headers={'If-match': pu_etag})
+    assert ppu.status_code == 204
+
+    assert pname.get('/api/v1/users/pname').status_code == 401
+    nname = utils.generate_client(app, ('pname', 'npass'))
+    assert nname.get('/api/v1/users/pname').status_code == 200
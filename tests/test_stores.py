@@ -0,0 +1,88 @@
+# -*- encoding: utf-8 -*-
+#
+# Copyright 2016 Red Hat, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+from dci import stores
+from dci.stores import filesystem
+from dci.stores import swift
+
+import pytest
+import requests
+
+
+@pytest.fixture(params=['file', 'swift'])
+def store(request, tmpdir, fake_swift):
+    if request.param == 'file':
+        return filesystem.FileStore(str(tmpdir))
+    return swift.SwiftStore(fake_swift.url, fake_swift.token)
+
+
+def test_put_and_get(store):
+    store.put('team/ab/cd/ef/abcdef', iter([b'con', b'tent']))
+
+    assert b''.join(store.get('team/ab/cd/ef/abcdef')) == b'content'
+    assert store.stat('team/ab/cd/ef/abcdef') == {'size': 7}
+    assert b''.join(store.get_range('team/ab/cd/ef/abcdef', 1, 4)) == b'ont'
+    assert b''.join(store.get_range('team/ab/cd/ef/abcdef', 5, 9)) == b'nt'
+
+
+def test_rename(store):
+    store.put('foo', [b'content'])
+    store.rename('foo', 'blobs/aa/bb/bar')
+
+    assert b''.join(store.get('blobs/aa/bb/bar')) == b'content'
+    with pytest.raises(stores.NotFound):
+        store.stat('foo')
+
+
+def test_copy(store):
+    store.put('foo', [b'content'])
+    store.copy('foo', 'blobs/aa/bb/bar')
+    store.delete('foo')
+
+    assert b''.join(store.get('blobs/aa/bb/bar')) == b'content'
+    with pytest.raises(stores.NotFound):
+        store.copy('foo', 'blobs/aa/bb/baz')
+
+
+def test_delete(store):
+    store.put('foo', [b'content'])
+    store.delete('foo')
+
+    with pytest.raises(stores.NotFound):
+        store.get('foo')
+    with pytest.raises(stores.NotFound):
+        store.stat('foo')
+    # deleting a missing key is not an error
+    store.delete('foo')
+
+
+def test_put_failed(tmpdir):
+    def chunks():
+        yield b'con'
+        raise IOError('connection reset')
+
+    store = filesystem.FileStore(str(tmpdir))
+    with pytest.raises(IOError):
+        store.put('foo', chunks())
+    with pytest.raises(stores.NotFound):
+        store.stat('foo')
+
+
+def test_swift_token(fake_swift):
+    store = swift.SwiftStore(fake_swift.url, 'wrong')
+    with pytest.raises(requests.exceptions.HTTPError):
+        store.put('foo', [b'content'])
+    assert fake_swift.objects == {}
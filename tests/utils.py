@@ -18,8 +18,13 @@ import base64
 import collections
 import flask
 import shutil
+import threading
+import time
 
 import six
+from six.moves import BaseHTTPServer
+from six.moves import socketserver
+from six.moves.urllib import parse
 
 import dci.auth as auth
 import dci.common.utils as utils
@@ -35,6 +40,173 @@ def rm_upload_folder():
     shutil.rmtree(conf['FILES_UPLOAD_FOLDER'], ignore_errors=True)
 
 
+class FakeTracker(object):
+    """Local HTTP server standing in for GitHub and Bugzilla, it answers
+    the requests with the responses added by path and records them.
+
+    Like GitHub, it answers 304 when If-None-Match is the ETag of the
+    response.
+    """
+
+    def __init__(self):
+        self.responses = {}
+        self.requests = []
+        self.requests_headers = []
+        fake_tracker = self
+
+        class Handler(BaseHTTPServer.BaseHTTPRequestHandler):
+            def do_GET(self):
+                fake_tracker.requests.append(self.path)
+                fake_tracker.requests_headers.append(dict(self.headers))
+                status, body, headers, delay = fake_tracker.responses.get(
+                    self.path, (404, b'', {}, 0))
+                time.sleep(delay)
+                if ('ETag' in headers and
+                        self.headers.get('If-None-Match') == headers['ETag']):
+                    status, body = 304, b''
+                self.send_response(status)
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        class Server(socketserver.ThreadingMixIn, BaseHTTPServer.HTTPServer):
+            daemon_threads = True
+
+        self.server = Server(('127.0.0.1', 0), Handler)
+        self.url = 'http://127.0.0.1:%s' % self.server.server_port
+        self.thread = threading.Thread(target=self.server.serve_forever)
+        self.thread.daemon = True
+
+    def add(self, path, body, status=200, headers=None, delay=0):
+        if isinstance(body, six.text_type):
+            body = body.encode('utf-8')
+        self.responses[path] = (status, body, headers or {}, delay)
+
+    def start(self):
+        self.thread.start()
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class FakeSwift(object):
+    """Local HTTP server standing in for the container of a Swift object
+    storage, the objects are kept in memory by key.
+
+    It supports the chunked uploads, the Range requests and the server side
+    copies with X-Copy-From like Swift.
+    """
+
+    container = 'files'
+    token = 'swift-token'
+
+    def __init__(self):
+        self.objects = {}
+        fake_swift = self
+        prefix = '/v1/AUTH_test/%s/' % self.container
+
+        class Handler(BaseHTTPServer.BaseHTTPRequestHandler):
+            def _key(self, path):
+                return parse.unquote(path[len(prefix):])
+
+            def _respond(self, status, body=b'', headers=None):
+                self.send_response(status)
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                if self.command != 'HEAD':
+                    self.wfile.write(body)
+
+            def _read_body(self):
+                if self.headers.get('Transfer-Encoding') != 'chunked':
+                    length = int(self.headers.get('Content-Length') or 0)
+                    return self.rfile.read(length)
+                body = []
+                while True:
+                    size = int(self.rfile.readline().split(b';')[0], 16)
+                    if size == 0:
+                        self.rfile.readline()
+                        return b''.join(body)
+                    body.append(self.rfile.read(size))
+                    self.rfile.readline()
+
+            def _authorized(self):
+                if self.headers.get('X-Auth-Token') == fake_swift.token:
+                    return True
+                self._respond(401)
+                return False
+
+            def do_PUT(self):
+                if not self._authorized():
+                    return
+                body = self._read_body()
+                copy_from = self.headers.get('X-Copy-From')
+                if copy_from is not None:
+                    src = self._key('/v1/AUTH_test' + copy_from)
+                    if src not in fake_swift.objects:
+                        return self._respond(404)
+                    body = fake_swift.objects[src]
+                fake_swift.objects[self._key(self.path)] = body
+                self._respond(201)
+
+            def do_GET(self):
+                if not self._authorized():
+                    return
+                body = fake_swift.objects.get(self._key(self.path))
+                if body is None:
+                    return self._respond(404)
+                byte_range = self.headers.get('Range')
+                if byte_range is None:
+                    return self._respond(200, body)
+                start, stop = byte_range[len('bytes='):].split('-')
+                start, stop = int(start), min(int(stop) + 1, len(body))
+                self._respond(206, body[start:stop], {
+                    'Content-Range': 'bytes %s-%s/%s' % (start, stop - 1,
+                                                         len(body))})
+
+            def do_HEAD(self):
+                if not self._authorized():
+                    return
+                body = fake_swift.objects.get(self._key(self.path))
+                if body is None:
+                    return self._respond(404)
+                self._respond(200, body)
+
+            def do_DELETE(self):
+                if not self._authorized():
+                    return
+                if fake_swift.objects.pop(self._key(self.path),
+                                          None) is None:
+                    return self._respond(404)
+                self._respond(204)
+
+            def log_message(self, *args):
+                pass
+
+        class Server(socketserver.ThreadingMixIn, BaseHTTPServer.HTTPServer):
+            daemon_threads = True
+
+        self.server = Server(('127.0.0.1', 0), Handler)
+        self.url = 'http://127.0.0.1:%s%s' % (self.server.server_port,
+                                              prefix.rstrip('/'))
+        self.thread = threading.Thread(target=self.server.serve_forever)
+        self.thread.daemon = True
+
+    def start(self):
+        self.thread.start()
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
 def generate_client(app, credentials):
     attrs = ['status_code', 'data', 'headers']
     Response = collections.namedtuple('Response', attrs)